@@ -0,0 +1,224 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class QueueFullError(Exception):
+    """
+    Raised when the admission queue is full and a run cannot be accepted
+    """
+
+
+class ExecutorClosedError(Exception):
+    """
+    Raised when a run is submitted after the pool has been shut down
+    """
+
+
+class AgentRunTimeoutError(Exception):
+    """
+    Raised when an agent run does not finish within its timeout
+    """
+
+
+class AgentRunCancelledError(Exception):
+    """
+    Raised inside a worker when its run was cancelled or timed out, so the
+    agent stops at the next step instead of running to completion
+    """
+
+
+_cancel_event: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar(
+    "agent_cancel_event", default=None)
+
+
+def raise_if_cancelled():
+    """
+    Stop the current run if it has been cancelled; agents call this
+    between steps. A no-op outside a pool worker
+    """
+    event = _cancel_event.get()
+    if event is not None and event.is_set():
+        raise AgentRunCancelledError("Agent run was cancelled")
+
+
+class AgentExecutionPool:
+    def __init__(self, max_workers: Optional[int] = None, max_queue: Optional[int] = None,
+                 timeout: Optional[float] = None):
+        """
+        Run blocking agent calls on a bounded worker pool.
+
+        At most ``max_workers`` runs execute at once and at most ``max_queue``
+        runs wait for a worker; anything beyond that is rejected so the caller
+        can apply backpressure instead of piling work onto the event loop.
+        """
+        self.max_workers = max_workers or int(os.environ.get("AGENT_WORKERS", 4))
+        self.max_queue = max_queue if max_queue is not None else int(os.environ.get("AGENT_QUEUE_SIZE", 32))
+        self.timeout = timeout or float(os.environ.get("AGENT_TIMEOUT_SECONDS", 60))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="agent")
+        self._lock = threading.Lock()
+        self._closed = False
+        self._queued = 0
+        self._running = 0
+        self._counters = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timed_out": 0,
+            "cancelled": 0,
+        }
+        self._wait_times: deque = deque(maxlen=1000)
+        self._max_wait = 0.0
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> "AgentRun":
+        """
+        Admit ``fn(*args, **kwargs)`` to the pool without waiting for it.
+
+        Raises QueueFullError / ExecutorClosedError immediately, so callers
+        can reject a request before starting a response.
+        """
+        with self._lock:
+            if self._closed:
+                raise ExecutorClosedError("Agent executor is shutting down")
+            if self._queued >= self.max_queue:
+                self._counters["rejected"] += 1
+                raise QueueFullError("Agent queue is full")
+            self._queued += 1
+            self._counters["submitted"] += 1
+
+        enqueued_at = time.monotonic()
+        cancel_event = threading.Event()
+
+        def _task():
+            started_at = time.monotonic()
+            with self._lock:
+                # shutdown() resets the count, so a run that slipped past
+                # cancel_futures must not take it negative
+                self._queued = max(0, self._queued - 1)
+                self._running += 1
+                self._record_wait(started_at - enqueued_at)
+            try:
+                if cancel_event.is_set():
+                    raise asyncio.CancelledError()
+                _cancel_event.set(cancel_event)
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        # Copy the caller's context so request-scoped context variables are
+        # visible inside the worker thread
+        ctx = contextvars.copy_context()
+        try:
+            future = self._executor.submit(ctx.run, _task)
+        except RuntimeError:
+            with self._lock:
+                self._queued -= 1
+            raise ExecutorClosedError("Agent executor is shutting down")
+        return AgentRun(self, future, cancel_event)
+
+    async def run(self, fn: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run ``fn(*args, **kwargs)`` on a worker thread and await its result
+        """
+        return await self.submit(fn, *args, **kwargs).result(timeout)
+
+    def _finish(self, outcome: str):
+        with self._lock:
+            self._counters[outcome] += 1
+
+    def _cancel(self, future, cancel_event: threading.Event):
+        """
+        Cancel a queued run, or flag a running one so it stops at its next
+        step (see raise_if_cancelled)
+        """
+        cancel_event.set()
+        if future.cancel():
+            with self._lock:
+                self._queued -= 1
+
+    def _record_wait(self, wait: float):
+        self._wait_times.append(wait)
+        if wait > self._max_wait:
+            self._max_wait = wait
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of queue depth, worker usage and queue wait times
+        """
+        with self._lock:
+            waits = sorted(self._wait_times)
+            stats = {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "timeout_seconds": self.timeout,
+                "queue_depth": self._queued,
+                "running": self._running,
+                **self._counters,
+            }
+        if waits:
+            stats["wait_ms"] = {
+                "avg": round(sum(waits) / len(waits) * 1000, 3),
+                "p50": round(waits[len(waits) // 2] * 1000, 3),
+                "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 3),
+                "max": round(self._max_wait * 1000, 3),
+            }
+        else:
+            stats["wait_ms"] = {"avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+        return stats
+
+    def shutdown(self, wait: bool = False):
+        """
+        Stop accepting runs and cancel anything still queued
+        """
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        # The cancelled futures never reach _task, so nothing is queued now
+        with self._lock:
+            self._queued = 0
+
+
+class AgentRun:
+    def __init__(self, pool: AgentExecutionPool, future, cancel_event: threading.Event):
+        """
+        Handle for a run admitted to an AgentExecutionPool
+        """
+        self.pool = pool
+        self.future = future
+        self.cancel_event = cancel_event
+
+    async def result(self, timeout: Optional[float] = None) -> Any:
+        """
+        Await the run's result, enforcing the pool's timeout
+        """
+        wrapped = asyncio.wrap_future(self.future)
+        try:
+            result = await asyncio.wait_for(asyncio.shield(wrapped), timeout or self.pool.timeout)
+        except asyncio.TimeoutError:
+            # The run stops with AgentRunCancelledError that nobody awaits
+            wrapped.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self.cancel()
+            self.pool._finish("timed_out")
+            raise AgentRunTimeoutError("Agent run timed out")
+        except asyncio.CancelledError:
+            # The client went away; drop the run if it has not started yet,
+            # or stop it at its next step
+            wrapped.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self.cancel()
+            self.pool._finish("cancelled")
+            raise
+        except Exception:
+            self.pool._finish("failed")
+            raise
+        self.pool._finish("completed")
+        return result
+
+    def cancel(self):
+        self.pool._cancel(self.future, self.cancel_event)
@@ -0,0 +1,134 @@
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from app.agent_executor import raise_if_cancelled
+from app.telemetry import Span, telemetry
+from app.token_budget import count_tokens, token_budget
+
+
+class CancellationCallbackHandler(BaseCallbackHandler):
+    """
+    Stop a cancelled or timed-out run before its next LLM call or tool run,
+    so it frees its pool worker instead of running to completion
+    """
+    raise_error = True
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        raise_if_cancelled()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        raise_if_cancelled()
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        raise_if_cancelled()
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    def __init__(self):
+        """
+        Feed agent progress into telemetry: one ``agent_step`` span per
+        ReAct iteration, with the ``llm`` call and ``tool`` run of that
+        iteration nested under it. Token usage reported by the model (or
+        estimated, when it reports none) goes to the token counter and to
+        the run's TokenUsage. The names of the tools the run called are
+        kept in ``tools``.
+        """
+        self._spans: Dict[UUID, Tuple[Tuple[float, Optional[Span]], str, str]] = {}
+        self._usage = token_budget.current()
+        self._prompt_tokens: Dict[UUID, int] = {}
+        self._tool_tokens: Dict[UUID, Any] = {}
+        self._step: Optional[Tuple[float, Optional[Span]]] = None
+        self._steps = 0
+        self.tools: List[str] = []
+
+    def _start(self, run_id: UUID, kind: str, name: str, **attrs):
+        parent = self._step[1] if self._step is not None and kind != "agent_step" else None
+        self._spans[run_id] = (telemetry.start_span(kind, name, parent=parent, **attrs), kind, name)
+
+    def _end(self, run_id: UUID, error: bool = False, **attrs):
+        entry = self._spans.pop(run_id, None)
+        if entry is not None:
+            handle, kind, name = entry
+            telemetry.end_span(handle, kind, name, error=error, **attrs)
+
+    def _begin_step(self):
+        # A new LLM call starts the next iteration; close the previous one
+        self._end_step()
+        self._steps += 1
+        self._step = telemetry.start_span("agent_step", "react_iteration", iteration=self._steps)
+
+    def _end_step(self):
+        if self._step is not None:
+            telemetry.end_span(self._step, "agent_step", "react_iteration")
+            self._step = None
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        self._begin_step()
+        name = ((serialized or {}).get("id") or ["llm"])[-1]
+        chars = sum(len(prompt) for prompt in prompts or [])
+        self._prompt_tokens[run_id] = sum(count_tokens(prompt) for prompt in prompts or [])
+        self._start(run_id, "llm", name, prompt_chars=chars)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        self._begin_step()
+        name = ((serialized or {}).get("id") or ["chat_model"])[-1]
+        chars = sum(len(str(message.content)) for batch in messages or [] for message in batch)
+        self._prompt_tokens[run_id] = sum(count_tokens(str(message.content)) for batch in messages or [] for message in batch)
+        self._start(run_id, "llm", name, prompt_chars=chars)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+        tokens_in = usage.get("prompt_tokens")
+        tokens_out = usage.get("completion_tokens")
+        if tokens_in:
+            telemetry.llm_tokens.inc(tokens_in, direction="in")
+        if tokens_out:
+            telemetry.llm_tokens.inc(tokens_out, direction="out")
+        # Streaming and local models often report no usage; estimate it then
+        estimated_in = self._prompt_tokens.pop(run_id, 0)
+        estimated_out = sum(
+            count_tokens(generation.text) for batch in getattr(response, "generations", None) or [] for generation in batch
+        )
+        token_budget.record_llm(self._usage, tokens_in or estimated_in, tokens_out or estimated_out)
+        self._end(run_id, tokens_in=tokens_in or estimated_in, tokens_out=tokens_out or estimated_out,
+                  estimated=not (tokens_in and tokens_out))
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._prompt_tokens.pop(run_id, None)
+        self._end(run_id, error=True, error_message=str(error))
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self.tools.append(name)
+        self._start(run_id, "tool", name)
+        # Google API calls made by the tool nest under its span
+        self._tool_tokens[run_id] = telemetry.push_span(self._spans[run_id][0][1])
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs):
+        self._end_tool(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._end_tool(run_id, error=True, error_message=str(error))
+
+    def _end_tool(self, run_id: UUID, **attrs):
+        token = self._tool_tokens.pop(run_id, None)
+        try:
+            telemetry.pop_span(token)
+        except ValueError:
+            # Token from another context (tool ran elsewhere); nothing to restore
+            pass
+        self._end(run_id, **attrs)
+
+    def on_agent_finish(self, finish, *, run_id: UUID, **kwargs):
+        self._end_step()
+
+    def on_chain_end(self, outputs, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs):
+        # The top-level chain ending closes any step still open
+        if parent_run_id is None:
+            self._end_step()
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs):
+        if parent_run_id is None:
+            self._end_step()
@@ -0,0 +1,374 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Optional
+
+from app.shared_state import shared_state
+from app.telemetry import Counter, Histogram, telemetry
+
+# Error reasons Google uses for per-user and per-project rate limits
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+# Transient server-side failures that are safe to retry
+RETRYABLE_STATUSES = {500, 502, 503, 504}
+
+
+class CalendarApiError(Exception):
+    """
+    A Google Calendar call failed in a way callers should handle (rather
+    than treat as "no events")
+    """
+    def __init__(self, message: str, status: Optional[int] = None, reason: str = "",
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class CalendarRateLimitError(CalendarApiError):
+    """
+    Still throttled after the retries, or the call would have waited too
+    long for quota; ``retry_after`` says when to try again
+    """
+
+
+class CalendarUnavailableError(CalendarApiError):
+    """
+    Google kept answering 5xx for the retries
+    """
+
+
+class CalendarAuthError(CalendarApiError):
+    """
+    The access token was rejected (401)
+    """
+
+
+def error_reason(error) -> str:
+    """
+    First ``errors[].reason`` of a Google JSON error body, or ""
+    """
+    try:
+        content = error.content.decode() if isinstance(error.content, bytes) else error.content
+        return json.loads(content)["error"]["errors"][0]["reason"]
+    except (AttributeError, KeyError, IndexError, TypeError, ValueError):
+        return ""
+
+
+def error_status(error) -> Optional[int]:
+    resp = getattr(error, "resp", None)
+    return getattr(resp, "status", None) if resp is not None else None
+
+
+def retry_after_seconds(error) -> Optional[float]:
+    """
+    ``Retry-After`` of an error response in seconds (delta form only;
+    Google does not send HTTP dates here)
+    """
+    resp = getattr(error, "resp", None)
+    value = resp.get("retry-after") if resp is not None else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def is_rate_limited(status: Optional[int], reason: str) -> bool:
+    return status == 429 or (status == 403 and reason in RATE_LIMIT_REASONS)
+
+
+def is_retryable(error) -> bool:
+    status = error_status(error)
+    return is_rate_limited(status, error_reason(error)) or status in RETRYABLE_STATUSES
+
+
+class TokenBucket:
+    __slots__ = ("rate", "max_rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        """
+        ``rate`` tokens per second up to ``burst``; ``rate`` can be lowered
+        after throttling and recovers towards ``max_rate``
+        """
+        self.rate = rate
+        self.max_rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float, cost: float = 1.0) -> float:
+        """
+        Seconds until ``cost`` tokens are available. Costs above the burst
+        only need a full bucket and leave it in debt.
+        """
+        self._refill(now)
+        missing = min(cost, self.burst) - self.tokens
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, cost: float = 1.0):
+        self.tokens -= cost
+
+
+class GoogleApiScheduler:
+    def __init__(self, rate: Optional[float] = None, user_rate: Optional[float] = None,
+                 max_retries: Optional[int] = None, max_wait: Optional[float] = None):
+        """
+        Admission control and retries for every Google Calendar call.
+
+        A call first waits for a token from the global bucket
+        (GOOGLE_API_QPS, the project quota) and from its user's bucket
+        (GOOGLE_API_USER_QPS). While the global bucket is short, waiting
+        users are served round-robin so one heavy user cannot starve the
+        others. Rate-limit (403 rateLimitExceeded, 429) and 5xx responses
+        are retried up to GOOGLE_API_MAX_RETRIES times after
+        ``Retry-After`` or an exponential backoff with full jitter; a
+        throttled user's rate is halved and recovers with each success.
+        When the retries run out, or admission would take longer than
+        GOOGLE_API_MAX_WAIT_SECONDS, a typed CalendarApiError is raised.
+        With a distributed SHARED_STATE_URL the per-second budgets are
+        also enforced across workers.
+        """
+        self.enabled = os.environ.get("GOOGLE_API_SCHEDULER_ENABLED", "1") != "0"
+        self.rate = rate or float(os.environ.get("GOOGLE_API_QPS", 50))
+        self.user_rate = user_rate or float(os.environ.get("GOOGLE_API_USER_QPS", 10))
+        self.burst = float(os.environ.get("GOOGLE_API_BURST", self.rate))
+        self.user_burst = float(os.environ.get("GOOGLE_API_USER_BURST", self.user_rate))
+        self.max_retries = max_retries if max_retries is not None else int(os.environ.get("GOOGLE_API_MAX_RETRIES", 4))
+        self.max_wait = max_wait or float(os.environ.get("GOOGLE_API_MAX_WAIT_SECONDS", 30))
+        self.backoff_base = float(os.environ.get("GOOGLE_API_BACKOFF_BASE_SECONDS", 0.5))
+        self.backoff_max = float(os.environ.get("GOOGLE_API_BACKOFF_MAX_SECONDS", 32))
+        # Throttled users' rates are not lowered below this share of the configured rate
+        self.min_rate_ratio = 0.1
+        # Idle users' buckets are dropped once this many are tracked
+        self.max_users = 4096
+        self._cond = threading.Condition()
+        self._global = TokenBucket(self.rate, self.burst)
+        self._users: Dict[str, TokenBucket] = {}
+        self._paused_until: Dict[str, float] = {}
+        # Waiting calls per user; the dict order is the round-robin order
+        self._waiting: "OrderedDict[str, deque]" = OrderedDict()
+        self._counters = {"calls": 0, "queued": 0, "throttled": 0, "retried": 0, "rejected": 0, "failed": 0}
+        self.wait_seconds = Histogram("tailortalk_google_api_queue_seconds", "Time Google API calls waited for quota")
+        self.throttled = Counter("tailortalk_google_api_throttled_total", "Google API responses that were rate limited or failed transiently, by reason")
+        self.retries = Counter("tailortalk_google_api_retries_total", "Google API calls retried, by method")
+        self.rejected = Counter("tailortalk_google_api_rejected_total", "Google API calls given up on, by error")
+        for metric in (self.wait_seconds, self.throttled, self.retries, self.rejected):
+            telemetry.register(metric)
+
+    def _prune(self, now: float):
+        """
+        Forget users whose bucket has refilled and who are not throttled;
+        a fresh bucket is equivalent
+        """
+        for user_key, bucket in list(self._users.items()):
+            if (user_key not in self._waiting and bucket.rate == bucket.max_rate
+                    and bucket.delay(now, bucket.burst) == 0 and self._paused_until.get(user_key, 0.0) <= now):
+                del self._users[user_key]
+                self._paused_until.pop(user_key, None)
+
+    def _user_bucket(self, user_key: str) -> TokenBucket:
+        bucket = self._users.get(user_key)
+        if bucket is None:
+            bucket = self._users[user_key] = TokenBucket(self.user_rate, self.user_burst)
+        return bucket
+
+    def _user_delay(self, user_key: str, now: float, cost: float) -> float:
+        return max(self._user_bucket(user_key).delay(now, cost), self._paused_until.get(user_key, 0.0) - now)
+
+    def acquire(self, user_key: str, cost: float = 1.0) -> float:
+        """
+        Block until the call may go out; returns the seconds waited
+        """
+        started = time.monotonic()
+        deadline = started + self.max_wait
+        ticket = object()
+        with self._cond:
+            queue = self._waiting.setdefault(user_key, deque())
+            queue.append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if queue[0] is ticket:
+                        own = self._user_delay(user_key, now, cost)
+                        # First waiting user (in round-robin order) whose own budget allows a call
+                        turn = next((user for user, waiting in self._waiting.items()
+                                     if self._user_delay(user, now, cost if user == user_key else 1.0) <= 0), None)
+                        wait = max(own, self._global.delay(now, cost))
+                        if wait <= 0 and turn == user_key:
+                            self._global.take(cost)
+                            self._user_bucket(user_key).take(cost)
+                            if len(self._users) > self.max_users:
+                                self._prune(now)
+                            break
+                        if wait <= 0:
+                            # Another user's turn; it is woken when tokens are taken
+                            wait = 1.0 / self.rate
+                    else:
+                        wait = deadline - now
+                    if now + wait > deadline:
+                        self._counters["rejected"] += 1
+                        self.rejected.inc(error="queue_timeout")
+                        raise CalendarRateLimitError(
+                            f"Google Calendar quota for this user is exhausted; retry in {wait:.1f}s",
+                            status=429, reason="localRateLimit", retry_after=wait,
+                        )
+                    self._cond.wait(wait)
+            finally:
+                queue.remove(ticket)
+                if queue:
+                    # Round robin: this user goes behind the others that are waiting
+                    self._waiting.move_to_end(user_key)
+                else:
+                    del self._waiting[user_key]
+                self._cond.notify_all()
+            waited = time.monotonic() - started
+            self._counters["calls"] += 1
+            if waited > 0.001:
+                self._counters["queued"] += 1
+        if shared_state.distributed:
+            waited += self._shared_admission(user_key, cost, deadline)
+        self.wait_seconds.observe(waited)
+        return waited
+
+    def _shared_admission(self, user_key: str, cost: float, deadline: float) -> float:
+        """
+        Per-second call counts shared by all workers, so N workers do not
+        send N times the quota
+        """
+        waited = 0.0
+        while True:
+            window = int(time.time())
+            total = shared_state.incr(f"quota:{window}", int(cost), ttl=5)
+            user = shared_state.incr(f"quota:{user_key}:{window}", int(cost), ttl=5)
+            if total <= max(self.rate, cost) and user <= max(self.user_rate, cost):
+                return waited
+            wait = window + 1 - time.time()
+            if time.monotonic() + wait > deadline:
+                self.rejected.inc(error="queue_timeout")
+                raise CalendarRateLimitError(
+                    "Google Calendar quota is exhausted across workers", status=429,
+                    reason="localRateLimit", retry_after=wait,
+                )
+            time.sleep(wait)
+            waited += wait
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Full-jitter exponential backoff for the given retry (0-based)
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _throttle(self, user_key: str, delay: float):
+        """
+        Multiplicative decrease: halve the user's rate and hold their
+        calls for ``delay`` seconds
+        """
+        with self._cond:
+            bucket = self._user_bucket(user_key)
+            bucket.rate = max(bucket.max_rate * self.min_rate_ratio, bucket.rate / 2)
+            self._paused_until[user_key] = max(self._paused_until.get(user_key, 0.0), time.monotonic() + delay)
+            self._counters["throttled"] += 1
+
+    def _succeeded(self, user_key: str):
+        """
+        Additive increase back towards the configured rate
+        """
+        with self._cond:
+            bucket = self._users.get(user_key)
+            if bucket is not None and bucket.rate < bucket.max_rate:
+                bucket.rate = min(bucket.max_rate, bucket.rate + bucket.max_rate * self.min_rate_ratio)
+            self._paused_until.pop(user_key, None)
+
+    def retry_delay(self, user_key: str, error, attempt: int) -> Optional[float]:
+        """
+        Seconds to wait before retrying a failed call, or None when the
+        error is not retryable. Rate limits also slow the user down.
+        """
+        status, reason = error_status(error), error_reason(error)
+        if is_rate_limited(status, reason):
+            kind = reason or str(status)
+        elif status in RETRYABLE_STATUSES:
+            kind = str(status)
+        else:
+            return None
+        self.throttled.inc(reason=kind)
+        delay = retry_after_seconds(error)
+        if delay is None:
+            delay = self.backoff(attempt)
+        if is_rate_limited(status, reason):
+            self._throttle(user_key, delay)
+        return delay
+
+    def typed_error(self, error) -> Exception:
+        """
+        The CalendarApiError for an HttpError that is final, or the
+        HttpError itself for ordinary failures (404, 412, ...)
+        """
+        status, reason = error_status(error), error_reason(error)
+        if is_rate_limited(status, reason):
+            cls = CalendarRateLimitError
+        elif status in RETRYABLE_STATUSES:
+            cls = CalendarUnavailableError
+        elif status == 401:
+            cls = CalendarAuthError
+        else:
+            return error
+        self.rejected.inc(error=reason or str(status))
+        with self._cond:
+            self._counters["failed"] += 1
+        return cls(f"Google Calendar request failed: {reason or status}", status=status, reason=reason,
+                   retry_after=retry_after_seconds(error))
+
+    def execute(self, user_key: str, method: str, call: Callable[[], Any], cost: float = 1.0) -> Any:
+        """
+        Run ``call`` (an ``HttpRequest.execute``) under the quota, retrying
+        rate-limited and transient failures
+        """
+        from googleapiclient.errors import HttpError
+
+        if not self.enabled:
+            return call()
+        attempt = 0
+        while True:
+            self.acquire(user_key, cost)
+            try:
+                result = call()
+            except HttpError as error:
+                delay = self.retry_delay(user_key, error, attempt) if attempt < self.max_retries else None
+                if delay is None:
+                    typed = self.typed_error(error)
+                    if typed is error:
+                        raise
+                    raise typed from error
+                attempt += 1
+                self.retries.inc(method=method)
+                with self._cond:
+                    self._counters["retried"] += 1
+                time.sleep(delay)
+                continue
+            self._succeeded(user_key)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            throttled_users = sum(1 for bucket in self._users.values() if bucket.rate < bucket.max_rate)
+            return {
+                "enabled": self.enabled,
+                "qps": self.rate,
+                "user_qps": self.user_rate,
+                "max_retries": self.max_retries,
+                "waiting": sum(len(queue) for queue in self._waiting.values()),
+                "users": len(self._users),
+                "throttled_users": throttled_users,
+                **self._counters,
+            }
+
+
+api_scheduler = GoogleApiScheduler()
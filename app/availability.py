@@ -0,0 +1,189 @@
+import bisect
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+Interval = Tuple[datetime, datetime]
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """
+    Sort and merge overlapping or touching intervals
+    """
+    merged: List[Interval] = []
+    for start, end in sorted(i for i in intervals if i[1] > i[0]):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def parse_working_hours(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """
+    Parse "9-17" into (9, 17); empty means no working-hours limit. Raises
+    ValueError unless both are whole hours with 0 <= start < end <= 24.
+    """
+    if not value:
+        return None
+    start, separator, end = value.partition("-")
+    if not separator or not start.strip().isdigit() or not end.strip().isdigit():
+        raise ValueError(f"working hours must look like '9-17', not {value!r}")
+    hours = int(start), int(end)
+    if not 0 <= hours[0] < hours[1] <= 24:
+        raise ValueError(f"working hours {value!r} must satisfy 0 <= start < end <= 24")
+    return hours
+
+
+class BusyIndex:
+    def __init__(self, intervals: Iterable[Interval] = ()):
+        """
+        Merged busy intervals as two parallel sorted arrays.
+
+        After merging, intervals are disjoint and sorted by both start and
+        end, so every lookup is a binary search: O(log n) to check a slot,
+        O(log n + k) to list k conflicts or free slots.
+        """
+        merged = merge_intervals(intervals)
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def intervals(self) -> List[Interval]:
+        return list(zip(self.starts, self.ends))
+
+    def _first_ending_after(self, moment: datetime) -> int:
+        return bisect.bisect_right(self.ends, moment)
+
+    def is_free(self, start: datetime, end: datetime) -> bool:
+        i = self._first_ending_after(start)
+        return i == len(self.starts) or self.starts[i] >= end
+
+    def conflicts(self, start: datetime, end: datetime) -> List[Interval]:
+        """
+        Busy intervals overlapping ``[start, end)``
+        """
+        found = []
+        i = self._first_ending_after(start)
+        while i < len(self.starts) and self.starts[i] < end:
+            found.append((self.starts[i], self.ends[i]))
+            i += 1
+        return found
+
+    def free_gaps(self, start: datetime, end: datetime) -> List[Interval]:
+        """
+        Maximal free intervals inside ``[start, end)``
+        """
+        gaps = []
+        cursor = start
+        for busy_start, busy_end in self.conflicts(start, end):
+            if busy_start > cursor:
+                gaps.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def find_slots(self, start: datetime, end: datetime, duration: timedelta,
+                   limit: Optional[int] = 5, working_hours: Optional[Tuple[int, int]] = None,
+                   tz=timezone.utc, step: Optional[timedelta] = None) -> List[Interval]:
+        """
+        Free ``duration``-long slots inside ``[start, end)``, earliest first.
+
+        With ``working_hours`` (start hour, end hour in ``tz``) slots must
+        fall within those hours. Slot starts are rounded up to ``step``
+        (15 minutes by default) so suggestions land on sensible times.
+        """
+        step = step or timedelta(minutes=15)
+        slots: List[Interval] = []
+        for window_start, window_end in self._windows(start, end, working_hours, tz):
+            for gap_start, gap_end in self.free_gaps(window_start, window_end):
+                slot_start = _round_up(gap_start, step)
+                if slot_start + duration <= gap_end:
+                    slot_start = slot_start.astimezone(start.tzinfo)
+                    slots.append((slot_start, slot_start + duration))
+                    if limit and len(slots) >= limit:
+                        return slots
+        return slots
+
+    def _windows(self, start: datetime, end: datetime, working_hours: Optional[Tuple[int, int]], tz):
+        if working_hours is None:
+            yield start, end
+            return
+        first_hour, last_hour = working_hours
+        day = start.astimezone(tz).replace(hour=0, minute=0, second=0, microsecond=0)
+        while day < end:
+            window_start = max(start, day.replace(hour=first_hour))
+            window_end = min(end, day.replace(hour=last_hour) if last_hour < 24 else day + timedelta(days=1))
+            if window_start < window_end:
+                yield window_start, window_end
+            day = (day + timedelta(days=1)).replace(hour=0)
+
+
+def as_utc(moment: datetime) -> datetime:
+    """
+    Aware UTC datetime; naive values are taken to be UTC
+    """
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def _round_up(moment: datetime, step: timedelta) -> datetime:
+    epoch = datetime(1970, 1, 1, tzinfo=moment.tzinfo)
+    remainder = (moment - epoch) % step
+    return moment if not remainder else moment + (step - remainder)
+
+
+class AvailabilityService:
+    def __init__(self, calendar_manager, working_hours: Optional[Tuple[int, int]] = None,
+                 tz_name: Optional[str] = None):
+        """
+        Slot finding and conflict checks over ``freebusy.query`` results for
+        any mix of calendars and attendee addresses
+        """
+        self.calendar_manager = calendar_manager
+        self.working_hours = working_hours if working_hours is not None else parse_working_hours(
+            os.environ.get("AVAILABILITY_WORKING_HOURS", "9-17"))
+        self.tz_name = tz_name or os.environ.get("AVAILABILITY_TIMEZONE", "UTC")
+
+    @property
+    def tz(self):
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(self.tz_name)
+
+    def busy_index(self, time_min: datetime, time_max: datetime, calendar_ids: Optional[List[str]] = None,
+                   access_token: str = "") -> Tuple[BusyIndex, Dict[str, List[Interval]], Dict[str, str]]:
+        """
+        Combined busy index for ``calendar_ids`` plus the per-calendar busy
+        intervals and any per-calendar errors
+        """
+        busy, errors = self.calendar_manager.query_free_busy(
+            calendar_ids or ['primary'], time_min, time_max, access_token=access_token)
+        index = BusyIndex(interval for intervals in busy.values() for interval in intervals)
+        return index, busy, errors
+
+    def find_slots(self, duration: timedelta, time_min: Optional[datetime] = None,
+                   time_max: Optional[datetime] = None, calendar_ids: Optional[List[str]] = None,
+                   limit: int = 5, working_hours: Optional[Tuple[int, int]] = None,
+                   access_token: str = "") -> Dict[str, object]:
+        time_min = as_utc(time_min) if time_min else datetime.now(timezone.utc)
+        time_max = as_utc(time_max) if time_max else time_min + timedelta(days=7)
+        index, _, errors = self.busy_index(time_min, time_max, calendar_ids, access_token)
+        slots = index.find_slots(time_min, time_max, duration, limit=limit,
+                                 working_hours=working_hours or self.working_hours, tz=self.tz)
+        return {"busy": index.intervals(), "slots": slots, "errors": errors}
+
+    def check_conflicts(self, start: datetime, end: datetime, calendar_ids: Optional[List[str]] = None,
+                        access_token: str = "") -> Dict[str, object]:
+        start, end = as_utc(start), as_utc(end)
+        _, busy, errors = self.busy_index(start, end, calendar_ids, access_token)
+        conflicts = {}
+        for calendar_id, intervals in busy.items():
+            overlapping = BusyIndex(intervals).conflicts(start, end)
+            if overlapping:
+                conflicts[calendar_id] = overlapping
+        return {"free": not conflicts, "conflicts": conflicts, "errors": errors}
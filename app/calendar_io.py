@@ -0,0 +1,584 @@
+"""
+Bulk import and export of calendar events as iCalendar (.ics) or CSV.
+
+Files are parsed line by line and exported page by page, so neither side
+holds a whole calendar. Imports skip events whose UID is already on the
+calendar, write through batched ``events.import`` calls with several
+batches in flight, report progress, and save a checkpoint after each
+completed batch so an interrupted import resumes where it stopped:
+
+    python -m app.calendar_io import team.ics [--restart] [--no-dedupe]
+    python -m app.calendar_io export -o backup.ics [--from 2026-01-01] [--to 2027-01-01]
+
+The access token comes from ``--access-token`` or GOOGLE_ACCESS_TOKEN.
+"""
+import argparse
+import contextvars
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.events import Event, format_time
+
+FORMATS = ("ics", "csv")
+CSV_COLUMNS = ("uid", "summary", "start", "end", "description", "location", "recurrence")
+# Events before this are not expected on any calendar; exports start here by default
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Recurrence lines passed through to Google as they are
+_RECURRENCE_PROPERTIES = ("RRULE", "EXRULE", "RDATE", "EXDATE")
+_ESCAPED_RE = re.compile(r"\\([\\;,nN])")
+_DURATION_RE = re.compile(
+    r"^(?P<sign>[+-])?P(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?"
+    r"(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$"
+)
+
+# One parsed record: an API event body, or why the record could not be used
+Record = Tuple[Optional[Dict[str, Any]], Optional[str]]
+
+
+def _unfold(lines: Iterable[str]) -> Iterator[str]:
+    # RFC 5545 folds long lines; a leading space or tab continues the previous one
+    current = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def _split_property(line: str) -> Tuple[str, Dict[str, str], str]:
+    # NAME;PARAM=value;PARAM="quoted;value":VALUE, split outside quotes only
+    parts, start, quoted, value = [], 0, False, ""
+    for i, char in enumerate(line):
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char in ";:":
+            parts.append(line[start:i])
+            start = i + 1
+            if char == ":":
+                value = line[start:]
+                break
+    else:
+        parts.append(line[start:])
+    params = {}
+    for part in parts[1:]:
+        key, _, param = part.partition("=")
+        params[key.upper()] = param.strip('"')
+    return parts[0].upper(), params, value
+
+
+def _unescape(text: str) -> str:
+    return _ESCAPED_RE.sub(lambda match: "\n" if match.group(1) in "nN" else match.group(1), text)
+
+
+def _ics_time(value: str, params: Dict[str, str], default_tz: str) -> Tuple[Dict[str, str], Any]:
+    """
+    An API ``start``/``end`` object for an iCalendar DATE or DATE-TIME,
+    plus the parsed value (date, or naive wall-clock datetime)
+    """
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        day = datetime.strptime(value, "%Y%m%d").date()
+        return {"date": day.isoformat()}, day
+    moment = datetime.strptime(value.rstrip("Zz"), "%Y%m%dT%H%M%S")
+    if value[-1:] in ("Z", "z"):
+        return {"dateTime": moment.isoformat() + "Z"}, moment
+    # Google resolves the TZID (an IANA name) itself; floating times use default_tz
+    return {"dateTime": moment.isoformat(), "timeZone": params.get("TZID") or default_tz}, moment
+
+
+def _duration(value: str) -> timedelta:
+    match = _DURATION_RE.match(value.strip())
+    if match is None:
+        raise ValueError(f"bad DURATION {value!r}")
+    parts = {name: int(amount or 0) for name, amount in match.groupdict().items() if name != "sign"}
+    delta = timedelta(weeks=parts["weeks"], days=parts["days"], hours=parts["hours"],
+                      minutes=parts["minutes"], seconds=parts["seconds"])
+    return -delta if match.group("sign") == "-" else delta
+
+
+def _shifted(start: Dict[str, str], moment: Any, delta: timedelta) -> Dict[str, str]:
+    # An end time ``delta`` after ``start``, in the same form
+    end = moment + delta
+    if isinstance(end, datetime):
+        if start["dateTime"].endswith("Z"):
+            return {"dateTime": end.isoformat() + "Z"}
+        return {"dateTime": end.isoformat(), "timeZone": start["timeZone"]}
+    return {"date": end.isoformat()}
+
+
+def _finish(body: Dict[str, Any], uid: Optional[str]) -> Dict[str, Any]:
+    # Google needs a named zone on timed recurring events; UTC keeps the instant
+    if body.get("recurrence"):
+        for key in ("start", "end"):
+            if "dateTime" in body[key] and "timeZone" not in body[key]:
+                body[key]["timeZone"] = "UTC"
+    body["iCalUID"] = uid or _fallback_uid(body)
+    return body
+
+
+def _fallback_uid(body: Dict[str, Any]) -> str:
+    # Stable across runs, so re-importing a file without UIDs still dedupes
+    key = json.dumps([body.get("summary"), body.get("start"), body.get("end")], sort_keys=True)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest() + "@tailortalk"
+
+
+def _vevent(properties: List[Tuple[str, Dict[str, str], str, str]], default_tz: str) -> Record:
+    body: Dict[str, Any] = {}
+    recurrence = []
+    start = end = duration = None
+    uid = None
+    for name, params, value, line in properties:
+        if name == "UID":
+            uid = value
+        elif name in ("SUMMARY", "DESCRIPTION", "LOCATION"):
+            body[name.lower()] = _unescape(value)
+        elif name == "DTSTART":
+            start = (value, params)
+        elif name == "DTEND":
+            end = (value, params)
+        elif name == "DURATION":
+            duration = value
+        elif name in _RECURRENCE_PROPERTIES:
+            recurrence.append(line)
+        elif name == "RECURRENCE-ID":
+            return None, f"UID {uid or '?'}: changed instances of recurring events are not imported"
+        elif name == "STATUS" and value.upper() == "CANCELLED":
+            return None, f"UID {uid or '?'}: cancelled"
+    if start is None:
+        return None, f"UID {uid or '?'}: no DTSTART"
+    try:
+        body["start"], moment = _ics_time(start[0], start[1], default_tz)
+        if end is not None:
+            body["end"], _ = _ics_time(end[0], end[1], default_tz)
+        elif duration is not None:
+            body["end"] = _shifted(body["start"], moment, _duration(duration))
+        else:
+            # RFC 5545: a date lasts one day, a date-time has no duration
+            body["end"] = _shifted(body["start"], moment, timedelta(days=1) if "date" in body["start"] else timedelta(0))
+    except ValueError as error:
+        return None, f"UID {uid or '?'}: {error}"
+    if recurrence:
+        body["recurrence"] = recurrence
+    return _finish(body, uid), None
+
+
+def iter_ics(lines: Iterable[str], default_tz: str = "UTC") -> Iterator[Record]:
+    """
+    Events of an iCalendar stream as API bodies, one VEVENT at a time.
+    Floating times are taken to be in ``default_tz``; alarms and
+    VTIMEZONE definitions are ignored.
+    """
+    components: List[str] = []
+    properties: List[Tuple[str, Dict[str, str], str, str]] = []
+    for line in _unfold(lines):
+        if not line:
+            continue
+        name, params, value = _split_property(line)
+        if name == "BEGIN":
+            components.append(value.upper())
+            if value.upper() == "VEVENT":
+                properties = []
+        elif name == "END":
+            component = components.pop() if components else None
+            if component == "VEVENT":
+                yield _vevent(properties, default_tz)
+        elif components and components[-1] == "VEVENT":
+            properties.append((name, params, value, line))
+
+
+def _csv_time(value: str, default_tz: str) -> Dict[str, str]:
+    value = value.strip()
+    if len(value) == 10:
+        return {"date": date.fromisoformat(value).isoformat()}
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        return {"dateTime": moment.isoformat(), "timeZone": default_tz}
+    return {"dateTime": format_time(moment)}
+
+
+def iter_csv(lines: Iterable[str], default_tz: str = "UTC") -> Iterator[Record]:
+    """
+    Events of a CSV stream (columns as CSV_COLUMNS; ``summary`` and
+    ``start`` required) as API bodies, one row at a time. Times are ISO
+    8601; a date alone makes an all-day event, and naive times are in
+    ``default_tz``.
+    """
+    reader = csv.DictReader(lines)
+    for row in reader:
+        row = {key.strip().lower(): (value or "") for key, value in row.items() if key}
+        if not row.get("start"):
+            yield None, f"row {reader.line_num}: no start"
+            continue
+        body: Dict[str, Any] = {"summary": row.get("summary", "")}
+        for name in ("description", "location"):
+            if row.get(name):
+                body[name] = row[name]
+        try:
+            body["start"] = _csv_time(row["start"], default_tz)
+            if row.get("end"):
+                body["end"] = _csv_time(row["end"], default_tz)
+            elif "date" in body["start"]:
+                body["end"] = {"date": (date.fromisoformat(body["start"]["date"]) + timedelta(days=1)).isoformat()}
+            else:
+                raise ValueError("no end")
+        except ValueError as error:
+            yield None, f"row {reader.line_num}: {error}"
+            continue
+        if row.get("recurrence"):
+            body["recurrence"] = row["recurrence"].splitlines()
+        yield _finish(body, row.get("uid")), None
+
+
+def parse_events(lines: Iterable[str], format: str, default_tz: str = "UTC") -> Iterator[Record]:
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format '{format}'; use one of {', '.join(FORMATS)}")
+    return iter_ics(lines, default_tz) if format == "ics" else iter_csv(lines, default_tz)
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _fold(line: str) -> str:
+    # Lines longer than 75 octets continue on lines starting with a space
+    if len(line.encode("utf-8")) <= 75:
+        return line + "\r\n"
+    chunks, current, size = [], "", 0
+    for char in line:
+        width = len(char.encode("utf-8"))
+        if size + width > (75 if not chunks else 74):
+            chunks.append(current)
+            current, size = "", 0
+        current += char
+        size += width
+    chunks.append(current)
+    return "\r\n ".join(chunks) + "\r\n"
+
+
+def _ics_value(moment: datetime, all_day: bool, time_zone: Optional[str] = None) -> str:
+    if all_day:
+        return ";VALUE=DATE:" + moment.strftime("%Y%m%d")
+    if time_zone:
+        from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+        try:
+            local = moment.astimezone(ZoneInfo(time_zone))
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+        else:
+            return f";TZID={time_zone}:" + local.strftime("%Y%m%dT%H%M%S")
+    return ":" + moment.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def ics_chunks(events: Iterable[Event], stamp: Optional[datetime] = None) -> Iterator[str]:
+    """
+    An iCalendar document for ``events``, one VEVENT per chunk. Timed
+    events are written in UTC, except recurring ones, which keep their
+    ``TZID`` so the series follows its zone across DST changes.
+    """
+    stamp_text = (stamp or datetime.now(timezone.utc)).strftime("%Y%m%dT%H%M%SZ")
+    yield "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//TailorTalk//Calendar export//EN\r\nCALSCALE:GREGORIAN\r\n"
+    for event in events:
+        start_zone = event.time_zone if event.recurrence else None
+        end_zone = (event.end_time_zone or event.time_zone) if event.recurrence else None
+        lines = [
+            "BEGIN:VEVENT",
+            f"UID:{event.uid}",
+            f"DTSTAMP:{stamp_text}",
+            "DTSTART" + _ics_value(event.start, event.all_day, start_zone),
+            "DTEND" + _ics_value(event.end, event.all_day, end_zone),
+            f"SUMMARY:{_escape(event.summary)}",
+        ]
+        if event.description:
+            lines.append(f"DESCRIPTION:{_escape(event.description)}")
+        if event.location:
+            lines.append(f"LOCATION:{_escape(event.location)}")
+        lines.extend(event.recurrence or ())
+        lines.append("END:VEVENT")
+        yield "".join(_fold(line) for line in lines)
+    yield "END:VCALENDAR\r\n"
+
+
+def csv_chunks(events: Iterable[Event]) -> Iterator[str]:
+    """
+    A CSV document for ``events`` (columns as CSV_COLUMNS), one row per chunk
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for event in events:
+        writer.writerow((
+            event.uid, event.summary, format_time(event.start, event.all_day), format_time(event.end, event.all_day),
+            event.description, event.location, "\n".join(event.recurrence or ()),
+        ))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_chunks(events: Iterable[Event], format: str) -> Iterator[str]:
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format '{format}'; use one of {', '.join(FORMATS)}")
+    return ics_chunks(events) if format == "ics" else csv_chunks(events)
+
+
+@dataclass
+class ImportProgress:
+    """
+    Counts of an import so far. ``records`` is how many records of the
+    source have been dealt with (written, skipped or failed), which is
+    where a resumed import continues.
+    """
+    records: int = 0
+    created: int = 0
+    skipped: int = 0
+    failed: int = 0
+    resumed_from: int = 0
+    seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def events_per_second(self) -> float:
+        written = self.records - self.resumed_from
+        return written / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(asdict(self), events_per_second=round(self.events_per_second, 1))
+
+
+class FileCheckpoint:
+    def __init__(self, path: str):
+        """
+        Import progress kept in a JSON file, replaced atomically on save
+        """
+        self.path = path
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return None
+
+    def save(self, state: Dict[str, Any]):
+        partial = self.path + ".tmp"
+        with open(partial, "w", encoding="utf-8") as handle:
+            json.dump(state, handle)
+        os.replace(partial, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class StateCheckpoint:
+    def __init__(self, key: str, ttl: float = 86400):
+        """
+        Import progress kept in shared state, so any worker can resume it
+        """
+        self.key = key
+        self.ttl = ttl
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        from app.shared_state import shared_state
+        value = shared_state.get(self.key)
+        return json.loads(value) if value else None
+
+    def save(self, state: Dict[str, Any]):
+        from app.shared_state import shared_state
+        shared_state.set(self.key, json.dumps(state), ttl=self.ttl)
+
+    def clear(self):
+        from app.shared_state import shared_state
+        shared_state.delete(self.key)
+
+
+class EventImporter:
+    def __init__(self, manager, batch_size: Optional[int] = None, concurrency: Optional[int] = None):
+        """
+        Writes parsed records to the calendar through
+        ``GoogleCalendarManager.import_events``: ``batch_size`` events per
+        batch request, ``concurrency`` batches in flight. The API scheduler
+        still paces every call against the quota.
+        """
+        self.manager = manager
+        self.batch_size = batch_size or int(os.environ.get("IMPORT_BATCH_SIZE", 50))
+        self.concurrency = concurrency or int(os.environ.get("IMPORT_CONCURRENCY", 4))
+        # Error messages kept for the report; the rest are only counted
+        self.max_errors = 20
+
+    def run(self, records: Iterable[Record], access_token: str = "", checkpoint=None,
+            progress: Optional[Callable[[ImportProgress], None]] = None, dedupe: bool = True) -> ImportProgress:
+        """
+        Import ``records`` and return the final counts. With a
+        ``checkpoint`` (FileCheckpoint or StateCheckpoint), records a
+        previous run already dealt with are skipped and progress is saved
+        after every batch, in source order; it is cleared when the import
+        completes. With ``dedupe``, events whose UID is already on the
+        calendar, or earlier in the source, are skipped.
+        """
+        state = checkpoint.load() if checkpoint is not None else None
+        done = ImportProgress(**{key: state[key] for key in ("records", "created", "skipped", "failed")}) if state else ImportProgress()
+        done.resumed_from = done.records
+        started = time.perf_counter()
+        existing = self.manager.list_ical_uids(access_token=access_token) if dedupe else set()
+        seen = set()
+        # Counts of records read but not yet in a completed batch
+        read = ImportProgress()
+        batch: List[Dict[str, Any]] = []
+        in_flight: deque = deque()
+
+        def submit(end: int):
+            if batch:
+                # Each batch runs in a copy of this context so tracing follows it
+                future = pool.submit(contextvars.copy_context().run, self.manager.import_events, batch, access_token)
+            else:
+                # Only skipped or failed records: nothing to send
+                future = Future()
+                future.set_result([])
+            in_flight.append((future, end, read.skipped, read.failed, list(read.errors)))
+            read.skipped = read.failed = 0
+            read.errors.clear()
+
+        def complete():
+            future, end, skipped, failed, errors = in_flight.popleft()
+            for event, error in future.result():
+                if error is None:
+                    done.created += 1
+                else:
+                    failed += 1
+                    errors.append(str(error))
+            done.records, done.skipped, done.failed = end, done.skipped + skipped, done.failed + failed
+            done.errors = (done.errors + errors)[:self.max_errors]
+            done.seconds = time.perf_counter() - started
+            if checkpoint is not None:
+                checkpoint.save({key: getattr(done, key) for key in ("records", "created", "skipped", "failed")})
+            if progress is not None:
+                progress(done)
+
+        number = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="calendar-import") as pool:
+            try:
+                for number, (body, error) in enumerate(records, 1):
+                    if number <= done.resumed_from:
+                        continue
+                    if error is not None:
+                        read.failed += 1
+                        read.errors.append(error)
+                    elif dedupe and (body["iCalUID"] in existing or body["iCalUID"] in seen):
+                        read.skipped += 1
+                    else:
+                        seen.add(body["iCalUID"])
+                        batch.append(body)
+                    # A long run of skipped records still advances the checkpoint
+                    if len(batch) >= self.batch_size or (not batch and read.skipped + read.failed >= self.batch_size):
+                        submit(number)
+                        batch = []
+                        if len(in_flight) >= self.concurrency:
+                            complete()
+                if batch or read.skipped or read.failed:
+                    submit(number)
+                while in_flight:
+                    complete()
+            finally:
+                # Stopped early: let the batches already sent finish and count
+                # them, so the checkpoint matches what was written
+                while in_flight:
+                    try:
+                        complete()
+                    except Exception as error:
+                        print(f"Error finishing import batch: {error}")
+                        break
+        done.records = max(done.records, number)
+        done.seconds = time.perf_counter() - started
+        if checkpoint is not None:
+            checkpoint.clear()
+        return done
+
+
+def _print_progress(progress: ImportProgress):
+    print(f"\r{progress.records} records: {progress.created} created, {progress.skipped} skipped, "
+          f"{progress.failed} failed ({progress.events_per_second:.0f}/s)", end="", file=sys.stderr, flush=True)
+
+
+def _cli_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Import or export calendar events as ICS or CSV.")
+    parser.add_argument("--access-token", default=os.environ.get("GOOGLE_ACCESS_TOKEN", ""))
+    commands = parser.add_subparsers(dest="command", required=True)
+    importing = commands.add_parser("import", help="add the events of a file to the calendar")
+    importing.add_argument("path")
+    importing.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    importing.add_argument("--timezone", default="UTC", help="zone of times that carry none")
+    importing.add_argument("--checkpoint", help="default: <path>.checkpoint")
+    importing.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    importing.add_argument("--no-dedupe", action="store_true", help="import events whose UID is already there")
+    exporting = commands.add_parser("export", help="write the calendar's events to a file")
+    exporting.add_argument("-o", "--output", required=True)
+    exporting.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    exporting.add_argument("--from", dest="time_min", help="ISO date/time; default: everything")
+    exporting.add_argument("--to", dest="time_max", help="ISO date/time")
+    args = parser.parse_args(argv)
+
+    from app.calendar_utils import GoogleCalendarManager
+    manager = GoogleCalendarManager()
+    path = args.path if args.command == "import" else args.output
+    format = args.format or os.path.splitext(path)[1].lstrip(".").lower()
+    if format not in FORMATS:
+        parser.error(f"cannot tell the format of {path}; pass --format")
+
+    if args.command == "export":
+        events = manager.iter_events(_cli_time(args.time_min) or EPOCH, _cli_time(args.time_max),
+                                     expand_recurring=False, access_token=args.access_token)
+        exported = 0
+
+        def counted():
+            nonlocal exported
+            for event in events:
+                exported += 1
+                yield event
+
+        with open(path, "w", encoding="utf-8", newline="") as handle:
+            handle.writelines(export_chunks(counted(), format))
+        print(f"Exported {exported} events to {path}", file=sys.stderr)
+        return
+
+    checkpoint = FileCheckpoint(args.checkpoint or path + ".checkpoint")
+    if args.restart:
+        checkpoint.clear()
+    with open(path, encoding="utf-8-sig", newline="") as handle:
+        result = EventImporter(manager).run(
+            parse_events(handle, format, args.timezone), access_token=args.access_token,
+            checkpoint=checkpoint, progress=_print_progress, dedupe=not args.no_dedupe,
+        )
+    _print_progress(result)
+    print(file=sys.stderr)
+    for error in result.errors:
+        print(f"  {error}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,105 @@
+import base64
+import contextvars
+import itertools
+import json
 import os
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Dict, Any, Optional, Set, Tuple
 from google.oauth2 import service_account
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from google.oauth2.credentials import Credentials
+from app.api_scheduler import CalendarApiError, api_scheduler, is_retryable
+from app.service_pool import CalendarServicePool, CALENDAR_SCOPES, build_calendar_service, user_keys
+from app.availability import as_utc
+from app.telemetry import telemetry
+from app.event_cache import EventCache, EventStore, parse_event_time
+from app.events import EVENT_FIELDS, Event, ScoredEvent
+from app.shared_state import shared_state
+from app.calendar_watch import CalendarWatchManager
+from app.title_index import TitleIndex
+
+# The Calendar API accepts at most 50 calls in one batch request
+BATCH_LIMIT = 50
+# ... and at most 50 calendars in one freebusy query
+FREEBUSY_LIMIT = 50
+# events.list returns at most 250 events per page
+PAGE_LIMIT = 250
+
+# events.list parameters a page cursor may carry
+_CURSOR_PARAMS = {'calendarId', 'timeMin', 'timeMax', 'maxResults', 'singleEvents', 'orderBy', 'q', 'fields', 'pageToken'}
+
+_OFFSET_RE = re.compile(r'(?:Z|[+-]\d{2}:?\d{2})$', re.IGNORECASE)
+
+class EventConflictError(Exception):
+    """
+    Raised when a conditional update finds the event changed since it was read
+    """
+    def __init__(self, event_id: str, etag: str, current: Optional[Event] = None):
+        super().__init__(f"Event '{event_id}' was modified since version {etag}")
+        self.event_id = event_id
+        self.etag = etag
+        self.current = current
+
+def event_time(value: str, time_zone: Optional[str] = None) -> Dict[str, Any]:
+    """
+    ``start``/``end`` object for an ISO datetime. Without a UTC offset the
+    time is local to ``time_zone``; with neither, Google keeps the event's
+    current time zone.
+    """
+    when: Dict[str, Any] = {'dateTime': value}
+    if time_zone and not _OFFSET_RE.search(value):
+        when['timeZone'] = time_zone
+    return when
+
+def patch_body(update: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    ``events.patch`` body for the given ``summary``/``description``/
+    ``location``/``start_time``/``end_time``/``time_zone`` values; None
+    means unchanged
+    """
+    body: Dict[str, Any] = {}
+    for field in ('summary', 'description', 'location'):
+        if update.get(field) is not None:
+            body[field] = update[field]
+    if update.get('start_time') is not None:
+        body['start'] = event_time(update['start_time'], update.get('time_zone'))
+    if update.get('end_time') is not None:
+        body['end'] = event_time(update['end_time'], update.get('time_zone'))
+    return body
 
 class GoogleCalendarManager:
-    def __init__(self, service_account_file: str = "service_account.json"):
+    def __init__(self, service_account_file: str = "service_account.json",
+                 service_pool: Optional[CalendarServicePool] = None,
+                 event_cache: Optional[EventCache] = None,
+                 watch_manager: Optional[CalendarWatchManager] = None):
         """
-        Initialize Google Calendar manager with service account credentials
+        Initialize Google Calendar manager with service account credentials.
+
+        The service account is only authenticated the first time a call is
+        made without a user access token, so constructing the manager does
+        no file/env reads or network setup.
         """
         self.service_account_file = service_account_file
         self.service: Optional[Any] = None
-        self._authenticate()
+        self._auth_lock = threading.Lock()
+        # Per-user services are pooled by token instead of replacing self.service
+        self.service_pool = service_pool or CalendarServicePool()
+        # Local, sync-token backed copy of each user's events for read paths;
+        # EVENT_CACHE_ENABLED=0 makes every read go to Google
+        if event_cache is None and os.environ.get("EVENT_CACHE_ENABLED", "1") != "0":
+            event_cache = EventCache()
+        self.event_cache = event_cache
+        # Push channels keep the event cache fresh without polling when
+        # CALENDAR_WEBHOOK_URL is set
+        if watch_manager is None and event_cache is not None:
+            watch_manager = CalendarWatchManager(event_cache)
+        self.watch_manager = watch_manager if watch_manager is not None and watch_manager.enabled else None
+        # Fetches the next events.list page while iter_events callers read the current one
+        self._prefetch = ThreadPoolExecutor(max_workers=int(os.environ.get("CALENDAR_PREFETCH_WORKERS", 4)),
+                                            thread_name_prefix="calendar-prefetch")
     
     def _authenticate(self):
         """
@@ -29,82 +115,145 @@ class GoogleCalendarManager:
                 service_account_info = json.loads(service_account_json)
                 credentials = service_account.Credentials.from_service_account_info(
                     service_account_info,
-                    scopes=['https://www.googleapis.com/auth/calendar']
+                    scopes=CALENDAR_SCOPES
                 )
             else:
                 # Use file
                 credentials = service_account.Credentials.from_service_account_file(
                     self.service_account_file,
-                    scopes=['https://www.googleapis.com/auth/calendar']
+                    scopes=CALENDAR_SCOPES
                 )
             
-            self.service = build('calendar', 'v3', credentials=credentials)
+            self.service = build_calendar_service(credentials, http_factory=self.service_pool.http_factory)
         except Exception as e:
             print(f"Error authenticating with Google Calendar: {e}")
             raise
     
     def set_user_access_token(self, access_token: str):
         """
-        Set the service to use a user's OAuth access token
+        Warm the pooled service for a user's OAuth access token.
+
+        The shared ``self.service`` is no longer swapped; every call resolves
+        its own client through ``_get_service``.
         """
         if not access_token:
-            return
+            return None
         try:
-            credentials = Credentials(token=access_token, scopes=['https://www.googleapis.com/auth/calendar'])
-            self.service = build('calendar', 'v3', credentials=credentials)
+            return self.service_pool.get(access_token)
         except Exception as e:
             print(f"Error authenticating with user access token: {e}")
             raise
 
-    def get_upcoming_events(self, max_results: int = 10, access_token: str = "") -> List[Dict[str, Any]]:
+    def _get_service(self, access_token: str = ""):
         """
-        Get upcoming calendar events
+        Return the user's pooled service, or the service account one
         """
         if access_token:
-            self.set_user_access_token(access_token)
+            return self.set_user_access_token(access_token)
         if self.service is None:
-            raise Exception("Google Calendar service not initialized")
-            
+            with self._auth_lock:
+                if self.service is None:
+                    self._authenticate()
+        return self.service
+
+    def _user_key(self, access_token: str = "") -> str:
+        return user_keys.resolve(access_token, lookup=self.account_id)
+
+    def account_id(self, access_token: str = "") -> str:
+        """
+        Id of the account behind ``access_token``: its primary calendar's
+        id, which is the account email
+        """
+        service = self._get_service(access_token)
+        return service.calendars().get(calendarId='primary', fields='id').execute()['id']
+
+    def calendar_time_zone(self, access_token: str = "") -> Optional[str]:
+        """
+        IANA timezone of the user's primary calendar, looked up once a day
+        per user and kept in shared state; None if it cannot be read
+        """
+        user_key = self._user_key(access_token)
+        cached = shared_state.get(f"timezone:{user_key}")
+        if cached is not None:
+            return cached or None
+        service = self._get_service(access_token)
         try:
-            now = datetime.utcnow().isoformat() + 'Z'
-            end_time = (datetime.utcnow() + timedelta(days=7)).isoformat() + 'Z'
-            
-            calendar_id = 'primary'
-            
-            events_result = self.service.events().list(
-                calendarId=calendar_id,
-                timeMin=now,
-                timeMax=end_time,
-                maxResults=max_results,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
+            zone = service.calendars().get(calendarId='primary', fields='timeZone').execute().get('timeZone') or ''
+        except (HttpError, CalendarApiError) as error:
+            print(f"Error reading calendar timezone: {error}")
+            return None
+        shared_state.set(f"timezone:{user_key}", zone, ttl=86400)
+        return zone or None
+
+    def state_version(self, access_token: str = "") -> Optional[Tuple[Optional[str], int]]:
+        """
+        Version of the user's cached calendar state (sync token, revision),
+        or None if nothing is cached for them yet
+        """
+        if self.event_cache is None:
+            return None
+        store = self.event_cache.peek_store(self._user_key(access_token))
+        if store is None:
+            return None
+        return (store.sync_token, store.revision)
+
+    def _synced_store(self, service, access_token: str) -> Optional[EventStore]:
+        """
+        The user's up-to-date local event store, or None when the cache is
+        disabled or could not be synced. Also starts (or renews) the push
+        channel that keeps it fresh.
+        """
+        if self.event_cache is None:
+            return None
+        user_key = self._user_key(access_token)
+        try:
+            store = self.event_cache.sync(service, user_key)
+        except HttpError as error:
+            print(f"Error syncing event cache: {error}")
+            return None
+        if self.watch_manager is not None:
+            self.watch_manager.ensure(service, user_key)
+        return store
+
+    def _cached_window(self, service, access_token: str, time_min: datetime, time_max: datetime) -> Optional[List[Event]]:
+        """
+        Events overlapping the window from the local event store, or None
+        when the cache is disabled or could not be synced
+        """
+        store = self._synced_store(service, access_token)
+        if store is None or not store.covers(time_max.replace(tzinfo=timezone.utc)):
+            return None
+        return store.window(time_min.replace(tzinfo=timezone.utc), time_max.replace(tzinfo=timezone.utc))
+
+    def get_upcoming_events(self, max_results: int = 10, access_token: str = "", days: int = 7) -> List[Event]:
+        """
+        Get upcoming calendar events
+        """
+        service = self._get_service(access_token)
             
-            events = events_result.get('items', [])
-            return [
-                {
-                    'id': event['id'],
-                    'summary': event.get('summary', 'No title'),
-                    'start': event['start'].get('dateTime', event['start'].get('date')),
-                    'end': event['end'].get('dateTime', event['end'].get('date')),
-                    'description': event.get('description', ''),
-                    'location': event.get('location', '')
-                }
-                for event in events
-            ]
+        try:
+            window_start = datetime.utcnow()
+            window_end = window_start + timedelta(days=days)
+            events = self._cached_window(service, access_token, window_start, window_end)
+            if events is not None:
+                return events[:max_results]
+            # Only as many pages as needed are read
+            return list(itertools.islice(
+                self.iter_events(window_start, window_end, page_size=max_results, access_token=access_token),
+                max_results,
+            ))
         except HttpError as error:
             print(f"Error getting calendar events: {error}")
             return []
     
     def create_event(self, summary: str, start_time: str, end_time: str, 
-                    description: str = "", location: str = "", access_token: str = "") -> Dict[str, Any]:
+                    description: str = "", location: str = "", access_token: str = "",
+                    time_zone: Optional[str] = None) -> Event:
         """
-        Create a new calendar event
+        Create a new calendar event; ``time_zone`` (IANA) is the zone it
+        is shown and repeats in, UTC by default
         """
-        if access_token:
-            self.set_user_access_token(access_token)
-        if self.service is None:
-            raise Exception("Google Calendar service not initialized")
+        service = self._get_service(access_token)
             
         try:
             event = {
@@ -113,29 +262,23 @@ class GoogleCalendarManager:
                 'location': location,
                 'start': {
                     'dateTime': start_time,
-                    'timeZone': 'UTC',
+                    'timeZone': time_zone or 'UTC',
                 },
                 'end': {
                     'dateTime': end_time,
-                    'timeZone': 'UTC',
+                    'timeZone': time_zone or 'UTC',
                 },
             }
             
             calendar_id = 'primary'
             
-            event = self.service.events().insert(
+            event = Event.from_api(service.events().insert(
                 calendarId=calendar_id,
                 body=event
-            ).execute()
-            
-            return {
-                'id': event['id'],
-                'summary': event['summary'],
-                'start': event['start']['dateTime'],
-                'end': event['end']['dateTime'],
-                'description': event.get('description', ''),
-                'location': event.get('location', '')
-            }
+            ).execute())
+            if self.event_cache is not None:
+                self.event_cache.record_upsert(self._user_key(access_token), event)
+            return event
         except HttpError as error:
             print(f"Error creating calendar event: {error}")
             raise
@@ -144,136 +287,434 @@ class GoogleCalendarManager:
         """
         Delete a calendar event
         """
-        if access_token:
-            self.set_user_access_token(access_token)
-        if self.service is None:
-            raise Exception("Google Calendar service not initialized")
+        service = self._get_service(access_token)
             
         try:
             calendar_id = 'primary'
-            self.service.events().delete(
+            service.events().delete(
                 calendarId=calendar_id,
                 eventId=event_id
             ).execute()
+            if self.event_cache is not None:
+                self.event_cache.record_delete(self._user_key(access_token), event_id)
             return True
         except HttpError as error:
             print(f"Error deleting calendar event: {error}")
             return False
     
-    def update_event(self, event_id: str, access_token: str = "", **kwargs) -> Dict[str, Any]:
+    def update_event(self, event_id: str, access_token: str = "", etag: Optional[str] = None,
+                     **kwargs) -> Event:
         """
-        Update an existing calendar event
+        Update an existing calendar event.
+
+        Only the given fields are sent, with a single ``events.patch`` call.
+        With ``etag`` the write only applies if the event is unchanged since
+        it was read (``If-Match``); otherwise EventConflictError is raised
+        with the current version of the event.
         """
-        if access_token:
-            self.set_user_access_token(access_token)
-        if self.service is None:
-            raise Exception("Google Calendar service not initialized")
-            
+        service = self._get_service(access_token)
+
         try:
-            calendar_id = 'primary'
-            event = self.service.events().get(
-                calendarId=calendar_id,
-                eventId=event_id
-            ).execute()
-            
-            # Update fields if provided
-            if 'summary' in kwargs:
-                event['summary'] = kwargs['summary']
-            if 'description' in kwargs:
-                event['description'] = kwargs['description']
-            if 'location' in kwargs:
-                event['location'] = kwargs['location']
-            if 'start_time' in kwargs:
-                event['start']['dateTime'] = kwargs['start_time']
-            if 'end_time' in kwargs:
-                event['end']['dateTime'] = kwargs['end_time']
-            
-            updated_event = self.service.events().update(
-                calendarId=calendar_id,
+            request = service.events().patch(
+                calendarId='primary',
                 eventId=event_id,
-                body=event
-            ).execute()
-            
-            return {
-                'id': updated_event['id'],
-                'summary': updated_event['summary'],
-                'start': updated_event['start']['dateTime'],
-                'end': updated_event['end']['dateTime'],
-                'description': updated_event.get('description', ''),
-                'location': updated_event.get('location', '')
-            }
+                body=patch_body(kwargs)
+            )
+            if etag:
+                request.headers['If-Match'] = etag
+            event = Event.from_api(request.execute())
+            if self.event_cache is not None:
+                self.event_cache.record_upsert(self._user_key(access_token), event)
+            return event
         except HttpError as error:
+            if etag and error.resp.status == 412:
+                raise EventConflictError(event_id, etag, self.get_event_by_id(event_id, access_token=access_token))
             print(f"Error updating calendar event: {error}")
             raise
-    
-    def find_event_by_title(self, title: str, access_token: str = "") -> Optional[Dict[str, Any]]:
+
+    def _list_params(self, time_min: Optional[datetime], time_max: Optional[datetime], page_size: int,
+                     query: Optional[str], fields: Optional[List[str]], expand_recurring: bool = True) -> Dict[str, Any]:
+        time_min = as_utc(time_min) if time_min else datetime.now(timezone.utc)
+        params: Dict[str, Any] = {
+            'calendarId': 'primary',
+            'timeMin': time_min.isoformat().replace('+00:00', 'Z'),
+            'maxResults': max(1, min(page_size, PAGE_LIMIT)),
+            'singleEvents': expand_recurring,
+        }
+        if expand_recurring:
+            # Google only orders by start time when series are expanded
+            params['orderBy'] = 'startTime'
+        if time_max:
+            params['timeMax'] = as_utc(time_max).isoformat().replace('+00:00', 'Z')
+        if query:
+            params['q'] = query
+        if fields:
+            # Our field names (EVENT_FIELDS) are the API's own; start/end
+            # are needed to order and serialize every event
+            mask = {f for f in fields if f in EVENT_FIELDS} | {'id', 'start', 'end'}
+            if not expand_recurring:
+                mask.add('recurrence')
+            params['fields'] = f"nextPageToken,items({','.join(sorted(mask))})"
+        return params
+
+    def _list_page(self, service, params: Dict[str, Any]) -> Tuple[List[Event], Optional[str]]:
+        """
+        One ``events.list`` call: the page's events and the next page token
+        """
+        result = service.events().list(**params).execute()
+        return [Event.from_api(item) for item in result.get('items', [])], result.get('nextPageToken')
+
+    def list_events(self, time_min: Optional[datetime] = None, time_max: Optional[datetime] = None,
+                    page_token: Optional[str] = None, max_results: int = 50, query: Optional[str] = None,
+                    fields: Optional[List[str]] = None, access_token: str = "") -> Dict[str, Any]:
+        """
+        One page of events in start order.
+
+        ``page_token`` continues from a previous page's ``next_page_token``.
+        The token carries the first page's window, query and fields, and
+        the other arguments are ignored, because Google only continues a
+        listing with the parameters that started it. ``fields`` (names from
+        EVENT_FIELDS) limits what Google sends; pass the same list to
+        ``Event.to_dict`` when serializing. Raises ValueError for a token
+        that is not one of ours.
+        """
+        service = self._get_service(access_token)
+        if page_token:
+            params = self._decode_cursor(page_token)
+        else:
+            params = self._list_params(time_min, time_max, max_results, query, fields)
+        events, next_page_token = self._list_page(service, params)
+        cursor = self._encode_cursor(dict(params, pageToken=next_page_token)) if next_page_token else None
+        return {'events': events, 'next_page_token': cursor}
+
+    @staticmethod
+    def _encode_cursor(params: Dict[str, Any]) -> str:
+        data = json.dumps(params, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Dict[str, Any]:
+        try:
+            params = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        except ValueError:
+            raise ValueError("Invalid page_token") from None
+        if not isinstance(params, dict) or 'pageToken' not in params or not set(params) <= _CURSOR_PARAMS:
+            raise ValueError("Invalid page_token")
+        return params
+
+    def iter_events(self, time_min: Optional[datetime] = None, time_max: Optional[datetime] = None,
+                    query: Optional[str] = None, expand_recurring: bool = True, page_size: int = PAGE_LIMIT,
+                    fields: Optional[List[str]] = None, access_token: str = "") -> Iterator[Event]:
+        """
+        Every event in the range, following ``nextPageToken`` to the end.
+
+        Pages are requested lazily: nothing is fetched until the first
+        event is consumed, and the next page is fetched in the background
+        while the caller works through the current one, so at most two
+        pages are held however long the range. ``query`` is Google's
+        free-text search (``q``). With ``expand_recurring=False`` each
+        recurring series is yielded once, with its ``recurrence`` rules,
+        instead of once per instance (and not in start order).
+        """
+        service = self._get_service(access_token)
+        params = self._list_params(time_min, time_max, page_size, query, fields, expand_recurring)
+
+        def fetch(page_token: Optional[str]):
+            return self._list_page(service, dict(params, pageToken=page_token) if page_token else params)
+
+        upcoming = None
+        try:
+            events, page_token = fetch(None)
+            while True:
+                if page_token:
+                    # Runs in a copy of this context so tracing follows the prefetch
+                    upcoming = self._prefetch.submit(contextvars.copy_context().run, fetch, page_token)
+                yield from events
+                if upcoming is None:
+                    return
+                events, page_token = upcoming.result()
+                upcoming = None
+        finally:
+            # The caller stopped early: don't fetch a page nobody reads
+            if upcoming is not None:
+                upcoming.cancel()
+
+    def find_event_by_title(self, title: str, access_token: str = "") -> Optional[ScoredEvent]:
         """
         Find an event by its title (case-insensitive partial match)
         """
-        if access_token:
-            self.set_user_access_token(access_token)
-        if self.service is None:
-            raise Exception("Google Calendar service not initialized")
-            
+        matches = self.search_events_by_title(title, access_token=access_token, limit=1)
+        return matches[0] if matches else None
+
+    def search_events_by_title(self, title: str, access_token: str = "", days: int = 30,
+                               limit: int = 5, min_score: float = 0.3) -> List[ScoredEvent]:
+        """
+        Ranked fuzzy title matches in the next ``days`` days, best first.
+        Each result carries a ``score`` between 0 and 1.
+        """
+        service = self._get_service(access_token)
+        window_start = datetime.utcnow().replace(tzinfo=timezone.utc)
+        window_end = window_start + timedelta(days=days)
+
         try:
-            now = datetime.utcnow().isoformat() + 'Z'
-            end_time = (datetime.utcnow() + timedelta(days=30)).isoformat() + 'Z'
-            
-            calendar_id = 'primary'
-            
-            events_result = self.service.events().list(
-                calendarId=calendar_id,
-                timeMin=now,
-                timeMax=end_time,
-                maxResults=50,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
+            store = self._synced_store(service, access_token)
+            if store is not None and store.covers(window_end):
+                matches = store.search_titles(title, window_start, window_end, limit=limit, min_score=min_score)
+            else:
+                # No cache, or the window reaches past it: index just this window's events for the lookup
+                events = {event.id: event for event in self.iter_events(window_start, window_end, access_token=access_token)}
+                index = TitleIndex()
+                for event in events.values():
+                    index.add(event.id, event.summary)
+                # Listed in start order and the sort is stable, so ties go earliest first
+                order = {event_id: i for i, event_id in enumerate(events)}
+                ranked = sorted(index.search(title, limit=None, min_score=min_score), key=lambda match: (-match[1], order[match[0]]))
+                return [ScoredEvent(events[event_id], score) for event_id, score in ranked[:limit]]
+
+            return [ScoredEvent(event, score) for event, score in matches]
+        except HttpError as error:
+            print(f"Error searching events by title: {error}")
+            return []
+
+    def find_events_by_title(self, title: str, access_token: str = "", days: int = 30) -> List[Event]:
+        """
+        Find all events in the next ``days`` days whose title contains
+        ``title`` (case-insensitive)
+        """
+        service = self._get_service(access_token)
             
-            events = events_result.get('items', [])
+        try:
+            window_start = datetime.utcnow()
+            window_end = window_start + timedelta(days=days)
+            events = self._cached_window(service, access_token, window_start, window_end)
+            if events is None:
+                # Every page of the window, not just the first
+                events = self.iter_events(window_start, window_end, access_token=access_token)
             title_lower = title.lower()
-            
-            for event in events:
-                event_title = event.get('summary', '').lower()
-                if title_lower in event_title or event_title in title_lower:
-                    return {
-                        'id': event['id'],
-                        'summary': event.get('summary', 'No title'),
-                        'start': event['start'].get('dateTime', event['start'].get('date')),
-                        'end': event['end'].get('dateTime', event['end'].get('date')),
-                        'description': event.get('description', ''),
-                        'location': event.get('location', '')
-                    }
-            
-            return None
+            return [event for event in events if title_lower in event.summary.lower()]
         except HttpError as error:
             print(f"Error finding event by title: {error}")
-            return None
+            return []
 
-    def get_event_by_id(self, event_id: str, access_token: str = "") -> Optional[Dict[str, Any]]:
+    def get_event_by_id(self, event_id: str, access_token: str = "") -> Optional[Event]:
         """
         Get a specific event by its ID
         """
-        if access_token:
-            self.set_user_access_token(access_token)
-        if self.service is None:
-            raise Exception("Google Calendar service not initialized")
+        service = self._get_service(access_token)
             
         try:
             calendar_id = 'primary'
-            event = self.service.events().get(
+            return Event.from_api(service.events().get(
                 calendarId=calendar_id,
                 eventId=event_id
-            ).execute()
-            
-            return {
-                'id': event['id'],
-                'summary': event.get('summary', 'No title'),
-                'start': event['start'].get('dateTime', event['start'].get('date')),
-                'end': event['end'].get('dateTime', event['end'].get('date')),
-                'description': event.get('description', ''),
-                'location': event.get('location', '')
-            }
+            ).execute())
         except HttpError as error:
             print(f"Error getting event by ID: {error}")
-            return None 
\ No newline at end of file
+            return None
+
+    def query_free_busy(self, calendar_ids: List[str], time_min: datetime, time_max: datetime,
+                        access_token: str = "") -> Tuple[Dict[str, List[Tuple[datetime, datetime]]], Dict[str, str]]:
+        """
+        Busy intervals per calendar (or attendee address) from
+        ``freebusy.query``, plus an error reason for calendars Google
+        could not report on
+        """
+        service = self._get_service(access_token)
+        time_min, time_max = as_utc(time_min), as_utc(time_max)
+        busy: Dict[str, List[Tuple[datetime, datetime]]] = {}
+        errors: Dict[str, str] = {}
+        for offset in range(0, len(calendar_ids), FREEBUSY_LIMIT):
+            chunk = calendar_ids[offset:offset + FREEBUSY_LIMIT]
+            try:
+                result = service.freebusy().query(body={
+                    'timeMin': time_min.isoformat().replace('+00:00', 'Z'),
+                    'timeMax': time_max.isoformat().replace('+00:00', 'Z'),
+                    'timeZone': 'UTC',
+                    'items': [{'id': calendar_id} for calendar_id in chunk],
+                }).execute()
+            except HttpError as error:
+                print(f"Error querying free/busy: {error}")
+                for calendar_id in chunk:
+                    errors[calendar_id] = str(error)
+                continue
+            for calendar_id, info in result.get('calendars', {}).items():
+                if info.get('errors'):
+                    errors[calendar_id] = ", ".join(e.get('reason', 'unknown') for e in info['errors'])
+                busy[calendar_id] = [
+                    (parse_event_time({'dateTime': period['start']}), parse_event_time({'dateTime': period['end']}))
+                    for period in info.get('busy', [])
+                ]
+        return busy, errors
+
+    def _execute_batch(self, service, requests: List[Tuple[str, Any]],
+                       access_token: str = "") -> Dict[str, Tuple[Any, Optional[Exception]]]:
+        """
+        Execute ``(request_id, request)`` pairs through the HTTP batch
+        endpoint, BATCH_LIMIT calls per round trip.
+
+        Every call in a batch counts against the quota, so a batch is
+        admitted by the API scheduler at its size. Calls Google answered
+        with a rate limit or a 5xx are retried in a later batch; those
+        still failing get a typed CalendarApiError.
+        """
+        results: Dict[str, Tuple[Any, Optional[Exception]]] = {}
+        user_key = self._user_key(access_token)
+
+        def callback(request_id, response, exception):
+            results[request_id] = (response, exception)
+
+        pending = requests
+        attempt = 0
+        while pending:
+            for offset in range(0, len(pending), BATCH_LIMIT):
+                batch = service.new_batch_http_request(callback=callback)
+                chunk = pending[offset:offset + BATCH_LIMIT]
+                for request_id, request in chunk:
+                    batch.add(request, request_id=request_id)
+                with telemetry.span("google_api", "calendar.batch", calls=len(chunk)):
+                    api_scheduler.execute(user_key, "calendar.batch", batch.execute, cost=len(chunk))
+            failed = [(request_id, request) for request_id, request in pending
+                      if isinstance(results.get(request_id, (None, None))[1], HttpError)
+                      and is_retryable(results[request_id][1])]
+            delay = None
+            if failed and attempt < api_scheduler.max_retries:
+                # One backoff (and one rate decrease) for the whole batch
+                delay = api_scheduler.retry_delay(user_key, results[failed[0][0]][1], attempt)
+            if delay is None:
+                for request_id, _ in failed:
+                    results[request_id] = (None, api_scheduler.typed_error(results[request_id][1]))
+                break
+            api_scheduler.retries.inc(len(failed), method="calendar.batch")
+            time.sleep(delay)
+            attempt += 1
+            pending = failed
+        return results
+
+    def batch_get(self, event_ids: List[str], access_token: str = "") -> Dict[str, Optional[Event]]:
+        """
+        Get several events by ID; missing or failed events map to None
+        """
+        service = self._get_service(access_token)
+        calendar_id = 'primary'
+        requests = [
+            (str(i), service.events().get(calendarId=calendar_id, eventId=event_id))
+            for i, event_id in enumerate(event_ids)
+        ]
+        results = self._execute_batch(service, requests, access_token=access_token)
+
+        events: Dict[str, Optional[Event]] = {}
+        for i, event_id in enumerate(event_ids):
+            event, error = results.get(str(i), (None, None))
+            if error is not None or event is None:
+                if error is not None:
+                    print(f"Error getting event {event_id} in batch: {error}")
+                events[event_id] = None
+                continue
+            events[event_id] = Event.from_api(event)
+        return events
+
+    def batch_delete(self, event_ids: List[str], access_token: str = "") -> Dict[str, bool]:
+        """
+        Delete several events; maps each ID to whether it was deleted
+        """
+        service = self._get_service(access_token)
+        calendar_id = 'primary'
+        requests = [
+            (str(i), service.events().delete(calendarId=calendar_id, eventId=event_id))
+            for i, event_id in enumerate(event_ids)
+        ]
+        results = self._execute_batch(service, requests, access_token=access_token)
+
+        deleted: Dict[str, bool] = {}
+        user_key = self._user_key(access_token)
+        for i, event_id in enumerate(event_ids):
+            _, error = results.get(str(i), (None, Exception("No response in batch")))
+            if error is not None:
+                print(f"Error deleting event {event_id} in batch: {error}")
+            elif self.event_cache is not None:
+                self.event_cache.record_delete(user_key, event_id)
+            deleted[event_id] = error is None
+        return deleted
+
+    def batch_update(self, updates: List[Dict[str, Any]], access_token: str = "") -> Dict[str, Optional[Event]]:
+        """
+        Update several events in one round trip.
+
+        Each update is a dict with ``event_id`` plus any of ``summary``,
+        ``description``, ``location``, ``start_time`` and ``end_time``. Only
+        the given fields are sent (``events.patch``), so no prior read is needed.
+        """
+        service = self._get_service(access_token)
+        calendar_id = 'primary'
+        requests = []
+        for i, update in enumerate(updates):
+            requests.append((str(i), service.events().patch(
+                calendarId=calendar_id,
+                eventId=update['event_id'],
+                body=patch_body(update)
+            )))
+        results = self._execute_batch(service, requests, access_token=access_token)
+
+        updated: Dict[str, Optional[Event]] = {}
+        user_key = self._user_key(access_token)
+        for i, update in enumerate(updates):
+            event_id = update['event_id']
+            event, error = results.get(str(i), (None, None))
+            if error is not None or event is None:
+                if error is not None:
+                    print(f"Error updating event {event_id} in batch: {error}")
+                updated[event_id] = None
+                continue
+            event = Event.from_api(event)
+            if self.event_cache is not None:
+                self.event_cache.record_upsert(user_key, event)
+            updated[event_id] = event
+        return updated
+
+    def list_ical_uids(self, access_token: str = "") -> Set[str]:
+        """
+        iCalendar UIDs of every event on the calendar (recurring series
+        once), for deduplicating imports. Only the UIDs are requested.
+        """
+        service = self._get_service(access_token)
+        params: Dict[str, Any] = {
+            'calendarId': 'primary',
+            'maxResults': PAGE_LIMIT,
+            'fields': 'nextPageToken,items(iCalUID)',
+        }
+        uids: Set[str] = set()
+        while True:
+            result = service.events().list(**params).execute()
+            uids.update(item['iCalUID'] for item in result.get('items', []) if item.get('iCalUID'))
+            if not result.get('nextPageToken'):
+                return uids
+            params['pageToken'] = result['nextPageToken']
+
+    def import_events(self, bodies: List[Dict[str, Any]],
+                      access_token: str = "") -> List[Tuple[Optional[Event], Optional[Exception]]]:
+        """
+        Add events given as API bodies, each with an ``iCalUID``, through
+        batched ``events.import`` calls. Google keeps one event per UID, so
+        importing a UID again updates that event instead of duplicating it.
+        Returns ``(event, error)`` per body, in order.
+        """
+        service = self._get_service(access_token)
+        calendar_id = 'primary'
+        requests = [
+            (str(i), service.events().import_(calendarId=calendar_id, body=body))
+            for i, body in enumerate(bodies)
+        ]
+        results = self._execute_batch(service, requests, access_token=access_token)
+
+        imported: List[Tuple[Optional[Event], Optional[Exception]]] = []
+        user_key = self._user_key(access_token)
+        for i in range(len(bodies)):
+            item, error = results.get(str(i), (None, Exception("No response in batch")))
+            if error is not None or item is None:
+                imported.append((None, error or Exception("Empty response in batch")))
+                continue
+            event = Event.from_api(item)
+            if self.event_cache is not None:
+                self.event_cache.record_upsert(user_key, event)
+            imported.append((event, None))
+        return imported
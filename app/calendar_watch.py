@@ -0,0 +1,280 @@
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from googleapiclient.errors import HttpError
+
+from app.api_scheduler import CalendarApiError
+from app.event_cache import EventCache
+from app.shared_state import shared_state
+
+
+@dataclass
+class WatchChannel:
+    channel_id: str
+    resource_id: str
+    user_key: str
+    calendar_id: str
+    expiration: float
+    # Pooled Calendar service of the user, reused for renewal and syncing
+    service: Any = None
+    # When ``service`` last came with a request, i.e. how fresh its token is
+    service_at: float = 0.0
+
+
+class CalendarWatchManager:
+    def __init__(self, event_cache: EventCache, address: Optional[str] = None, ttl: Optional[float] = None,
+                 renew_margin: Optional[float] = None, token: Optional[str] = None,
+                 token_lifetime: Optional[float] = None):
+        """
+        ``events.watch`` push channels feeding the event cache.
+
+        While a user's calendar has a live channel, reads are served from
+        the local store without an incremental sync; a notification marks
+        the store stale (and the webhook refreshes it in the background).
+        Channels are renewed ``renew_margin`` seconds before they expire
+        and stopped on shutdown. With a distributed SHARED_STATE_URL the
+        channel registry is shared, so one worker opens the channel and
+        any worker can take its notifications. Without
+        CALENDAR_WEBHOOK_URL (a public HTTPS address for
+        POST /calendar/notifications) nothing is watched and the cache
+        keeps polling.
+
+        Channels are keyed by the user's account, so a refreshed access
+        token reuses the channel. The channel keeps the service from the
+        latest request. Once that token is older than ``token_lifetime``,
+        the channel is not renewed and lapses, and the next request opens
+        a new one.
+        """
+        self.event_cache = event_cache
+        self.address = address if address is not None else os.environ.get("CALENDAR_WEBHOOK_URL", "")
+        self.ttl = ttl or float(os.environ.get("CALENDAR_WATCH_TTL_SECONDS", 86400))
+        self.renew_margin = renew_margin or float(os.environ.get("CALENDAR_WATCH_RENEW_MARGIN_SECONDS", 3600))
+        self.token_lifetime = token_lifetime or float(os.environ.get("CALENDAR_WATCH_TOKEN_LIFETIME_SECONDS", 3300))
+        self._token = token or os.environ.get("CALENDAR_WEBHOOK_TOKEN") or None
+        self._lock = threading.Lock()
+        self._channels: Dict[str, WatchChannel] = {}
+        self._by_calendar: Dict[Tuple[str, str], str] = {}
+        self._pending: set = set()
+        # Expirations of channels other workers opened, from shared state
+        self._remote: Dict[Tuple[str, str], float] = {}
+        self._counters = {"created": 0, "renewed": 0, "stopped": 0, "failures": 0,
+                          "notifications": 0, "rejected": 0, "unknown_channel": 0, "lapsed": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.address)
+
+    @property
+    def token(self) -> str:
+        """
+        Secret echoed back by Google in X-Goog-Channel-Token so forged
+        posts can be rejected. Without CALENDAR_WEBHOOK_TOKEN, one is
+        generated, and with distributed shared state every worker uses
+        the same one, since any worker may receive another's notifications.
+        """
+        if self._token is None:
+            generated = secrets.token_urlsafe(24)
+            if shared_state.distributed:
+                generated = shared_state.setdefault("watch-token", generated)
+            self._token = generated
+        return self._token
+
+    def _stale(self, channel: WatchChannel) -> bool:
+        """
+        Whether the channel's access token has probably expired
+        """
+        return time.time() - channel.service_at > self.token_lifetime
+
+    def ensure(self, service, user_key: str, calendar_id: str = 'primary') -> Optional[WatchChannel]:
+        """
+        Make sure a live channel covers the calendar, creating or renewing
+        it if needed. Cheap when the channel is healthy; errors are logged
+        and leave the calendar on polling.
+        """
+        if not self.enabled:
+            return None
+        key = (user_key, calendar_id)
+        with self._lock:
+            channel = self._channels.get(self._by_calendar.get(key, ""))
+            if channel is not None:
+                # Keep the freshest service (and so access token) for renewals
+                channel.service = service
+                channel.service_at = time.time()
+                if channel.expiration - time.time() > self.renew_margin:
+                    return channel
+            if key in self._pending:
+                return channel
+            if channel is None and self._remote.get(key, 0) - time.time() > self.renew_margin:
+                return None
+            self._pending.add(key)
+        try:
+            if channel is None and self._remote_channel(user_key, calendar_id):
+                return None
+            return self._create(service, user_key, calendar_id, replacing=channel)
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def _remote_channel(self, user_key: str, calendar_id: str) -> bool:
+        """
+        Whether another worker already has a live channel for the calendar
+        """
+        if not shared_state.distributed:
+            return False
+        data = shared_state.get(f"watch:{user_key}:{calendar_id}")
+        expiration = json.loads(data)["expiration"] if data else 0.0
+        if expiration - time.time() <= self.renew_margin:
+            return False
+        with self._lock:
+            self._remote[(user_key, calendar_id)] = expiration
+        self.event_cache.set_watched(user_key, expiration, calendar_id)
+        return True
+
+    def _create(self, service, user_key: str, calendar_id: str,
+                replacing: Optional[WatchChannel] = None) -> Optional[WatchChannel]:
+        body = {
+            'id': uuid.uuid4().hex,
+            'type': 'web_hook',
+            'address': self.address,
+            'token': self.token,
+            'params': {'ttl': str(int(self.ttl))},
+        }
+        try:
+            result = service.events().watch(calendarId=calendar_id, body=body).execute()
+        except (HttpError, CalendarApiError) as error:
+            print(f"Error creating calendar watch channel: {error}")
+            with self._lock:
+                self._counters["failures"] += 1
+            return None
+        expiration = int(result.get('expiration', 0)) / 1000 or time.time() + self.ttl
+        channel = WatchChannel(body['id'], result['resourceId'], user_key, calendar_id, expiration, service, time.time())
+        with self._lock:
+            self._channels[channel.channel_id] = channel
+            self._by_calendar[(user_key, calendar_id)] = channel.channel_id
+            self._counters["renewed" if replacing is not None else "created"] += 1
+        self.event_cache.set_watched(user_key, expiration, calendar_id)
+        if shared_state.distributed:
+            # Lets other workers skip opening their own channel and
+            # recognise this one's notifications
+            ttl = expiration - time.time()
+            shared_state.set(f"watch:{user_key}:{calendar_id}", json.dumps({
+                "channel_id": channel.channel_id, "expiration": expiration}), ttl=ttl)
+            shared_state.set(f"watch-channel:{channel.channel_id}", json.dumps({
+                "user_key": user_key, "calendar_id": calendar_id, "resource_id": channel.resource_id}), ttl=ttl)
+        if replacing is not None:
+            # The new channel is live, so the old one can go; Google does
+            # not renew channels in place
+            self.stop(replacing, forget_calendar=False)
+        return channel
+
+    def stop(self, channel: WatchChannel, forget_calendar: bool = True):
+        with self._lock:
+            self._channels.pop(channel.channel_id, None)
+            if forget_calendar and self._by_calendar.get((channel.user_key, channel.calendar_id)) == channel.channel_id:
+                del self._by_calendar[(channel.user_key, channel.calendar_id)]
+        if forget_calendar:
+            self.event_cache.set_watched(channel.user_key, 0.0, channel.calendar_id)
+        if shared_state.distributed:
+            shared_state.delete(f"watch-channel:{channel.channel_id}")
+            if forget_calendar:
+                shared_state.delete(f"watch:{channel.user_key}:{channel.calendar_id}")
+        if self._stale(channel):
+            # channels.stop would be rejected with the expired token; the
+            # channel lapses at its expiration instead
+            with self._lock:
+                self._counters["lapsed"] += 1
+            return
+        try:
+            channel.service.channels().stop(body={'id': channel.channel_id, 'resourceId': channel.resource_id}).execute()
+            with self._lock:
+                self._counters["stopped"] += 1
+        except (HttpError, CalendarApiError) as error:
+            # Expired or already stopped; it lapses on its own
+            print(f"Error stopping calendar watch channel: {error}")
+
+    def handle_notification(self, headers: Mapping[str, str]) -> Tuple[bool, Optional[WatchChannel]]:
+        """
+        Process a webhook delivery: ``(authentic, channel)``. The channel is
+        returned only for change notifications that need a refresh.
+        """
+        token = headers.get('x-goog-channel-token', '')
+        if not hmac.compare_digest(token.encode(), self.token.encode()):
+            with self._lock:
+                self._counters["rejected"] += 1
+            return False, None
+        channel_id = headers.get('x-goog-channel-id', '')
+        resource_id = headers.get('x-goog-resource-id', '')
+        with self._lock:
+            channel = self._channels.get(channel_id)
+        if channel is not None:
+            user_key, calendar_id = channel.user_key, channel.calendar_id
+            known = channel.resource_id == resource_id
+        else:
+            # Opened by another worker: mark the calendar changed for
+            # everyone; the owner's service is not available to sync here
+            data = shared_state.get(f"watch-channel:{channel_id}") if shared_state.distributed else None
+            remote = json.loads(data) if data else {}
+            user_key, calendar_id = remote.get("user_key"), remote.get("calendar_id")
+            known = bool(remote) and remote.get("resource_id") == resource_id
+        with self._lock:
+            self._counters["notifications" if known else "unknown_channel"] += 1
+        # "sync" is the handshake sent when the channel is created
+        if not known or headers.get('x-goog-resource-state') == 'sync':
+            return True, None
+        self.event_cache.mark_changed(user_key, calendar_id)
+        return True, channel
+
+    def refresh(self, channel: WatchChannel):
+        """
+        Pull the changes a notification announced into the local store
+        """
+        try:
+            self.event_cache.sync(channel.service, channel.user_key, channel.calendar_id, force=True)
+        except (HttpError, CalendarApiError) as error:
+            # The store stays stale, so the next read retries the sync
+            print(f"Error refreshing event cache after notification: {error}")
+
+    def renew_due(self) -> int:
+        """
+        Renew channels that expire within the renewal margin. Channels that
+        cannot be renewed are dropped and their calendars fall back to
+        polling. That covers a failed renewal, or a token that has expired
+        because the user made no request since.
+        """
+        now = time.time()
+        with self._lock:
+            due = [channel for channel in self._channels.values() if channel.expiration - now <= self.renew_margin]
+        renewed = 0
+        for channel in due:
+            if not self._stale(channel) and self.ensure(channel.service, channel.user_key, channel.calendar_id) is not None:
+                renewed += 1
+            else:
+                self.stop(channel)
+        return renewed
+
+    def stop_all(self):
+        with self._lock:
+            channels = list(self._channels.values())
+        for channel in channels:
+            self.stop(channel)
+
+    def channels(self) -> List[WatchChannel]:
+        with self._lock:
+            return list(self._channels.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "channels": len(self._channels),
+                "ttl_seconds": self.ttl,
+                "renew_margin_seconds": self.renew_margin,
+                **self._counters,
+            }
@@ -0,0 +1,305 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from app.shared_state import SharedState, shared_state
+
+# Words that only make sense with earlier turns ("move it to 4pm")
+_REFERENCE_RE = re.compile(
+    r"\b(?:it|its|that|those|these|them|they|there|same|again|instead|also|another|ones|previous)\b"
+    r"|\bthis\b(?!\s+(?:week|weekend|month|year|morning|afternoon|evening))",
+    re.IGNORECASE,
+)
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (about four characters per token) for budgeting
+    """
+    return max(1, len(text) // 4)
+
+
+def is_self_contained(text: str) -> bool:
+    """
+    Whether a prompt can be understood without the conversation so far
+    """
+    return not _REFERENCE_RE.search(text)
+
+
+@dataclass
+class Turn:
+    role: str
+    content: str
+    tokens: int = 0
+
+
+@dataclass
+class Conversation:
+    summary: str = ""
+    turns: Deque[Turn] = field(default_factory=deque)
+    revision: int = 0
+    last_access: float = 0.0
+
+    @property
+    def tokens(self) -> int:
+        return sum(turn.tokens for turn in self.turns)
+
+    def to_json(self) -> str:
+        return json.dumps({"summary": self.summary, "revision": self.revision,
+                           "turns": [asdict(turn) for turn in self.turns]})
+
+    @classmethod
+    def from_json(cls, data: str) -> "Conversation":
+        raw = json.loads(data)
+        return cls(summary=raw.get("summary", ""), revision=raw.get("revision", 0),
+                   turns=deque(Turn(**turn) for turn in raw.get("turns", [])))
+
+
+def extractive_summary(summary: str, turns: List[Turn], budget: int) -> str:
+    """
+    Fold ``turns`` into ``summary`` by keeping the first sentence of each,
+    dropping the oldest lines once the summary exceeds ``budget`` tokens
+    """
+    lines = [line for line in summary.split("\n") if line]
+    for turn in turns:
+        first = _SENTENCE_RE.split(turn.content.strip(), maxsplit=1)[0]
+        if len(first) > 200:
+            first = first[:197] + "..."
+        lines.append(f"{turn.role}: {first}")
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > budget:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class SQLiteConversationBackend:
+    # Other processes may write the same file, so reads must not trust the
+    # in-memory copy
+    shared = True
+
+    def __init__(self, path: str):
+        """
+        Conversations persisted as one JSON row per session. The connection
+        is opened lazily per process, so a pre-fork server can import this
+        in its master.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+
+    def _connection(self):
+        if self._db is None or self._pid != os.getpid():
+            import sqlite3
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+            self._pid = os.getpid()
+            with self._db:
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS conversations ("
+                    "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+                )
+        return self._db
+
+    def load(self, session_id: str) -> Optional[Conversation]:
+        with self._lock:
+            row = self._connection().execute("SELECT data FROM conversations WHERE session_id = ?", (session_id,)).fetchone()
+        return Conversation.from_json(row[0]) if row else None
+
+    def save(self, session_id: str, data: str):
+        with self._lock:
+            db = self._connection()
+            with db:
+                db.execute(
+                    "INSERT INTO conversations (session_id, data, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(session_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                    (session_id, data, time.time()),
+                )
+
+    def delete(self, session_id: str):
+        with self._lock:
+            db = self._connection()
+            with db:
+                db.execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class SharedStateConversationBackend:
+    shared = True
+
+    def __init__(self, state: SharedState, ttl: float):
+        """
+        Conversations kept in the shared state backend so every worker
+        sees the same history; idle sessions expire after ``ttl``
+        """
+        self.state = state
+        self.ttl = ttl
+
+    def load(self, session_id: str) -> Optional[Conversation]:
+        data = self.state.get(f"conversation:{session_id}")
+        return Conversation.from_json(data) if data else None
+
+    def save(self, session_id: str, data: str):
+        self.state.set(f"conversation:{session_id}", data, ttl=self.ttl)
+
+    def delete(self, session_id: str):
+        self.state.delete(f"conversation:{session_id}")
+
+    def close(self):
+        pass
+
+
+class ConversationStore:
+    def __init__(self, max_sessions: Optional[int] = None, idle_ttl: Optional[float] = None,
+                 token_budget: Optional[int] = None, summary_budget: Optional[int] = None,
+                 db_path: Optional[str] = None,
+                 summarizer: Optional[Callable[[str, List[Turn], int], str]] = None):
+        """
+        Per-session conversation memory for the agent.
+
+        Recent turns are kept verbatim up to ``token_budget`` tokens; older
+        turns are folded into a summary capped at ``summary_budget``, so the
+        context added to a prompt stays bounded however long the
+        conversation runs. Idle sessions are evicted LRU from memory; with
+        ``db_path`` (CONVERSATION_DB_PATH) they are also kept in SQLite and
+        reloaded on the next turn.
+        """
+        self.enabled = os.environ.get("CONVERSATION_MEMORY_ENABLED", "1") != "0"
+        self.max_sessions = max_sessions or int(os.environ.get("CONVERSATION_MAX_SESSIONS", 1000))
+        self.idle_ttl = idle_ttl or float(os.environ.get("CONVERSATION_IDLE_SECONDS", 1800))
+        self.token_budget = token_budget or int(os.environ.get("CONVERSATION_TOKEN_BUDGET", 600))
+        self.summary_budget = summary_budget or int(os.environ.get("CONVERSATION_SUMMARY_BUDGET", 200))
+        db_path = db_path if db_path is not None else os.environ.get("CONVERSATION_DB_PATH", "")
+        if db_path:
+            self.backend = SQLiteConversationBackend(db_path)
+        elif shared_state.distributed:
+            # Several workers: a follow-up may land on a different process
+            self.backend = SharedStateConversationBackend(shared_state, self.idle_ttl)
+        else:
+            self.backend = None
+        self.summarizer = summarizer or extractive_summary
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._counters = {"turns": 0, "compactions": 0, "evictions": 0, "loads": 0}
+
+    def _get(self, session_id: str, create: bool) -> Optional[Conversation]:
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            conversation = self._sessions.get(session_id)
+        if self.backend is not None and (conversation is None or self.backend.shared):
+            # A shared backend may hold turns another worker appended
+            stored = self.backend.load(session_id)
+            if stored is not None and (conversation is None or stored.revision > conversation.revision):
+                with self._lock:
+                    self._counters["loads"] += 1
+                    if session_id in self._sessions:
+                        self._sessions[session_id] = stored
+                conversation = stored
+        if conversation is None and not create:
+            return None
+        with self._lock:
+            conversation = self._sessions.setdefault(session_id, conversation or Conversation())
+            self._sessions.move_to_end(session_id)
+            conversation.last_access = now
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._counters["evictions"] += 1
+        return conversation
+
+    def _evict_idle(self, now: float):
+        while self._sessions:
+            session_id, conversation = next(iter(self._sessions.items()))
+            if now - conversation.last_access < self.idle_ttl:
+                break
+            del self._sessions[session_id]
+            self._counters["evictions"] += 1
+
+    def context(self, session_id: str) -> str:
+        """
+        Summary plus recent turns, formatted for the prompt
+        """
+        if not self.enabled:
+            return ""
+        conversation = self._get(session_id, create=False)
+        if conversation is None:
+            return ""
+        with self._lock:
+            parts = []
+            if conversation.summary:
+                parts.append(f"Summary of earlier conversation:\n{conversation.summary}")
+            if conversation.turns:
+                parts.append("\n".join(f"{turn.role}: {turn.content}" for turn in conversation.turns))
+            return "\n\n".join(parts)
+
+    def context_key(self, session_id: str) -> Optional[str]:
+        """
+        Short digest of the session's context, or None when there is none
+        """
+        context = self.context(session_id)
+        return hashlib.sha256(context.encode("utf-8")).hexdigest()[:16] if context else None
+
+    def build_input(self, session_id: str, content: str) -> str:
+        """
+        Agent input for ``content`` with the conversation so far prepended
+        """
+        context = self.context(session_id)
+        if not context:
+            return content
+        return f"Conversation so far:\n{context}\n\nCurrent request: {content}"
+
+    def append(self, session_id: str, user_text: str, assistant_text: str):
+        """
+        Record one exchange and compact the window back under budget
+        """
+        if not self.enabled:
+            return
+        conversation = self._get(session_id, create=True)
+        with self._lock:
+            for role, text in (("User", user_text), ("Assistant", assistant_text)):
+                conversation.turns.append(Turn(role, text, estimate_tokens(text)))
+            overflow: List[Turn] = []
+            # Keep at least the latest exchange verbatim
+            while len(conversation.turns) > 2 and conversation.tokens > self.token_budget:
+                overflow.append(conversation.turns.popleft())
+            if overflow:
+                conversation.summary = self.summarizer(conversation.summary, overflow, self.summary_budget)
+                self._counters["compactions"] += 1
+            conversation.revision += 1
+            self._counters["turns"] += 1
+            data = conversation.to_json() if self.backend is not None else None
+        if data is not None:
+            self.backend.save(session_id, data)
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        if self.backend is not None:
+            self.backend.delete(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "idle_ttl_seconds": self.idle_ttl,
+                "token_budget": self.token_budget,
+                "summary_budget": self.summary_budget,
+                "persistent": self.backend is not None,
+                "backend": type(self.backend).__name__ if self.backend is not None else None,
+                **self._counters,
+            }
+
+
+conversation_store = ConversationStore()
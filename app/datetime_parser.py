@@ -0,0 +1,277 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.telemetry import telemetry
+
+_ISO_RE = re.compile(
+    r"^\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?(?:Z|[+-]\d{2}:?\d{2})?)?$",
+    re.IGNORECASE,
+)
+_DAY = r"(?P<{name}>today|tonight|tomorrow)"
+_CLOCK = r"(?:(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<meridiem>am|pm|a\.m\.|p\.m\.)?|(?P<named>noon|midnight))"
+# "3 PM today", "tomorrow 10am", "today at 15:30", "at noon tomorrow"
+_DAY_TIME_RE = re.compile(
+    r"^(?:" + _DAY.format(name="day") + r"\s+)?(?:at\s+)?" + _CLOCK
+    + r"(?:\s+" + _DAY.format(name="day_after") + r")?$",
+    re.IGNORECASE,
+)
+_SPACE_RE = re.compile(r"\s+")
+# "this quarter", "next week", "today", "next 30 days"
+_PERIOD = (r"(?:today|tomorrow|(?:(?:this|next|last|current)\s+)?(?:week|month|quarter|year)"
+           r"|(?:the\s+)?(?:next|coming)\s+\d+\s+(?:days?|weeks?))")
+_PERIOD_RE = re.compile(r"^" + _PERIOD + r"$", re.IGNORECASE)
+_TRAILING_PERIOD_RE = re.compile(r"^(?P<rest>.*?)[\s,]*(?:(?:in|for|during|over)\s+)?(?P<period>" + _PERIOD + r")[\s.?!]*$",
+                                 re.IGNORECASE)
+
+
+def normalize_expression(text: str) -> str:
+    return _SPACE_RE.sub(" ", text.strip().lower())
+
+
+def _zone(timezone: Optional[str]):
+    if not timezone:
+        return None
+    from zoneinfo import ZoneInfo
+    return ZoneInfo(timezone)
+
+
+def is_time_zone(name: Optional[str]) -> bool:
+    """
+    Whether ``name`` is an IANA timezone this host knows ("Europe/Berlin")
+    """
+    if not name:
+        return False
+    from zoneinfo import ZoneInfoNotFoundError
+    try:
+        _zone(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+    return True
+
+
+def now_in(timezone: Optional[str]) -> datetime:
+    """
+    The current time in ``timezone``, or in UTC without one
+    """
+    from datetime import timezone as tz
+    return datetime.now(_zone(timezone) or tz.utc)
+
+
+def _add_months(moment: datetime, months: int) -> datetime:
+    index = moment.year * 12 + moment.month - 1 + months
+    return moment.replace(year=index // 12, month=index % 12 + 1)
+
+
+def period_range(text: str, now: datetime) -> Optional[Tuple[datetime, datetime]]:
+    """
+    ``(start, end)`` of a calendar period ("today", "this week", "next
+    month", "this quarter", "last year", "next 30 days") around ``now``,
+    or None if ``text`` is not one. Weeks start on Monday.
+    """
+    text = normalize_expression(text)
+    if not _PERIOD_RE.match(text):
+        return None
+    words = text.split()
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if words[0] in ("today", "tomorrow"):
+        start = midnight + timedelta(days=1 if words[0] == "tomorrow" else 0)
+        return start, start + timedelta(days=1)
+    if len(words) > 1 and words[-2].isdigit():
+        count = int(words[-2]) * (7 if words[-1].startswith("week") else 1)
+        return now, now + timedelta(days=count)
+    shift = {"next": 1, "last": -1}.get(words[0], 0) if len(words) > 1 else 0
+    unit = words[-1]
+    if unit == "week":
+        start = midnight - timedelta(days=now.weekday()) + timedelta(weeks=shift)
+        return start, start + timedelta(weeks=1)
+    first = midnight.replace(day=1)
+    if unit == "month":
+        start = _add_months(first, shift)
+        return start, _add_months(start, 1)
+    if unit == "quarter":
+        start = _add_months(first.replace(month=(now.month - 1) // 3 * 3 + 1), 3 * shift)
+        return start, _add_months(start, 3)
+    start = first.replace(month=1, year=now.year + shift)
+    return start, start.replace(year=start.year + 1)
+
+
+def split_period(text: str) -> Tuple[str, Optional[str]]:
+    """
+    Split a trailing period off free text: "1:1s this quarter" gives
+    ("1:1s", "this quarter")
+    """
+    match = _TRAILING_PERIOD_RE.match((text or "").strip())
+    if match is None:
+        return (text or "").strip(), None
+    return match.group("rest").strip(" ,"), match.group("period")
+
+
+class DateTimeParser:
+    def __init__(self, max_entries: Optional[int] = None, bucket_seconds: Optional[float] = None,
+                 languages: Optional[List[str]] = None):
+        """
+        Natural-language datetime parsing for the calendar tools.
+
+        ISO-8601 and common "<day> <time>" phrases are parsed with regexes;
+        everything else goes to dateparser with a fixed language list (no
+        per-call language detection) through a reused DateDataParser.
+        Results are memoized per (timezone, languages, expression,
+        relative-base bucket), so relative phrases like "tomorrow" are
+        recomputed at most once per bucket.
+        """
+        self.max_entries = max_entries or int(os.environ.get("DATEPARSE_CACHE_SIZE", 4096))
+        self.bucket_seconds = bucket_seconds or float(os.environ.get("DATEPARSE_BUCKET_SECONDS", 60))
+        if languages is None:
+            configured = os.environ.get("DATEPARSE_LANGUAGES", "en")
+            languages = [lang.strip() for lang in configured.split(",") if lang.strip()]
+        # An empty list means "detect the language on every call"
+        self.languages = languages or None
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Optional[datetime]]" = OrderedDict()
+        self._parsers: Dict[Tuple, Any] = {}
+        self._counters = {"fast_path": 0, "hits": 0, "misses": 0, "failures": 0, "evictions": 0}
+        self._slow_seconds = 0.0
+
+    def _now(self, timezone: Optional[str]) -> datetime:
+        zone = _zone(timezone)
+        return datetime.now(zone) if zone else datetime.now()
+
+    def fast_parse(self, text: str, now: datetime) -> Optional[datetime]:
+        """
+        Parse ISO-8601 or a "<day> <time>" phrase without dateparser, or
+        None if ``text`` is not one of those forms
+        """
+        if _ISO_RE.match(text):
+            value = text[:-1] + "+00:00" if text[-1] in "zZ" else text
+            try:
+                parsed = datetime.fromisoformat(value)
+            except ValueError:
+                return None
+            if parsed.tzinfo is None and now.tzinfo is not None:
+                parsed = parsed.replace(tzinfo=now.tzinfo)
+            return parsed
+
+        match = _DAY_TIME_RE.match(text)
+        if not match or (match.group("day") and match.group("day_after")):
+            return None
+        named = match.group("named")
+        if named:
+            hour, minute = (12, 0) if named == "noon" else (0, 0)
+        else:
+            meridiem = (match.group("meridiem") or "").replace(".", "")
+            # A bare number ("tomorrow 3") is ambiguous; leave it to dateparser
+            if not meridiem and match.group("minute") is None:
+                return None
+            hour = int(match.group("hour"))
+            minute = int(match.group("minute") or 0)
+            if meridiem:
+                if not 1 <= hour <= 12:
+                    return None
+                hour = hour % 12 + (12 if meridiem == "pm" else 0)
+            if hour > 23 or minute > 59:
+                return None
+        day = match.group("day") or match.group("day_after") or "today"
+        base = now + timedelta(days=1) if day == "tomorrow" else now
+        return base.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+    def _dateparser(self, timezone: Optional[str]):
+        key = (timezone, tuple(self.languages or ()))
+        parser = self._parsers.get(key)
+        if parser is None:
+            from dateparser.date import DateDataParser
+            settings: Dict[str, Any] = {}
+            if timezone:
+                settings = {"TIMEZONE": timezone, "RETURN_AS_TIMEZONE_AWARE": True}
+            parser = DateDataParser(languages=self.languages, settings=settings)
+            with self._lock:
+                parser = self._parsers.setdefault(key, parser)
+        return parser
+
+    def _slow_parse(self, text: str, timezone: Optional[str]) -> Optional[datetime]:
+        started = time.perf_counter()
+        try:
+            with telemetry.span("dateparse", "dateparser"):
+                return self._dateparser(timezone).get_date_data(text).date_obj
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._slow_seconds += elapsed
+
+    def parse(self, text: str, timezone: Optional[str] = None) -> Optional[datetime]:
+        """
+        Parse one expression; naive local time unless ``timezone`` is given,
+        matching ``dateparser.parse`` without settings
+        """
+        return self.parse_many([text], timezone=timezone)[0]
+
+    def parse_many(self, texts: Iterable[str], timezone: Optional[str] = None) -> List[Optional[datetime]]:
+        """
+        Parse several expressions against one relative base, parsing each
+        distinct expression once
+        """
+        texts = list(texts)
+        now = self._now(timezone)
+        bucket = int(now.timestamp() // self.bucket_seconds)
+        languages = tuple(self.languages or ())
+        results: Dict[str, Optional[datetime]] = {}
+        for text in texts:
+            normalized = normalize_expression(text or "")
+            if normalized in results:
+                continue
+            if not normalized:
+                results[normalized] = None
+                continue
+            parsed = self.fast_parse(normalized, now)
+            if parsed is not None:
+                with self._lock:
+                    self._counters["fast_path"] += 1
+                results[normalized] = parsed
+                continue
+            key = (timezone, languages, normalized, bucket)
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    results[normalized] = self._entries[key]
+                    continue
+                self._counters["misses"] += 1
+            parsed = self._slow_parse(text.strip(), timezone)
+            with self._lock:
+                if parsed is None:
+                    self._counters["failures"] += 1
+                self._entries[key] = parsed
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._counters["evictions"] += 1
+            results[normalized] = parsed
+        return [results[normalize_expression(text or "")] for text in texts]
+
+    def warm_up(self, timezone: Optional[str] = None):
+        """
+        Build the dateparser instance and load its language data
+        """
+        self._slow_parse("next friday at 3pm", timezone)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            slow_calls = self._counters["misses"]
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "bucket_seconds": self.bucket_seconds,
+                "languages": self.languages,
+                "avg_slow_parse_ms": round(self._slow_seconds / slow_calls * 1000, 3) if slow_calls else 0.0,
+                **self._counters,
+            }
+
+
+datetime_parser = DateTimeParser()
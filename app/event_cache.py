@@ -0,0 +1,339 @@
+import bisect
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from googleapiclient.errors import HttpError
+from app.events import Event
+from app.shared_state import shared_state
+from app.title_index import TitleIndex
+
+
+def parse_event_time(value: Dict[str, Any]) -> datetime:
+    """
+    Parse an event ``start``/``end`` object into an aware UTC datetime.
+    All-day events (``date``) are treated as starting at midnight UTC.
+    """
+    if 'dateTime' in value:
+        parsed = datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.astimezone(timezone.utc)
+    return datetime.fromisoformat(value['date']).replace(tzinfo=timezone.utc)
+
+
+class EventStore:
+    def __init__(self, calendar_id: str = 'primary'):
+        """
+        Local copy of one user's calendar, kept fresh with sync tokens
+        """
+        self.calendar_id = calendar_id
+        self.lock = threading.RLock()
+        self.sync_token: Optional[str] = None
+        self.last_sync = 0.0
+        self.last_access = time.monotonic()
+        # Bumped on every change; lets other caches key on calendar state
+        self.revision = 0
+        # While a push channel covers this calendar (epoch seconds) reads
+        # skip the incremental sync until a notification marks it stale
+        self.watched_until = 0.0
+        self.stale = False
+        # Shared generation this store was synced at; another worker
+        # bumping it (a write or a notification) forces a sync here too
+        self.shared_generation = 0
+        # End of the range the full sync listed; later events are not held
+        self.covered_until: Optional[datetime] = None
+        self._events: Dict[str, Event] = {}
+        self._by_start: Optional[List[Tuple[datetime, str]]] = None
+        self._max_duration = timedelta(0)
+        self.titles = TitleIndex()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def apply(self, item: Dict[str, Any]):
+        """
+        Apply an API event from a sync page; cancelled events are removed
+        """
+        if item.get('status') == 'cancelled':
+            self.remove(item['id'])
+            return
+        try:
+            event = Event.from_api(item)
+        except (KeyError, ValueError):
+            return
+        if self.covered_until is not None and event.start >= self.covered_until:
+            # Moved (or recurring on) past the horizon: outside what we hold
+            self.remove(event.id)
+            return
+        self.upsert(event)
+
+    def upsert(self, event: Event):
+        """
+        Insert or replace an event
+        """
+        with self.lock:
+            self._events[event.id] = event
+            self.titles.add(event.id, event.summary)
+            self._max_duration = max(self._max_duration, event.end - event.start)
+            self._by_start = None
+            self.revision += 1
+
+    def remove(self, event_id: str):
+        with self.lock:
+            if self._events.pop(event_id, None) is not None:
+                self.titles.remove(event_id)
+                self._by_start = None
+                self.revision += 1
+
+    def clear(self):
+        with self.lock:
+            self._events.clear()
+            self.titles.clear()
+            self._by_start = None
+            self._max_duration = timedelta(0)
+            self.sync_token = None
+            self.covered_until = None
+            self.revision += 1
+
+    def covers(self, time_max: datetime) -> bool:
+        """
+        Whether every event starting before ``time_max`` is held
+        """
+        return self.covered_until is not None and time_max <= self.covered_until
+
+    def get(self, event_id: str) -> Optional[Event]:
+        return self._events.get(event_id)
+
+    def window(self, time_min: datetime, time_max: datetime) -> List[Event]:
+        """
+        Events overlapping ``[time_min, time_max)`` ordered by start time,
+        matching the semantics of ``events.list(timeMin, timeMax)``
+        """
+        with self.lock:
+            if self._by_start is None:
+                self._by_start = sorted((event.start, event_id) for event_id, event in self._events.items())
+            by_start = self._by_start
+            # Events starting before time_min can still overlap it, but never
+            # by more than the longest event we hold
+            lo = bisect.bisect_left(by_start, (time_min - self._max_duration, ''))
+            hi = bisect.bisect_left(by_start, (time_max, ''))
+            events = []
+            for _, event_id in by_start[lo:hi]:
+                event = self._events[event_id]
+                if event.end > time_min:
+                    events.append(event)
+            return events
+
+    def search_titles(self, query: str, time_min: datetime, time_max: datetime,
+                      limit: Optional[int] = 5, min_score: float = 0.3) -> List[Tuple[Event, float]]:
+        """
+        Ranked ``(event, score)`` title matches overlapping the window
+        """
+        with self.lock:
+            matches = []
+            for event_id, score in self.titles.search(query, limit=None, min_score=min_score):
+                event = self._events[event_id]
+                if event.end > time_min and event.start < time_max:
+                    matches.append((score, event.start, event))
+        # Equal scores (e.g. instances of a recurring event) go earliest first
+        matches.sort(key=lambda match: (-match[0], match[1]))
+        if limit:
+            matches = matches[:limit]
+        return [(event, score) for score, _, event in matches]
+
+
+class EventCache:
+    def __init__(self, max_users: Optional[int] = None, idle_ttl: Optional[float] = None,
+                 min_sync_interval: Optional[float] = None, lookback_days: Optional[int] = None,
+                 horizon_days: Optional[int] = None):
+        """
+        Per-user, per-calendar event stores with LRU eviction of idle users
+        """
+        self.max_users = max_users or int(os.environ.get("EVENT_CACHE_MAX_USERS", 1000))
+        self.idle_ttl = idle_ttl or float(os.environ.get("EVENT_CACHE_IDLE_SECONDS", 1800))
+        # Incremental syncs are cheap but not free; within this interval
+        # reads are served purely from the local store
+        self.min_sync_interval = (min_sync_interval if min_sync_interval is not None
+                                  else float(os.environ.get("EVENT_CACHE_SYNC_SECONDS", 30)))
+        self.lookback_days = lookback_days if lookback_days is not None else int(os.environ.get("EVENT_CACHE_LOOKBACK_DAYS", 1))
+        # How far ahead a full sync lists; open-ended recurring series are
+        # expanded only this far, so a store stays bounded
+        self.horizon_days = horizon_days or int(os.environ.get("EVENT_CACHE_HORIZON_DAYS", 90))
+        self._lock = threading.Lock()
+        self._stores: "OrderedDict[Tuple[str, str], EventStore]" = OrderedDict()
+        self._counters = {"hits": 0, "incremental_syncs": 0, "full_syncs": 0, "evictions": 0, "notifications": 0}
+
+    def get_store(self, user_key: str, calendar_id: str = 'primary') -> EventStore:
+        """
+        Return (creating if needed) the store for a user's calendar
+        """
+        key = (user_key, calendar_id)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            store = self._stores.get(key)
+            if store is None:
+                store = self._stores[key] = EventStore(calendar_id)
+            self._stores.move_to_end(key)
+            store.last_access = now
+            while len(self._stores) > self.max_users:
+                self._stores.popitem(last=False)
+                self._counters["evictions"] += 1
+            return store
+
+    def peek_store(self, user_key: str, calendar_id: str = 'primary') -> Optional[EventStore]:
+        """
+        Return the store if it already exists, without creating or syncing it
+        """
+        with self._lock:
+            return self._stores.get((user_key, calendar_id))
+
+    def _evict_idle(self, now: float):
+        while self._stores:
+            key, store = next(iter(self._stores.items()))
+            if now - store.last_access < self.idle_ttl:
+                break
+            del self._stores[key]
+            self._counters["evictions"] += 1
+
+    def sync(self, service, user_key: str, calendar_id: str = 'primary', force: bool = False) -> EventStore:
+        """
+        Bring the user's store up to date and return it
+        """
+        store = self.get_store(user_key, calendar_id)
+        generation = shared_state.generation(f"calendar:{user_key}:{calendar_id}") if shared_state.distributed else 0
+        with store.lock:
+            if generation != store.shared_generation:
+                store.stale = True
+            # Half the horizon has passed since the full sync: list again
+            # so the store still reaches ``horizon_days`` ahead
+            if store.covered_until is not None and \
+                    store.covered_until - datetime.now(timezone.utc) < timedelta(days=self.horizon_days / 2):
+                store.clear()
+            watched = store.watched_until > time.time()
+            recent = time.monotonic() - store.last_sync < self.min_sync_interval
+            fresh = store.sync_token is not None and not store.stale and (watched or recent)
+            if fresh and not force:
+                with self._lock:
+                    self._counters["hits"] += 1
+                return store
+            # Read before syncing, so a bump during the sync is not lost
+            store.shared_generation = generation
+            try:
+                self._sync(service, store)
+            except HttpError as error:
+                # 410 Gone: the sync token expired, start over with a full sync
+                if getattr(error, 'resp', None) is not None and error.resp.status == 410:
+                    store.clear()
+                    self._sync(service, store)
+                else:
+                    store.stale = True
+                    raise
+            except Exception:
+                # e.g. rate limited: the next read tries again
+                store.stale = True
+                raise
+        return store
+
+    def _sync(self, service, store: EventStore):
+        full = store.sync_token is None
+        # Cleared before listing so a notification arriving mid-sync is kept
+        store.stale = False
+        params: Dict[str, Any] = {
+            'calendarId': store.calendar_id,
+            'singleEvents': True,
+            'maxResults': 250,
+        }
+        if full:
+            now = datetime.now(timezone.utc)
+            store.covered_until = now + timedelta(days=self.horizon_days)
+            params['timeMin'] = (now - timedelta(days=self.lookback_days)).isoformat().replace('+00:00', 'Z')
+            params['timeMax'] = store.covered_until.isoformat().replace('+00:00', 'Z')
+        else:
+            params['syncToken'] = store.sync_token
+
+        page_token = None
+        while True:
+            if page_token:
+                params['pageToken'] = page_token
+            result = service.events().list(**params).execute()
+            for item in result.get('items', []):
+                store.apply(item)
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                break
+
+        store.sync_token = result.get('nextSyncToken')
+        store.last_sync = time.monotonic()
+        with self._lock:
+            self._counters["full_syncs" if full else "incremental_syncs"] += 1
+
+    def record_upsert(self, user_key: str, event: Event, calendar_id: str = 'primary'):
+        """
+        Patch a cached store after we created or updated an event
+        """
+        store = self.peek_store(user_key, calendar_id)
+        if store is not None:
+            store.upsert(event)
+        self._announce(user_key, calendar_id, store)
+
+    def record_delete(self, user_key: str, event_id: str, calendar_id: str = 'primary'):
+        """
+        Patch a cached store after we deleted an event
+        """
+        store = self.peek_store(user_key, calendar_id)
+        if store is not None:
+            store.remove(event_id)
+        self._announce(user_key, calendar_id, store)
+
+    def _announce(self, user_key: str, calendar_id: str, store: Optional[EventStore]):
+        """
+        Tell other workers this process changed the calendar; our own
+        store already has the change, so it stays current
+        """
+        if shared_state.distributed:
+            generation = shared_state.bump(f"calendar:{user_key}:{calendar_id}")
+            if store is not None:
+                with store.lock:
+                    if store.shared_generation == generation - 1:
+                        store.shared_generation = generation
+
+    def set_watched(self, user_key: str, until: float, calendar_id: str = 'primary'):
+        """
+        Record that a push channel covers the calendar until ``until``
+        (epoch seconds); 0 goes back to interval-based syncing
+        """
+        store = self.get_store(user_key, calendar_id)
+        store.watched_until = until
+
+    def mark_changed(self, user_key: str, calendar_id: str = 'primary'):
+        """
+        A push notification said the calendar changed; the next read syncs
+        """
+        store = self.peek_store(user_key, calendar_id)
+        if store is not None:
+            store.stale = True
+        if shared_state.distributed:
+            shared_state.bump(f"calendar:{user_key}:{calendar_id}")
+        with self._lock:
+            self._counters["notifications"] += 1
+
+    def invalidate(self, user_key: str, calendar_id: str = 'primary'):
+        with self._lock:
+            self._stores.pop((user_key, calendar_id), None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "users": len(self._stores),
+                "events": sum(len(store) for store in self._stores.values()),
+                "watched": sum(1 for store in self._stores.values() if store.watched_until > time.time()),
+                "max_users": self.max_users,
+                "idle_ttl_seconds": self.idle_ttl,
+                "min_sync_interval_seconds": self.min_sync_interval,
+                **self._counters,
+            }
@@ -0,0 +1,211 @@
+import json
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder gives the same output, slower
+    orjson = None
+
+# Fields of the REST representation, in output order
+EVENT_FIELDS = ('id', 'summary', 'start', 'end', 'description', 'location')
+
+# One tzinfo object per UTC offset instead of one per parsed datetime
+_ZONES: Dict[timedelta, timezone] = {timedelta(0): timezone.utc}
+
+
+def _zone(offset: timedelta) -> timezone:
+    zone = _ZONES.get(offset)
+    if zone is None:
+        zone = _ZONES.setdefault(offset, timezone(offset))
+    return zone
+
+
+def parse_time(value: Dict[str, Any]) -> Tuple[datetime, bool]:
+    """
+    ``(moment, all_day)`` for an event ``start``/``end`` object. Timed
+    values keep their UTC offset (naive ones are taken as UTC); all-day
+    dates are midnight UTC.
+    """
+    if 'dateTime' in value:
+        parsed = datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+        offset = parsed.utcoffset()
+        return parsed.replace(tzinfo=_zone(offset if offset is not None else timedelta(0))), False
+    return datetime.fromisoformat(value['date']).replace(tzinfo=timezone.utc), True
+
+
+def format_time(moment: datetime, all_day: bool = False) -> str:
+    """
+    The API form of a parsed time: ``YYYY-MM-DD`` for all-day events,
+    otherwise ISO-8601 with its offset (``Z`` for UTC)
+    """
+    if all_day:
+        return moment.date().isoformat()
+    text = moment.isoformat()
+    return text[:-6] + 'Z' if text.endswith('+00:00') else text
+
+
+class Event:
+    __slots__ = ('id', 'summary', 'start', 'end', 'all_day', 'description', 'location', 'etag', 'recurrence',
+                 'ical_uid', 'time_zone', 'end_time_zone')
+
+    def __init__(self, id: str, summary: str, start: datetime, end: datetime, all_day: bool = False,
+                 description: str = '', location: str = '', etag: Optional[str] = None,
+                 recurrence: Optional[Tuple[str, ...]] = None, ical_uid: Optional[str] = None,
+                 time_zone: Optional[str] = None, end_time_zone: Optional[str] = None):
+        """
+        A calendar event as the app uses it: the fields we serve, with
+        parsed aware start/end times. Slotted, so a cached calendar costs
+        a fraction of the Google payloads it came from.
+        """
+        self.id = id
+        self.summary = summary
+        self.start = start
+        self.end = end
+        self.all_day = all_day
+        self.description = description
+        self.location = location
+        self.etag = etag
+        self.recurrence = recurrence
+        # Only kept when it is not the "<id>@google.com" Google gives its own events
+        self.ical_uid = ical_uid
+        # IANA zones of start/end when Google names one; a recurring series
+        # repeats in its zone's wall-clock time, which an offset cannot say
+        self.time_zone = time_zone
+        self.end_time_zone = end_time_zone
+
+    @property
+    def uid(self) -> str:
+        """
+        The iCalendar UID, which identifies the event across calendars
+        and imports
+        """
+        return self.ical_uid or f"{self.id}@google.com"
+
+    @classmethod
+    def from_api(cls, item: Dict[str, Any]) -> "Event":
+        """
+        The one conversion from a Google ``Event`` resource. Raises
+        KeyError/ValueError for items without usable times (e.g. cancelled
+        instances in a sync).
+        """
+        start, all_day = parse_time(item['start'])
+        end, _ = parse_time(item['end'])
+        recurrence = item.get('recurrence')
+        uid = item.get('iCalUID')
+        time_zone = item['start'].get('timeZone')
+        end_time_zone = item['end'].get('timeZone')
+        return cls(
+            item['id'],
+            item.get('summary') or 'No title',
+            start,
+            end,
+            all_day,
+            item.get('description') or '',
+            item.get('location') or '',
+            item.get('etag'),
+            tuple(recurrence) if recurrence else None,
+            uid if uid and uid != f"{item['id']}@google.com" else None,
+            time_zone,
+            end_time_zone if end_time_zone != time_zone else None,
+        )
+
+    def to_dict(self, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        The REST representation; ``fields`` (from EVENT_FIELDS) trims it.
+        ``etag`` and ``recurrence`` are included when known.
+        """
+        if fields is not None:
+            return {field: self._value(field) for field in fields}
+        return self._body(format_time)
+
+    def _body(self, time_value) -> Dict[str, Any]:
+        body = {
+            'id': self.id,
+            'summary': self.summary,
+            'start': time_value(self.start, self.all_day),
+            'end': time_value(self.end, self.all_day),
+            'description': self.description,
+            'location': self.location,
+        }
+        if self.etag is not None:
+            body['etag'] = self.etag
+        if self.recurrence is not None:
+            body['recurrence'] = list(self.recurrence)
+        return body
+
+    def _value(self, field: str) -> Any:
+        if field in ('start', 'end'):
+            return format_time(getattr(self, field), self.all_day)
+        return getattr(self, field)
+
+    def render(self, today: Optional[date] = None) -> str:
+        """
+        Short text for LLM observations: title, day and times, location;
+        no IDs, seconds, offsets or descriptions
+        """
+        today = today or datetime.now(timezone.utc).date()
+        day_format = '%a %d %b' if self.start.year == today.year else '%a %d %b %Y'
+        if self.all_day:
+            last = self.end - timedelta(days=1)
+            when = self.start.strftime(day_format) + ('' if last <= self.start else ' - ' + last.strftime(day_format))
+        else:
+            when = self.start.strftime(day_format + ' %H:%M')
+            when += '-' + self.end.strftime('%H:%M' if self.end.date() == self.start.date() else day_format + ' %H:%M')
+        return f"{self.summary} | {when}" + (f" @ {self.location}" if self.location else '')
+
+    def __repr__(self) -> str:
+        return f"Event({self.id!r}, {self.summary!r}, {format_time(self.start, self.all_day)})"
+
+
+class ScoredEvent(Event):
+    __slots__ = ('score',)
+
+    def __init__(self, event: Event, score: float):
+        """
+        A search result: the event plus how well its title matched (0-1)
+        """
+        super().__init__(*(getattr(event, name) for name in Event.__slots__))
+        self.score = score
+
+    def _body(self, time_value) -> Dict[str, Any]:
+        body = super()._body(time_value)
+        body['score'] = self.score
+        return body
+
+
+def render_events(events: Iterable[Event], today: Optional[date] = None) -> str:
+    """
+    One line per event, for tool observations
+    """
+    today = today or datetime.now(timezone.utc).date()
+    return "\n".join(event.render(today) for event in events)
+
+
+def _native_time(moment: datetime, all_day: bool):
+    # orjson writes datetimes itself (UTC as Z), much faster than format_time
+    return moment.date() if all_day else moment
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Event):
+        return value._body(_native_time)
+    if isinstance(value, datetime):
+        return format_time(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Compact UTF-8 JSON for REST responses. Events (anywhere in
+    ``content``) are written through ``Event.to_dict``; orjson is used when
+    installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
@@ -0,0 +1,297 @@
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app import langchain_tools
+from app.datetime_parser import datetime_parser, split_period
+
+# A time of day must be present for create/edit commands to be routed
+_TIME = r"(?:\d{1,2}(?::\d{2})?\s*(?:am|pm)|\d{1,2}:\d{2}|noon|midnight)"
+_TIME_RE = re.compile(_TIME, re.IGNORECASE)
+_POLITE = r"(?:(?:please|can you|could you|hey)\s+)*"
+_QUOTED = re.compile(r"^['\"](.+)['\"]$")
+# Titles that point back at an earlier message rather than name an event
+_PRONOUNS = {"it", "that", "this", "event", "meeting", "that one", "this one", "them"}
+# Titles too generic to pick which events to delete ("delete all events")
+_GENERIC_TITLES = _PRONOUNS | {"events", "meetings", "all", "of them", "everything", "my events", "appointments"}
+# Intents that are never executed from a regex match: deleting needs the
+# agent, which can check what matched and confirm with the user
+DESTRUCTIVE_INTENTS = {"delete", "delete_all"}
+
+_LIST_RE = re.compile(
+    _POLITE + r"(?:(?:show|list|display|view|see|get|what(?:'s| is| are)?)\b.*"
+    r"\b(?:events?|calendar|schedule|agenda|meetings?)\b|what do i have\b).*$",
+    re.IGNORECASE,
+)
+# A listing with nothing else in it: the router can only answer "what's
+# coming up"; anything with a title filter or other qualifier needs the agent
+_PLAIN_LIST_RE = re.compile(
+    _POLITE + r"(?:(?:show|list|display|view|see|get|give)(?:\s+me)?\s+(?:all\s+)?(?:of\s+)?(?:my\s+|the\s+)?"
+    r"(?:upcoming\s+|next\s+)?(?:calendar\s+)?(?:events?|meetings?|schedule|agenda|calendar|appointments)"
+    r"|what(?:'s|\s+is)\s+(?:on\s+)?(?:my\s+|the\s+)?(?:calendar|schedule|agenda)"
+    r"|what\s+(?:are\s+)?(?:my\s+)?(?:upcoming\s+)?(?:events|meetings)(?:\s+(?:do|did)\s+i\s+have)?"
+    r"|what\s+(?:do|did)\s+i\s+have(?:\s+(?:coming\s+up|planned|on))?)"
+    r"(?:\s+coming\s+up)?[\s.?!]*$",
+    re.IGNORECASE,
+)
+_PAST_RE = re.compile(r"\b(?:did|had|was|were)\b", re.IGNORECASE)
+_RECURRENCE_RE = re.compile(
+    r"\b(?:every|each|daily|weekly|fortnightly|monthly|yearly|annually|weekdays|recurring|repeat(?:ing|s)?)\b",
+    re.IGNORECASE,
+)
+# Longest event the router creates without the agent double-checking
+MAX_ROUTED_SPAN = timedelta(hours=24)
+_LIST_VETO_RE = re.compile(r"\b(?:how|why|create|add|schedule|book|delete|cancel|remove|free|busy)\b", re.IGNORECASE)
+_DELETE_ALL_RE = re.compile(
+    _POLITE + r"(?:delete|cancel|remove|clear)\s+all\s+(?:of\s+)?(?:my\s+)?(?:the\s+)?(?P<title>.+?)"
+    r"(?:\s+(?:events?|meetings?))?(?:\s+this\s+week)?[\s.!]*$",
+    re.IGNORECASE,
+)
+_DELETE_RE = re.compile(
+    _POLITE + r"(?:delete|cancel|remove)\s+(?:my\s+|the\s+)?(?:event\s+|meeting\s+)?(?P<title>.+?)"
+    r"(?:\s+(?:event|meeting))?(?:\s+on\s+[\w ,]+?)?[\s.!]*$",
+    re.IGNORECASE,
+)
+_EXTEND_RE = re.compile(
+    _POLITE + r"(?:extend|edit|change|update|move)\s+(?:my\s+|the\s+)?(?:event\s+|meeting\s+)?(?P<title>.+?)"
+    r"(?:\s+on\s+[\w ,]+?)?\s+(?:so\s+(?:that\s+)?it\s+ends|to\s+end|(?:to\s+)?end(?:ing)?|until)\s+(?:at\s+)?"
+    r"(?P<end>.+?)[\s.!]*$",
+    re.IGNORECASE,
+)
+# "schedule team sync tomorrow at 3pm to 4pm"
+_CREATE_TITLE_FIRST_RE = re.compile(
+    _POLITE + r"(?:create|schedule|add|book|set up)\s+(?:an?\s+)?(?:event|meeting|appointment)?\s*"
+    r"(?:called|titled|named|for)?\s*(?P<title>.+?)\s+(?P<when>(?:on|at|from|today|tonight|tomorrow|next)\b.+?)[\s.!]*$",
+    re.IGNORECASE,
+)
+# "create an event on July 25 at 6pm for dinner with friends"
+_CREATE_WHEN_FIRST_RE = re.compile(
+    _POLITE + r"(?:create|schedule|add|book|set up)\s+(?:an?\s+)?(?:event|meeting|appointment)?\s*"
+    r"(?P<when>(?:on|at|from|today|tonight|tomorrow|next)\b.+?)\s+(?:for|called|titled|named)\s+(?P<title>.+?)[\s.!]*$",
+    re.IGNORECASE,
+)
+_LEADING_WORD_RE = re.compile(r"^(?:on|from|at)\s+", re.IGNORECASE)
+_FROM_RE = re.compile(r"\s+from\s+", re.IGNORECASE)
+_AT_RE = re.compile(r"\s+at\s*$|\s+at\s+", re.IGNORECASE)
+_RANGE_SPLIT_RE = re.compile(r"\s+(?:to|until|till|-)\s+|\s*-\s*(?=" + _TIME + r")", re.IGNORECASE)
+
+
+@dataclass
+class IntentMatch:
+    intent: str
+    slots: Dict[str, str] = field(default_factory=dict)
+    confidence: float = 0.0
+
+
+def _clean_title(title: str) -> str:
+    title = title.strip().strip(".!?")
+    quoted = _QUOTED.match(title)
+    return quoted.group(1).strip() if quoted else title
+
+
+def _split_range(when: str) -> Tuple[str, Optional[str]]:
+    """
+    Split "tomorrow at 3pm to 4pm" into ("tomorrow at 3pm", "tomorrow 4pm")
+    """
+    parts = _RANGE_SPLIT_RE.split(when.strip(), maxsplit=1)
+    start = _LEADING_WORD_RE.sub("", _FROM_RE.sub(" at ", parts[0].strip()))
+    if len(parts) == 1:
+        return start, None
+    end = parts[1].strip()
+    # A bare time on one end belongs to the other end's day: "3pm to 4pm
+    # tomorrow" is tomorrow from 3 to 4, not today 3pm to tomorrow 4pm
+    if _TIME_RE.fullmatch(end):
+        day = _day_of(start)
+        if day:
+            end = f"{day} {end}"
+    elif _TIME_RE.fullmatch(start):
+        day = _day_of(end)
+        if day:
+            start = f"{day} {start}"
+    return start, end
+
+
+def _day_of(when: str) -> str:
+    """
+    The day part of "tomorrow at 3pm" ("tomorrow"), or "" for a bare time
+    """
+    return _LEADING_WORD_RE.sub("", _AT_RE.sub(" ", _TIME_RE.sub("", when))).strip()
+
+
+def _create_confidence(summary: str, start: str, end: Optional[str], text: str) -> float:
+    """
+    Confidence of a create match. Recurring requests and ranges that do
+    not parse to a sensible span (end before start, over a day) go to the
+    agent, which can ask instead of creating the wrong event.
+    """
+    if not summary or not _TIME_RE.search(start):
+        return 0.4
+    if _RECURRENCE_RE.search(text):
+        return 0.1
+    if end:
+        parsed_start, parsed_end = datetime_parser.parse_many([start, end])
+        if parsed_start is None or parsed_end is None:
+            return 0.4
+        if parsed_start.tzinfo is None and parsed_end.tzinfo is not None:
+            parsed_start = parsed_start.replace(tzinfo=parsed_end.tzinfo)
+        elif parsed_end.tzinfo is None and parsed_start.tzinfo is not None:
+            parsed_end = parsed_end.replace(tzinfo=parsed_start.tzinfo)
+        if not timedelta(0) < parsed_end - parsed_start <= MAX_ROUTED_SPAN:
+            return 0.2
+    return 0.9
+
+
+class IntentRouter:
+    def __init__(self, min_confidence: Optional[float] = None):
+        """
+        Rule-based fast path for high-frequency calendar commands.
+
+        Messages that clearly match a list/create/extend command are
+        answered by calling the calendar tools directly; anything else (a
+        low-confidence match, or any delete) is left to the LLM agent.
+        A listing limited to a period ("what do I have tomorrow") is run
+        as a search over that period.
+        """
+        self.min_confidence = (min_confidence if min_confidence is not None
+                               else float(os.environ.get("ROUTER_MIN_CONFIDENCE", 0.8)))
+        self.enabled = os.environ.get("ROUTER_ENABLED", "1") != "0"
+        self._lock = threading.Lock()
+        self._hits: Dict[str, int] = {}
+        self._misses = 0
+        self._low_confidence = 0
+        self._destructive = 0
+        self._latencies: List[float] = []
+
+    def classify(self, text: str) -> Optional[IntentMatch]:
+        """
+        Best intent match for ``text`` regardless of confidence, or None
+        """
+        text = text.strip()
+        if not text or len(text) > 200:
+            return None
+
+        match = _EXTEND_RE.match(text)
+        if match:
+            end = match.group("end").strip()
+            title = _clean_title(match.group("title"))
+            confidence = 0.9 if _TIME_RE.search(end) else 0.5
+            # "move it to 4pm" refers to an earlier turn; the agent has the
+            # conversation, the router does not
+            if title.lower() in _PRONOUNS:
+                confidence = 0.2
+            return IntentMatch("extend", {"summary": title, "new_end_time": end}, confidence)
+
+        match = _CREATE_WHEN_FIRST_RE.match(text) or _CREATE_TITLE_FIRST_RE.match(text)
+        if match:
+            start, end = _split_range(match.group("when"))
+            slots = {"summary": _clean_title(match.group("title")), "start_time": start}
+            if end:
+                slots["end_time"] = end
+            return IntentMatch("create", slots, _create_confidence(slots["summary"], start, end, text))
+
+        match = _DELETE_ALL_RE.match(text)
+        if match:
+            title = _clean_title(match.group("title"))
+            if not title or title.lower() in _GENERIC_TITLES:
+                return IntentMatch("delete_all", {"summary": title}, 0.0)
+            # "standups" should match "Daily standup"
+            if title.endswith("s") and not title.endswith("ss"):
+                title = title[:-1]
+            # Scored below any sensible threshold; route() never runs it anyway
+            return IntentMatch("delete_all", {"summary": title}, 0.5)
+
+        match = _DELETE_RE.match(text)
+        if match:
+            title = _clean_title(match.group("title"))
+            confidence = 0.5 if title and title.lower() not in _GENERIC_TITLES else 0.2
+            return IntentMatch("delete", {"summary": title}, confidence)
+
+        if _LIST_RE.match(text):
+            # "show me how to create an event" is a question, not a listing
+            if _LIST_VETO_RE.search(text):
+                return IntentMatch("list", {}, 0.5)
+            rest, period = split_period(text)
+            if _PLAIN_LIST_RE.match(rest) and period:
+                return IntentMatch("search", {"period": period}, 0.9)
+            if _PLAIN_LIST_RE.match(text) and not _PAST_RE.search(text):
+                return IntentMatch("list", {}, 0.95)
+            # A title filter ("my 1:1 meetings"), a date, or a past listing
+            # without a period: the fixed upcoming listing would be wrong
+            return IntentMatch("list", {}, 0.5)
+        return None
+
+    def route(self, text: str) -> Optional[IntentMatch]:
+        """
+        The match to execute directly, or None to fall back to the agent
+        """
+        if not self.enabled:
+            return None
+        match = self.classify(text)
+        with self._lock:
+            if match is None:
+                self._misses += 1
+                return None
+            if match.intent in DESTRUCTIVE_INTENTS:
+                self._destructive += 1
+                return None
+            if match.confidence < self.min_confidence:
+                self._low_confidence += 1
+                return None
+        return match
+
+    def execute(self, match: IntentMatch) -> str:
+        """
+        Run the matched command through the calendar tool functions
+        """
+        started = time.perf_counter()
+        try:
+            slots = match.slots
+            if match.intent == "list":
+                return langchain_tools.show_events_tool_fn()
+            if match.intent == "search":
+                return langchain_tools.search_events_tool_fn("", slots["period"])
+            if match.intent in DESTRUCTIVE_INTENTS:
+                raise ValueError(f"{match.intent} is left to the agent")
+            if match.intent == "extend":
+                return langchain_tools.edit_event_tool_fn(slots["summary"], slots["new_end_time"])
+            if match.intent == "create":
+                end_time = slots.get("end_time")
+                if not end_time:
+                    parsed_start = datetime_parser.parse(slots["start_time"], timezone=langchain_tools.user_time_zone())
+                    if not parsed_start:
+                        return "Could not parse start time. Please provide a valid date/time."
+                    # No end given: default to a one hour event
+                    slots = {**slots, "start_time": parsed_start.isoformat(),
+                             "end_time": (parsed_start + timedelta(hours=1)).isoformat()}
+                    end_time = slots["end_time"]
+                return langchain_tools.create_event_tool_fn(slots["summary"], slots["start_time"], end_time)
+            raise ValueError(f"Unknown intent: {match.intent}")
+        finally:
+            with self._lock:
+                self._hits[match.intent] = self._hits.get(match.intent, 0) + 1
+                self._latencies.append(time.perf_counter() - started)
+                if len(self._latencies) > 1000:
+                    del self._latencies[:500]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = sum(self._hits.values())
+            total = hits + self._misses + self._low_confidence + self._destructive
+            latencies = sorted(self._latencies)
+            return {
+                "enabled": self.enabled,
+                "min_confidence": self.min_confidence,
+                "hits": dict(self._hits),
+                "misses": self._misses,
+                "low_confidence": self._low_confidence,
+                "destructive_to_agent": self._destructive,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3) if latencies else 0.0,
+            }
+
+
+intent_router = IntentRouter()
@@ -1,70 +1,353 @@
-from langchain.agents import initialize_agent
-from langchain.tools import Tool
-from app.calendar_utils import GoogleCalendarManager
-import dateparser
+import functools
+import re
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from app.availability import AvailabilityService
+from app.datetime_parser import datetime_parser, is_time_zone, now_in, period_range, split_period
+from app.events import format_time
+from app.request_context import current_time_zone, resolve_access_token
+from app.response_cache import response_cache
+from app.service_pool import user_key_for, user_keys
+from app.startup import startup_report
+from app.token_budget import token_budget
 
-calendar_manager = GoogleCalendarManager()
+def _build_calendar_manager():
+    # Imported here so googleapiclient/google-auth load on first use, not at startup
+    from app.calendar_utils import GoogleCalendarManager
+    return GoogleCalendarManager()
+
+calendar_manager = startup_report.lazy("calendar_manager", _build_calendar_manager)
+
+def get_calendar_manager():
+    """
+    The shared GoogleCalendarManager, built on first use
+    """
+    return calendar_manager.get()
+
+# user_key_for() resolves tokens to accounts through the shared manager
+user_keys.lookup = lambda access_token: get_calendar_manager().account_id(access_token)
+
+# Title matches scoring within this margin of the best one are ambiguous
+AMBIGUITY_MARGIN = 0.1
+# Title score an event needs to be picked for a bulk delete: "team standup"
+# must not select events titled just "Team" or "Standup"
+DELETE_MIN_SCORE = 0.75
+# Most events one DeleteCalendarEvents call removes (one batch request)
+DELETE_MAX_EVENTS = 50
+# "<start> to <end>" or "<start>, <end>"; ISO dates keep their unspaced hyphens
+_RANGE_RE = re.compile(r"\s*,\s*|\s+(?:to|until|till|-)\s+", re.IGNORECASE)
+_CONFIRM_RE = re.compile(r"\s*[;,|]?\s*confirm(?:ed)?\s*$", re.IGNORECASE)
+
+def user_time_zone(access_token: str = "") -> Optional[str]:
+    """
+    IANA timezone to read the user's times in: the one their request gave,
+    otherwise their primary calendar's; None falls back to server time
+    """
+    time_zone = current_time_zone.get()
+    if time_zone:
+        return time_zone
+    time_zone = get_calendar_manager().calendar_time_zone(resolve_access_token(access_token))
+    return time_zone if is_time_zone(time_zone) else None
+
+def _resolve_event(summary: str, access_token: str):
+    """
+    Best title match for ``summary`` as ``(event, None)``, or ``(None, message)``
+    when nothing matches or several different events match about equally well
+    """
+    candidates = get_calendar_manager().search_events_by_title(summary, access_token=access_token)
+    if not candidates:
+        return None, f"Event '{summary}' not found."
+    best = candidates[0]
+    close = [
+        c for c in candidates[1:]
+        if best.score - c.score < AMBIGUITY_MARGIN and c.summary != best.summary
+    ]
+    if best.score < 1.0 and close:
+        options = "; ".join(c.render() for c in [best] + close)
+        return None, f"Several events match '{summary}': {options}. Please say which one you mean."
+    return best, None
 
 def show_events_tool_fn(access_token: str = ""):
-    events = calendar_manager.get_upcoming_events(access_token=access_token)
+    access_token = resolve_access_token(access_token)
+    events = get_calendar_manager().get_upcoming_events(access_token=access_token)
     if not events:
         return "No upcoming events found."
-    return "\n".join([
-        f"{e['summary']} on {e['start']}" for e in events
-    ])
+    return token_budget.render_events(events)
+
+# Events SearchCalendarEvents lists one by one; any further matches are only counted
+SEARCH_LIST_LIMIT = 25
+_FILLER_RE = re.compile(r"^(?:(?:all|every|any)\s+(?:of\s+)?)?(?:my\s+|the\s+)?|(?:^|\s+)(?:events?|meetings?)$", re.IGNORECASE)
+
+def search_events_tool_fn(query: str = "", period: str = "", access_token: str = ""):
+    access_token = resolve_access_token(access_token)
+    if not period:
+        # The ReAct agent passes one string, e.g. "1:1s this quarter"
+        query, period = split_period(query)
+    period = period or "next 7 days"
+    # "today" and "this week" start at the user's midnight, not UTC's
+    window = period_range(period, now_in(user_time_zone(access_token)))
+    if window is None:
+        return f"Could not understand the period '{period}'. Use e.g. 'this week', 'this quarter' or 'next 30 days'."
+    # "all my 1:1s" searches for "1:1"
+    query = re.sub(r"(\d)s\b", r"\1", _FILLER_RE.sub("", (query or "").strip()))
+    listed = []
+    total = 0
+    # Streamed page by page, so a year of events is counted without holding it
+    for event in get_calendar_manager().iter_events(*window, query=query or None, access_token=access_token):
+        total += 1
+        if total <= SEARCH_LIST_LIMIT:
+            listed.append(event)
+    matching = f" matching '{query}'" if query else ""
+    if not total:
+        return f"No events{matching} {period}."
+    return token_budget.render_events(listed, header=f"{total} event(s){matching} {period}:", more=total - len(listed))
 
-def create_event_tool_fn(summary: str, start_time: str, end_time: str, access_token: str = ""):
+def create_event_tool_fn(summary: str, start_time: str, end_time: str, access_token: str = "",
+                         description: str = "", location: str = ""):
+    access_token = resolve_access_token(access_token)
+    time_zone = user_time_zone(access_token)
     # Parse natural language dates
-    parsed_start = dateparser.parse(start_time)
-    parsed_end = dateparser.parse(end_time)
+    parsed_start, parsed_end = datetime_parser.parse_many([start_time, end_time], timezone=time_zone)
     if not parsed_start or not parsed_end:
         return f"Could not parse start or end time. Please provide a valid date/time."
     # Convert to ISO format
     start_iso = parsed_start.isoformat()
     end_iso = parsed_end.isoformat()
-    event = calendar_manager.create_event(summary, start_iso, end_iso, access_token=access_token)
-    return f"Created event '{event['summary']}' on {event['start']}"
+    event = get_calendar_manager().create_event(summary, start_iso, end_iso, description=description or "",
+                                                location=location or "", access_token=access_token,
+                                                time_zone=time_zone)
+    response_cache.invalidate_user(user_key_for(access_token))
+    return f"Created event '{event.summary}' on {format_time(event.start, event.all_day)}"
+
+def _create_event_from_text(text: str = ""):
+    # The ReAct agent passes one string: "<title>; <start> to <end>"
+    summary, _, times = text.strip().strip("'\"").rpartition(";")
+    parts = _RANGE_RE.split(times.strip(), maxsplit=1)
+    if not summary.strip() or len(parts) != 2 or not all(part.strip() for part in parts):
+        return "Give the event as '<title>; <start> to <end>', e.g. 'Gym; 2026-07-25T18:00 to 2026-07-25T19:00'."
+    return create_event_tool_fn(summary.strip(), parts[0].strip(), parts[1].strip())
 
 def delete_event_tool_fn(summary: str, access_token: str = ""):
-    event = calendar_manager.find_event_by_title(summary, access_token=access_token)
+    access_token = resolve_access_token(access_token)
+    event, message = _resolve_event(summary, access_token)
     if not event:
-        return f"Event '{summary}' not found."
-    calendar_manager.delete_event(event['id'], access_token=access_token)
-    return f"Deleted event '{summary}'"
+        return message
+    get_calendar_manager().delete_event(event.id, access_token=access_token)
+    response_cache.invalidate_user(user_key_for(access_token))
+    return f"Deleted event '{event.summary}'"
+
+def delete_events_tool_fn(summary: str, access_token: str = "", days: int = 7, confirm: bool = False):
+    """
+    Delete the events of the next ``days`` days whose title matches
+    ``summary``. When several match, nothing is deleted until the call is
+    repeated with ``confirm``; the first call lists them for the user.
+    """
+    access_token = resolve_access_token(access_token)
+    events = get_calendar_manager().search_events_by_title(
+        summary, access_token=access_token, days=days, limit=DELETE_MAX_EVENTS, min_score=DELETE_MIN_SCORE,
+    )
+    if not events:
+        return f"No events matching '{summary}' found."
+    if len(events) > 1 and not confirm:
+        listed = token_budget.render_events(events, header=f"{len(events)} events match '{summary}':")
+        return (f"{listed}\nNothing was deleted. Ask the user to confirm these events, "
+                f"then delete them with confirm.")
+    # One search plus one batch request, however many events match
+    results = get_calendar_manager().batch_delete([e.id for e in events], access_token=access_token)
+    response_cache.invalidate_user(user_key_for(access_token))
+    deleted = [e for e in events if results.get(e.id)]
+    failed = len(events) - len(deleted)
+    message = f"Deleted {len(deleted)} event(s) matching '{summary}': " + "; ".join(e.summary for e in deleted)
+    if failed:
+        message += f"; {failed} could not be deleted"
+    return message
+
+def _delete_events_from_text(text: str = ""):
+    # The ReAct agent passes one string: "standup" to preview, "standup; confirm" to delete
+    summary = _CONFIRM_RE.sub("", text)
+    return delete_events_tool_fn(summary.strip(), confirm=summary != text)
 
 def edit_event_tool_fn(summary: str, new_end_time: str, access_token: str = ""):
-    event = calendar_manager.find_event_by_title(summary, access_token=access_token)
+    access_token = resolve_access_token(access_token)
+    event, message = _resolve_event(summary, access_token)
     if not event:
-        return f"Event '{summary}' not found."
-    parsed_end = dateparser.parse(new_end_time)
+        return message
+    parsed_end = datetime_parser.parse(new_end_time, timezone=user_time_zone(access_token))
     if not parsed_end:
         return f"Could not parse new end time. Please provide a valid date/time."
     new_end_iso = parsed_end.isoformat()
-    updated = calendar_manager.update_event(event['id'], end_time=new_end_iso, access_token=access_token)
-    return f"Updated event '{updated['summary']}' to end at {updated['end']}"
-
-show_events_tool = Tool(
-    name="ShowCalendarEvents",
-    func=show_events_tool_fn,
-    description="Show upcoming Google Calendar events."
-)
-
-create_event_tool = Tool(
-    name="CreateCalendarEvent",
-    func=create_event_tool_fn,
-    description="Create a Google Calendar event. Args: summary, start_time (ISO), end_time (ISO), access_token."
-)
-
-delete_event_tool = Tool(
-    name="DeleteCalendarEvent",
-    func=delete_event_tool_fn,
-    description="Delete a Google Calendar event by summary/title. Args: summary, access_token."
-)
-
-edit_event_tool = Tool(
-    name="EditCalendarEvent",
-    func=edit_event_tool_fn,
-    description="Edit a Google Calendar event's end time. Args: summary, new_end_time (ISO), access_token."
-)
-
-tools = [show_events_tool, create_event_tool, delete_event_tool, edit_event_tool] 
\ No newline at end of file
+    updated = get_calendar_manager().update_event(event.id, end_time=new_end_iso, access_token=access_token)
+    response_cache.invalidate_user(user_key_for(access_token))
+    return f"Updated event '{updated.summary}' to end at {format_time(updated.end, updated.all_day)}"
+
+def _edit_event_from_text(text: str = ""):
+    # The ReAct agent passes one string: "<title>; <new end time>"
+    summary, _, new_end_time = text.strip().strip("'\"").rpartition(";")
+    if not summary.strip() or not new_end_time.strip():
+        return "Give the edit as '<title>; <new end time>', e.g. 'Gym; 2026-07-25T19:30'."
+    return edit_event_tool_fn(summary.strip(), new_end_time.strip())
+
+def find_free_slots_tool_fn(duration: str = "30", days: int = 7, access_token: str = ""):
+    access_token = resolve_access_token(access_token)
+    # The agent passes free text such as "30 minutes" or "1 hour"
+    amount = re.search(r"\d+", str(duration))
+    minutes = int(amount.group()) if amount else 30
+    if re.search(r"\bh(?:ou)?rs?\b", str(duration), re.IGNORECASE):
+        minutes *= 60
+    window_start = datetime.now(timezone.utc)
+    # Working hours are the user's, when their timezone is known
+    result = AvailabilityService(get_calendar_manager(), tz_name=user_time_zone(access_token)).find_slots(
+        timedelta(minutes=minutes), time_min=window_start, time_max=window_start + timedelta(days=days),
+        access_token=access_token
+    )
+    if not result["slots"]:
+        return f"No free {minutes}-minute slot found in the next {days} days."
+    return "\n".join(
+        f"Free from {start.isoformat()} to {end.isoformat()}" for start, end in result["slots"]
+    )
+
+def check_conflicts_tool_fn(start_time: str, end_time: str, access_token: str = ""):
+    access_token = resolve_access_token(access_token)
+    parsed_start, parsed_end = datetime_parser.parse_many([start_time, end_time], timezone=user_time_zone(access_token))
+    if not parsed_start or not parsed_end:
+        return f"Could not parse start or end time. Please provide a valid date/time."
+    result = AvailabilityService(get_calendar_manager()).check_conflicts(parsed_start, parsed_end, access_token=access_token)
+    if result["free"]:
+        return f"No conflicts between {parsed_start.isoformat()} and {parsed_end.isoformat()}."
+    busy = [interval for intervals in result["conflicts"].values() for interval in intervals]
+    return "Conflicts with busy time: " + "; ".join(
+        f"{start.isoformat()} to {end.isoformat()}" for start, end in busy
+    )
+
+def _check_conflicts_from_text(text: str = ""):
+    # The ReAct agent passes one string holding both ends of the range
+    parts = _RANGE_RE.split(text.strip().strip("'\""), maxsplit=1)
+    if len(parts) != 2 or not all(part.strip() for part in parts):
+        return "Give the range as '<start> to <end>', e.g. '2026-07-25T18:00 to 2026-07-25T19:00'."
+    return check_conflicts_tool_fn(parts[0].strip(), parts[1].strip())
+
+def _observed(fn):
+    """
+    ``fn`` with its output fitted to the observation token budget before
+    the agent sees it
+    """
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        return token_budget.fit(str(fn(*args, **kwargs)))
+    return run
+
+def build_tools() -> List:
+    """
+    LangChain tools for the agent; langchain is imported only when the
+    agent is built
+    """
+    from langchain.tools import Tool
+
+    show_events_tool = Tool(
+        name="ShowCalendarEvents",
+        # The agent passes its action input as the first argument, which must not
+        # be mistaken for an access token
+        func=_observed(lambda _input="": show_events_tool_fn()),
+        description="Show upcoming Google Calendar events."
+    )
+
+    search_events_tool = Tool(
+        name="SearchCalendarEvents",
+        func=_observed(lambda text="": search_events_tool_fn(text)),
+        description="List and count events over a period, optionally only those mentioning some text, e.g. '1:1 this quarter', 'standup next month' or 'this year'. Args: text and period in one string."
+    )
+
+    create_event_tool = Tool(
+        name="CreateCalendarEvent",
+        func=_observed(_create_event_from_text),
+        description="Create a Google Calendar event. Args: one string, '<title>; <start> to <end>' (ISO or natural language)."
+    )
+
+    delete_event_tool = Tool(
+        name="DeleteCalendarEvent",
+        func=_observed(lambda summary="": delete_event_tool_fn(summary.strip().strip("'\""))),
+        description="Delete a Google Calendar event by summary/title. Args: summary."
+    )
+
+    delete_events_tool = Tool(
+        name="DeleteCalendarEvents",
+        func=_observed(_delete_events_from_text),
+        description="Delete every Google Calendar event in the next 7 days whose title matches, e.g. to cancel all standups this week. Lists the matches first when there are several; after the user confirms, call it again as 'title; confirm'. Args: summary."
+    )
+
+    edit_event_tool = Tool(
+        name="EditCalendarEvent",
+        func=_observed(_edit_event_from_text),
+        description="Edit a Google Calendar event's end time. Args: one string, '<title>; <new end time>' (ISO or natural language)."
+    )
+
+    find_free_slots_tool = Tool(
+        name="FindFreeSlots",
+        func=_observed(lambda duration="30": find_free_slots_tool_fn(duration)),
+        description="Find free slots of a given length in the next 7 days during working hours, with no conflicts. Args: duration (e.g. '30 minutes', '1 hour')."
+    )
+
+    check_conflicts_tool = Tool(
+        name="CheckCalendarConflicts",
+        func=_observed(_check_conflicts_from_text),
+        description="Check whether a time range is free or conflicts with existing events. Args: the range as one string, '<start> to <end>' (ISO or natural language)."
+    )
+
+    return [show_events_tool, search_events_tool, create_event_tool, delete_event_tool, delete_events_tool, edit_event_tool,
+            find_free_slots_tool, check_conflicts_tool] 
+
+def build_structured_tools() -> List:
+    """
+    The same tools with typed argument schemas, for models with native
+    tool calling. The access token is never a tool argument; it comes
+    from the request context.
+    """
+    from langchain_core.tools import StructuredTool
+    from app.models import (
+        ConflictCheckArgs, CreateEventArgs, DeleteEventsArgs, EditEventArgs, EventTitleArgs, FindSlotsArgs,
+        SearchEventsArgs,
+    )
+
+    def show_events() -> str:
+        return show_events_tool_fn()
+
+    def search_events(query: Optional[str] = None, period: str = "next 7 days") -> str:
+        return search_events_tool_fn(query or "", period)
+
+    def create_event(summary: str, start_time: str, end_time: str,
+                     description: Optional[str] = None, location: Optional[str] = None) -> str:
+        return create_event_tool_fn(summary, start_time, end_time, description=description or "", location=location or "")
+
+    def delete_event(summary: str) -> str:
+        return delete_event_tool_fn(summary)
+
+    def delete_events(summary: str, confirm: bool = False) -> str:
+        return delete_events_tool_fn(summary, confirm=confirm)
+
+    def edit_event(summary: str, new_end_time: str) -> str:
+        return edit_event_tool_fn(summary, new_end_time)
+
+    def find_free_slots(duration_minutes: int = 30, days: int = 7) -> str:
+        return find_free_slots_tool_fn(f"{duration_minutes} minutes", days=days)
+
+    def check_conflicts(start_time: str, end_time: str) -> str:
+        return check_conflicts_tool_fn(start_time, end_time)
+
+    return [
+        StructuredTool.from_function(show_events, name="ShowCalendarEvents",
+                                     description="Show upcoming Google Calendar events for the next 7 days."),
+        StructuredTool.from_function(search_events, name="SearchCalendarEvents", args_schema=SearchEventsArgs,
+                                     description="List and count events over a period (this week, this quarter, next 30 days, ...), optionally only those mentioning some text, e.g. all 1:1s this quarter."),
+        StructuredTool.from_function(create_event, name="CreateCalendarEvent", args_schema=CreateEventArgs,
+                                     description="Create a Google Calendar event."),
+        StructuredTool.from_function(delete_event, name="DeleteCalendarEvent", args_schema=EventTitleArgs,
+                                     description="Delete one Google Calendar event by its title."),
+        StructuredTool.from_function(delete_events, name="DeleteCalendarEvents", args_schema=DeleteEventsArgs,
+                                     description="Delete every event in the next 7 days whose title matches, e.g. all standups this week. When several match, the first call only lists them; call again with confirm=true once the user agrees."),
+        StructuredTool.from_function(edit_event, name="EditCalendarEvent", args_schema=EditEventArgs,
+                                     description="Change the end time of a Google Calendar event found by title."),
+        StructuredTool.from_function(find_free_slots, name="FindFreeSlots", args_schema=FindSlotsArgs,
+                                     description="Find free slots of a given length during working hours, with no conflicts."),
+        StructuredTool.from_function(check_conflicts, name="CheckCalendarConflicts", args_schema=ConflictCheckArgs,
+                                     description="Check whether a time range is free or conflicts with existing events."),
+    ]
@@ -1,31 +1,253 @@
+import time
+
+_import_started = time.perf_counter()
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
 import os
-from fastapi import FastAPI, HTTPException
+import asyncio
+import hashlib
+import hmac
+import io
+import math
+from contextlib import asynccontextmanager
+from fastapi import BackgroundTasks, Depends, FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, SecretStr
-from typing import List, Optional
-from datetime import datetime
+from dataclasses import dataclass
+from typing import Any, List, Optional
+from datetime import datetime, timedelta
 import uvicorn
-import sys
 
-# Load environment variables
+from .models import (
+    ChatMessage, ChatResponse, BatchEventIdsRequest, BatchUpdateRequest, AvailabilityRequest, ConflictCheckRequest,
+    CreateEventRequest, EventChanges,
+)
+from fastapi.concurrency import run_in_threadpool
+from app.langchain_tools import build_tools, calendar_manager, get_calendar_manager
+from app.request_context import current_access_token, current_time_zone
+from app.api_scheduler import (
+    api_scheduler, CalendarApiError, CalendarAuthError, CalendarRateLimitError, CalendarUnavailableError,
+)
+from app.agent_executor import AgentExecutionPool, QueueFullError, ExecutorClosedError, AgentRunTimeoutError
+from app.intent_router import intent_router
+from app.datetime_parser import datetime_parser, is_time_zone
+from app.events import EVENT_FIELDS, dumps
+from app.availability import AvailabilityService, parse_working_hours
+from app.response_cache import response_cache
+from app.conversation_memory import conversation_store, is_self_contained
+from app.service_pool import user_key_for, user_keys
+from app.shared_state import shared_state
+from app.startup import startup_report
+from app.telemetry import telemetry
+from app.token_budget import token_budget
+from app.tool_calling import ToolCallingAgent
+
+# "mistral" (default) or "ollama" for a local Ollama server
+llm_backend = os.environ.get('LLM_BACKEND', 'mistral').lower()
+# "react" (default): LangChain ReAct agent; "tools": native tool calling with
+# typed schemas, parallel tool calls and usually two model calls per message
+agent_mode = os.environ.get('AGENT_MODE', 'react').lower()
+# Build the agent in the background as soon as the server starts instead of
+# on the first /chat; WARMUP_ON_STARTUP=0 leaves everything to first use
+warmup_on_startup = os.environ.get('WARMUP_ON_STARTUP', '1') != '0'
+
+# /debug/traces shows other users' prompts and event titles, so it is off
+# unless a token is configured, and callers must send it as X-Debug-Token
+debug_traces_token = os.environ.get('DEBUG_TRACES_TOKEN', '')
+
+# Largest ICS/CSV upload /calendar/import accepts (413 beyond it)
+import_max_bytes = int(os.environ.get('IMPORT_MAX_BYTES', 20 * 1024 * 1024))
+
+# How often to look for calendar push channels due for renewal
+watch_renew_interval = float(os.environ.get('CALENDAR_WATCH_CHECK_SECONDS', 300))
+# Agent runs are blocking (LLM + Google API calls), so they execute on a
+# bounded worker pool instead of the event loop
+agent_pool = AgentExecutionPool()
+
+def build_llm():
+    """
+    Chat model for the configured backend. streaming=True so token callbacks
+    fire for /chat/stream; invoke() still returns the complete message
+    """
+    if llm_backend == 'ollama':
+        from app.ollama_client import OllamaClient
+        from app.ollama_chat_model import OllamaChatModel
+        return OllamaChatModel(client=OllamaClient(model=os.environ.get('OLLAMA_MODEL', 'tinyllama')), streaming=True)
+    api_key = os.environ.get('MISTRAL_API_KEY')
+    if not api_key:
+        raise Exception('MISTRAL_API_KEY environment variable not set. Please check your .env file and restart the backend.')
+    from langchain_mistralai.chat_models import ChatMistralAI
+    return ChatMistralAI(api_key=SecretStr(api_key), streaming=True)
+
+def build_agent():
+    """
+    Agent over the calendar tools, in the configured AGENT_MODE
+    """
+    model = llm.get()
+    if agent_mode == 'tools':
+        try:
+            from app.langchain_tools import build_structured_tools
+            return ToolCallingAgent(model, build_structured_tools())
+        except NotImplementedError:
+            print(f"WARNING: {type(model).__name__} has no native tool calling; using the ReAct agent")
+    from langchain.agents import initialize_agent, AgentType
+    return initialize_agent(
+        build_tools(),
+        model,
+        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+        # Older observations are elided from the scratchpad once over budget
+        trim_intermediate_steps=token_budget.trim_steps,
+        # verbose dumps every prompt and tool call to stdout on the hot path
+        verbose=os.environ.get('AGENT_VERBOSE', '0') == '1'
+    )
+
+# Nothing heavy is built at import time: the LLM client, agent and Google
+# credentials are created on first use or by the warm-up task
+llm = startup_report.lazy("llm", build_llm)
+agent = startup_report.lazy("agent", build_agent)
+
+def run_agent(inputs, config=None):
+    """
+    Invoke the agent, building it first if needed; runs on a pool worker.
+    Each run gets a tracing callback so its steps show up in /metrics, and
+    a cancellation callback so a timed-out run stops at its next step; its
+    token usage is returned under ``tokens`` and the tools it called under
+    ``tools``
+    """
+    from app.agent_tracing import CancellationCallbackHandler, TracingCallbackHandler
+    executor = agent.get()
+    tracing = TracingCallbackHandler()
+    with token_budget.track() as usage, telemetry.span("agent", "agent.invoke") as span:
+        config = dict(config or {})
+        config["callbacks"] = list(config.get("callbacks") or []) + [CancellationCallbackHandler(), tracing]
+        result = executor.invoke(inputs, config)
+        if span is not None:
+            span.set(**usage.to_dict())
+    return dict(result, tokens=usage.to_dict(), tools=tracing.tools) if isinstance(result, dict) else result
+
+def answer_marker() -> Optional[str]:
+    """
+    Marker after which streamed LLM text is the answer: ReAct output starts
+    the answer at "Final Answer:"; tool-calling output is all answer
+    """
+    from app.streaming import FINAL_ANSWER_MARKER
+    executor = agent.peek()
+    tool_calling = agent_mode == 'tools' if executor is None else isinstance(executor, ToolCallingAgent)
+    return None if tool_calling else FINAL_ANSWER_MARKER
+
+def warm_up():
+    """
+    Build the agent and pre-load the modules and data the first request
+    would otherwise pay for. Only the agent is required for readiness;
+    the rest is best effort.
+    """
+    with startup_report.phase("warmup.agent"):
+        agent.get()
+    with startup_report.phase("warmup.streaming"):
+        import app.streaming  # noqa: F401
+    try:
+        with startup_report.phase("warmup.calendar"):
+            from app.service_pool import calendar_discovery_document
+            get_calendar_manager()
+            calendar_discovery_document()
+    except Exception as e:
+        print(f"Calendar warm-up failed: {e}")
+    try:
+        with startup_report.phase("warmup.dateparser"):
+            datetime_parser.warm_up()
+    except Exception as e:
+        print(f"dateparser warm-up failed: {e}")
+
+async def run_warm_up():
+    startup_report.warmup_started = True
+    try:
+        await run_in_threadpool(warm_up)
+    except Exception as e:
+        startup_report.warmup_error = str(e) or type(e).__name__
+        print(f"ERROR: Warm-up failed: {startup_report.warmup_error}")
+    finally:
+        startup_report.warmup_done = True
+
+def calendar_state_version(access_token: str):
+    """
+    Calendar state version for the response cache; None until the calendar
+    manager exists, since nothing can be cached for anyone before that
+    """
+    manager = calendar_manager.peek()
+    return manager.state_version(access_token) if manager is not None else None
+
+def conversation_session(user_key: str, user_id: Optional[str] = None) -> str:
+    """
+    Conversation memory key. Scoped to the access token as well as the
+    client-supplied user_id, so one user can never read another's history
+    """
+    return f"{user_key}:{user_id or ''}"
+
+def run_tools(result) -> Optional[List[str]]:
+    """
+    Tools an agent run called, or None when the result does not say
+    """
+    return result.get("tools") if isinstance(result, dict) else None
+
+def cache_version(access_token: str, session_id: str, message: ChatMessage):
+    """
+    Response cache version: calendar state and the user's timezone ("today"
+    depends on it), plus the conversation context when the prompt refers
+    back to it ("what about the second one?")
+    """
+    context = None if is_self_contained(message.content) else conversation_store.context_key(session_id)
+    return (calendar_state_version(access_token), message.time_zone, context)
+
+def check_time_zone(message: ChatMessage):
+    """
+    422 for a ``time_zone`` that is not an IANA name this host knows
+    """
+    if message.time_zone and not is_time_zone(message.time_zone):
+        raise HTTPException(status_code=422, detail=f"Unknown time_zone '{message.time_zone}'")
 
-print('DEBUG: Current working directory:', os.getcwd())
-print('DEBUG: MISTRAL_API_KEY from env:', os.environ.get('MISTRAL_API_KEY'))
-api_key = os.environ.get('MISTRAL_API_KEY')
-if not api_key:
-    print('ERROR: MISTRAL_API_KEY environment variable not set. Please check your .env file and restart the backend.')
-    sys.exit(1)
+async def renew_watch_channels():
+    """
+    Renew calendar push channels before they expire
+    """
+    while True:
+        await asyncio.sleep(watch_renew_interval)
+        manager = calendar_manager.peek()
+        if manager is None or manager.watch_manager is None:
+            continue
+        try:
+            await run_in_threadpool(manager.watch_manager.renew_due)
+        except Exception as e:
+            print(f"Error renewing calendar watch channels: {e}")
 
-from .models import ChatMessage, ChatResponse
-from langchain.agents import initialize_agent, AgentType
-from langchain_mistralai.chat_models import ChatMistralAI
-from app.langchain_tools import tools
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warmup_task = asyncio.create_task(run_warm_up()) if warmup_on_startup else None
+    renew_task = asyncio.create_task(renew_watch_channels())
+    yield
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    renew_task.cancel()
+    manager = calendar_manager.peek()
+    if manager is not None and manager.watch_manager is not None:
+        # Otherwise Google keeps posting to this server until the channels expire
+        await run_in_threadpool(manager.watch_manager.stop_all)
+    agent_pool.shutdown()
+    executor = agent.peek()
+    if executor is not None and hasattr(executor, 'shutdown'):
+        executor.shutdown()
+    if conversation_store.backend is not None:
+        conversation_store.backend.close()
+    shared_state.close()
+    model = llm.peek()
+    if model is not None and llm_backend == 'ollama':
+        model.client.close()
+        await model.client.aclose()
 
-app = FastAPI(title="TailorTalk API", version="1.0.0")
+app = FastAPI(title="TailorTalk API", version="1.0.0", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -36,14 +258,86 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize LangChain agent
-llm = ChatMistralAI(api_key=SecretStr(api_key))
-agent = initialize_agent(
-    tools,
-    llm,
-    agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-    verbose=True
-)
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template so /calendar/events/{event_id} is one series
+        route = request.scope.get("route")
+        telemetry.http_seconds.observe(
+            time.perf_counter() - started,
+            route=getattr(route, "path", "unmatched"),
+            method=request.method,
+            status=status,
+        )
+
+def bearer_token(authorization: Optional[str] = Header(None)) -> str:
+    """
+    Google OAuth access token from an ``Authorization: Bearer`` header;
+    empty (the service account) when none is sent
+    """
+    if authorization and authorization.lower().startswith("bearer "):
+        return authorization[7:].strip()
+    return ""
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Validate a ``fields=id,summary,start`` partial-response selector
+    """
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in EVENT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown fields: {', '.join(unknown)}")
+    return names or None
+
+def calendar_error(error: Exception) -> HTTPException:
+    """
+    HTTP error for a failed request: 429, 503 or 401 (with Retry-After
+    when Google gave one) for Google API errors callers can act on, 500
+    for anything else
+    """
+    if not isinstance(error, CalendarApiError):
+        return HTTPException(status_code=500, detail=str(error))
+    if isinstance(error, CalendarRateLimitError):
+        status_code = 429
+    elif isinstance(error, CalendarUnavailableError):
+        status_code = 503
+    elif isinstance(error, CalendarAuthError):
+        status_code = 401
+    else:
+        status_code = 502
+    headers = {"Retry-After": str(max(1, math.ceil(error.retry_after)))} if error.retry_after else None
+    return HTTPException(status_code=status_code, detail=str(error), headers=headers)
+
+class EventJSONResponse(JSONResponse):
+    """
+    JSON response written by ``app.events.dumps``, so Event records are
+    serialized directly (with orjson when installed) instead of going
+    through jsonable_encoder
+    """
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+def etag_response(request: Request, body, etag: Optional[str] = None) -> Response:
+    """
+    JSON response with an ETag (``etag``, or a hash of the content); 304
+    when the client already has it
+    """
+    content = dumps(body)
+    etag = etag or '"' + hashlib.sha256(content).hexdigest()[:32] + '"'
+    if_none_match = request.headers.get("if-none-match", "")
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    client_tags = [tag.strip()[2:] if tag.strip().startswith("W/") else tag.strip() for tag in if_none_match.split(",")]
+    if etag in client_tags or if_none_match.strip() == "*":
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=content, media_type="application/json", headers={"ETag": etag})
 
 @app.get("/")
 async def root():
@@ -69,113 +363,641 @@ async def health_check():
             "error": str(e)
         }
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness: 200 once warm-up has built the agent (or immediately when
+    warm-up is disabled), 503 while it is still running or if it failed.
+    /health stays a pure liveness check.
+    """
+    agent_status = agent.status()
+    ready = agent.ready or (not warmup_on_startup and agent.error is None)
+    body = {
+        "status": "ready" if ready else ("error" if startup_report.warmup_error else "starting"),
+        "timestamp": datetime.utcnow().isoformat(),
+        "agent": agent_status,
+        # Which worker answered, when several run behind one port
+        "worker_pid": os.getpid(),
+    }
+    if startup_report.warmup_error:
+        body["error"] = startup_report.warmup_error
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+@app.get("/startup/stats")
+async def startup_stats():
+    """
+    Import time, warm-up phase timings and lazy component build times
+    """
+    return startup_report.stats()
+
 @app.get("/ping")
 async def ping():
     return {"message": "pong"}
 
+def agent_output(response) -> str:
+    """
+    Ensure the agent response is a string for ChatResponse
+    """
+    if isinstance(response, dict):
+        return response.get('output', str(response))
+    return str(response)
+
+def forget_answers(access_token: str):
+    """
+    Drop the user's cached chat answers after a write. Resolving the user
+    can call Google and invalidating touches shared state, so endpoints
+    run this on a worker thread.
+    """
+    response_cache.invalidate_user(user_key_for(access_token))
+
+@dataclass
+class ChatTurn:
+    """
+    What a chat request needs before its run: the user's key and session,
+    and either a cached answer, a router match or the agent's input
+    """
+    user_key: str
+    session_id: str
+    cacheable: bool
+    cached: Optional[str] = None
+    match: Any = None
+    agent_input: Optional[str] = None
+
+def prepare_chat(message: ChatMessage) -> ChatTurn:
+    """
+    Resolve the user, look up a cached answer (recording it in the
+    conversation) and otherwise route the message or build the agent's
+    input. Shared state and the conversation store may be SQLite or Redis,
+    so this runs on a worker thread, not the event loop.
+    """
+    access_token = message.access_token or ""
+    user_key = user_key_for(access_token)
+    session_id = conversation_session(user_key, message.user_id)
+    # Read-only questions are answered from cache while the user's
+    # calendar state is unchanged
+    turn = ChatTurn(user_key, session_id, response_cache.cacheable(message.content))
+    if turn.cacheable:
+        turn.cached = response_cache.get(user_key, message.content, cache_version(access_token, session_id, message))
+        if turn.cached is not None:
+            conversation_store.append(session_id, message.content, turn.cached)
+            return turn
+    # Clear-cut commands skip the LLM and call the tools directly
+    turn.match = intent_router.route(message.content)
+    if turn.match is None:
+        turn.agent_input = conversation_store.build_input(session_id, message.content)
+    return turn
+
+def finish_chat(message: ChatMessage, turn: ChatTurn, result) -> str:
+    """
+    The answer text, cached when the run changed nothing and recorded in
+    the conversation; runs on a worker thread like ``prepare_chat``
+    """
+    response_message = agent_output(result)
+    if turn.cacheable and response_cache.storable(turn.match.intent if turn.match else None, run_tools(result)):
+        response_cache.put(turn.user_key, message.content,
+                           cache_version(message.access_token or "", turn.session_id, message), response_message)
+    conversation_store.append(turn.session_id, message.content, response_message)
+    return response_message
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat(message: ChatMessage):
+async def chat(message: ChatMessage, response: Response):
     """
     Process a chat message and return the agent's response using LangChain
     """
-    try:
-        print("DEBUG: ChatMessage received:", message)
-        print("DEBUG: access_token:", message.access_token)
-        # Pass only the user message string as a dict with 'input' key
-        response = agent.invoke({"input": message.content})
-        # Ensure response is a string for ChatResponse
-        if isinstance(response, dict):
-            response_message = response.get('output', str(response))
-        else:
-            response_message = str(response)
-        return ChatResponse(
-            message=response_message,
-            timestamp=message.timestamp or datetime.utcnow(),
-            success=True,
-            error=None
+    check_time_zone(message)
+    with telemetry.trace("chat") as trace:
+        if trace is not None:
+            response.headers["X-Trace-Id"] = trace.trace_id
+        try:
+            turn = await run_in_threadpool(prepare_chat, message)
+            if turn.cached is not None:
+                return ChatResponse(
+                    message=turn.cached,
+                    timestamp=message.timestamp or datetime.utcnow(),
+                    success=True,
+                    error=None
+                )
+            # Bind the user's token to this request; the worker pool copies the
+            # context so the tools pick it up
+            token = current_access_token.set(message.access_token or "")
+            zone_token = current_time_zone.set(message.time_zone or "")
+            try:
+                if turn.match is not None:
+                    result = await agent_pool.run(intent_router.execute, turn.match)
+                else:
+                    result = await agent_pool.run(run_agent, {"input": turn.agent_input})
+            finally:
+                current_access_token.reset(token)
+                current_time_zone.reset(zone_token)
+            response_message = await run_in_threadpool(finish_chat, message, turn, result)
+            return ChatResponse(
+                message=response_message,
+                timestamp=message.timestamp or datetime.utcnow(),
+                success=True,
+                error=None,
+                tokens=result.get("tokens") if isinstance(result, dict) else None
+            )
+        except QueueFullError:
+            raise HTTPException(status_code=429, detail="Too many chat requests in flight. Please retry shortly.", headers={"Retry-After": "1"})
+        except ExecutorClosedError:
+            raise HTTPException(status_code=503, detail="Server is shutting down.", headers={"Retry-After": "5"})
+        except AgentRunTimeoutError:
+            raise HTTPException(status_code=504, detail="The assistant took too long to respond.")
+        except Exception as e:
+            raise calendar_error(e)
+
+@app.post("/chat/stream")
+async def chat_stream(message: ChatMessage):
+    """
+    Process a chat message and stream progress as Server-Sent Events:
+    ``token`` (final answer text as it is generated), ``tool_start``,
+    ``tool_end``, then ``final`` with the full answer or ``error``
+    """
+    check_time_zone(message)
+    stream_headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    turn = await run_in_threadpool(prepare_chat, message)
+    if turn.cached is not None:
+        from app.streaming import sse_event
+        return StreamingResponse(
+            iter([sse_event("final", {"message": turn.cached, "cached": True})]),
+            media_type="text/event-stream",
+            headers=stream_headers,
         )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+
+    def to_message(response) -> str:
+        return finish_chat(message, turn, response)
+
+    from app.streaming import StreamingCallbackHandler, stream_run
+    queue: asyncio.Queue = asyncio.Queue()
+    handler = StreamingCallbackHandler(asyncio.get_running_loop(), queue, final_marker=answer_marker())
+    token = current_access_token.set(message.access_token or "")
+    zone_token = current_time_zone.set(message.time_zone or "")
+    try:
+        # The worker copies this context, so the run's spans land in this
+        # trace even though it finishes after the response starts
+        with telemetry.trace("chat_stream") as trace:
+            if trace is not None:
+                stream_headers["X-Trace-Id"] = trace.trace_id
+            if turn.match is not None:
+                run = agent_pool.submit(intent_router.execute, turn.match)
+            else:
+                run = agent_pool.submit(run_agent, {"input": turn.agent_input}, {"callbacks": [handler]})
+    except QueueFullError:
+        raise HTTPException(status_code=429, detail="Too many chat requests in flight. Please retry shortly.", headers={"Retry-After": "1"})
+    except ExecutorClosedError:
+        raise HTTPException(status_code=503, detail="Server is shutting down.", headers={"Retry-After": "5"})
+    finally:
+        current_access_token.reset(token)
+        current_time_zone.reset(zone_token)
+    return StreamingResponse(
+        stream_run(run, queue, to_message),
+        media_type="text/event-stream",
+        headers=stream_headers,
+    )
+
+@app.get("/chat/stats")
+async def chat_stats():
+    """
+    Agent worker pool metrics: queue depth, in-flight runs and wait times,
+    plus fast-path router, response cache, datetime parser, conversation
+    memory and token budget counters
+    """
+    return {
+        **agent_pool.stats(),
+        "router": intent_router.stats(),
+        "response_cache": response_cache.stats(),
+        "datetime_parser": datetime_parser.stats(),
+        "memory": conversation_store.stats(),
+        "token_budget": token_budget.stats(),
+        "agent_mode": agent_mode,
+        "shared_state": shared_state.stats(),
+        "worker_pid": os.getpid(),
+    }
+
+@app.delete("/chat/history")
+async def clear_chat_history(user_id: Optional[str] = None, access_token: str = Depends(bearer_token)):
+    """
+    Forget the conversation for this access token (and ``user_id``)
+    """
+    await run_in_threadpool(lambda: conversation_store.clear(conversation_session(user_key_for(access_token), user_id)))
+    return {"success": True}
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Latency histograms and counters in Prometheus text format
+    """
+    return PlainTextResponse(telemetry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/traces")
+async def debug_traces(limit: int = Query(20, ge=1, le=100), x_debug_token: Optional[str] = Header(None)):
+    """
+    Most recent request traces with their span trees, newest first; 404
+    unless DEBUG_TRACES_TOKEN is set, 403 without the matching X-Debug-Token
+    """
+    if not debug_traces_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest((x_debug_token or "").encode(), debug_traces_token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid debug token")
+    return {"traces": telemetry.recent_traces(limit)}
+
+@app.get("/calendar/cache/stats")
+async def calendar_cache_stats():
+    """
+    Event cache, Calendar client pool, account key and Google API quota
+    scheduler metrics
+    """
+    manager = calendar_manager.peek()
+    if manager is None:
+        return {"event_cache": None, "service_pool": None, "watch": None, "user_keys": user_keys.stats(),
+                "scheduler": api_scheduler.stats()}
+    return {
+        "event_cache": manager.event_cache.stats() if manager.event_cache else None,
+        "service_pool": manager.service_pool.stats(),
+        "watch": manager.watch_manager.stats() if manager.watch_manager else None,
+        "user_keys": user_keys.stats(),
+        "scheduler": api_scheduler.stats(),
+    }
+
+@app.post("/calendar/notifications")
+async def calendar_notification(request: Request, background_tasks: BackgroundTasks):
+    """
+    Webhook for Calendar push channels (CALENDAR_WEBHOOK_URL). Answers
+    right away; the changed calendar is re-synced in the background.
+    """
+    manager = calendar_manager.peek()
+    if manager is None or manager.watch_manager is None:
+        # Channels from before a restart; they lapse at their expiration
+        return Response(status_code=200)
+    # Both read and bump shared state, which may be SQLite or Redis
+    authentic, channel = await run_in_threadpool(manager.watch_manager.handle_notification, request.headers)
+    if not authentic:
+        raise HTTPException(status_code=403, detail="Invalid channel token")
+    if channel is not None:
+        await run_in_threadpool(response_cache.invalidate_user, channel.user_key)
+        background_tasks.add_task(run_in_threadpool, manager.watch_manager.refresh, channel)
+    return Response(status_code=200)
 
 @app.get("/calendar/events")
-async def get_calendar_events():
+async def get_calendar_events(
+    request: Request,
+    time_min: Optional[datetime] = None,
+    time_max: Optional[datetime] = None,
+    page_token: Optional[str] = None,
+    max_results: int = Query(50, ge=1, le=250),
+    q: Optional[str] = None,
+    fields: Optional[str] = None,
+    access_token: str = Depends(bearer_token),
+):
     """
-    Get upcoming calendar events
+    One page of calendar events; pass ``next_page_token`` back as
+    ``page_token`` for the next page (which keeps the first page's window
+    and filters) and ``fields`` to trim each event
     """
+    field_list = parse_fields(fields)
     try:
-        # The calendar manager is no longer part of TailorTalkAgent,
-        # so this endpoint will need to be refactored or removed if not used.
-        # For now, returning a placeholder message.
-        return {"message": "Calendar functionality is currently disabled."}
+        page = await run_in_threadpool(
+            lambda: get_calendar_manager().list_events(
+                time_min=time_min, time_max=time_max, page_token=page_token, max_results=max_results,
+                query=q, fields=field_list, access_token=access_token,
+            )
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise calendar_error(e)
+    events = page["events"]
+    if field_list:
+        events = [event.to_dict(field_list) for event in events]
+    return etag_response(request, {
+        "events": events,
+        "total_count": len(page["events"]),
+        "next_page_token": page["next_page_token"],
+        "success": True,
+        "error": None,
+    })
 
-@app.post("/calendar/events")
-async def create_calendar_event(event_data: dict):
+@app.post("/calendar/events", status_code=201)
+async def create_calendar_event(event_data: CreateEventRequest, access_token: str = Depends(bearer_token)):
     """
     Create a new calendar event
     """
     try:
-        # Use the calendar manager directly
-        # The calendar manager is no longer part of TailorTalkAgent,
-        # so this endpoint will need to be refactored or removed if not used.
-        # For now, returning a placeholder message.
-        return {"message": "Calendar functionality is currently disabled."}
+        event = await run_in_threadpool(
+            lambda: get_calendar_manager().create_event(
+                event_data.summary, event_data.start_time, event_data.end_time,
+                description=event_data.description or "", location=event_data.location or "",
+                access_token=access_token,
+            )
+        )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise calendar_error(e)
+    await run_in_threadpool(forget_answers, access_token)
+    return EventJSONResponse(event, status_code=201)
 
 @app.delete("/calendar/events/{event_id}")
-async def delete_calendar_event(event_id: str):
+async def delete_calendar_event(event_id: str, access_token: str = Depends(bearer_token)):
     """
     Delete a calendar event
     """
     try:
-        # The calendar manager is no longer part of TailorTalkAgent,
-        # so this endpoint will need to be refactored or removed if not used.
-        # For now, returning a placeholder message.
-        return {"message": "Calendar functionality is currently disabled."}
+        deleted = await run_in_threadpool(
+            lambda: get_calendar_manager().delete_event(event_id, access_token=access_token)
+        )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise calendar_error(e)
+    if deleted:
+        await run_in_threadpool(forget_answers, access_token)
+    return {"event_id": event_id, "deleted": deleted, "success": deleted}
 
 @app.put("/calendar/events/{event_id}")
-async def update_calendar_event(event_id: str, event_data: dict):
+@app.patch("/calendar/events/{event_id}")
+async def update_calendar_event(
+    event_id: str,
+    event_data: EventChanges,
+    if_match: Optional[str] = Header(None),
+    access_token: str = Depends(bearer_token),
+):
+    """
+    Update an existing calendar event. Only the fields given are changed,
+    with a single ``events.patch`` call; send the event's ETag as
+    ``If-Match`` to get 412 instead of overwriting a concurrent edit
+    """
+    from app.calendar_utils import EventConflictError
+    changes = event_data.model_dump(exclude_none=True)
+    if not changes.keys() - {"time_zone"}:
+        raise HTTPException(status_code=422, detail="No fields to update")
+    try:
+        event = await run_in_threadpool(
+            lambda: get_calendar_manager().update_event(event_id, access_token=access_token, etag=if_match, **changes)
+        )
+    except EventConflictError as e:
+        current = e.current.to_dict() if e.current is not None else None
+        raise HTTPException(status_code=412, detail={"message": str(e), "current": current})
+    except Exception as e:
+        raise calendar_error(e)
+    await run_in_threadpool(forget_answers, access_token)
+    return EventJSONResponse(event, headers={"ETag": event.etag} if event.etag else None)
+
+@app.post("/calendar/events/batch/get")
+async def batch_get_calendar_events(request: BatchEventIdsRequest, access_token: str = Depends(bearer_token)):
+    """
+    Get several calendar events in one batched round trip
+    """
+    try:
+        events = await run_in_threadpool(
+            lambda: get_calendar_manager().batch_get(request.event_ids, access_token=access_token)
+        )
+        return EventJSONResponse({"events": events, "success": all(e is not None for e in events.values())})
+    except Exception as e:
+        raise calendar_error(e)
+
+@app.post("/calendar/events/batch/delete")
+async def batch_delete_calendar_events(request: BatchEventIdsRequest, access_token: str = Depends(bearer_token)):
+    """
+    Delete several calendar events in one batched round trip
+    """
+    try:
+        deleted = await run_in_threadpool(
+            lambda: get_calendar_manager().batch_delete(request.event_ids, access_token=access_token)
+        )
+        return {"deleted": deleted, "success": all(deleted.values())}
+    except Exception as e:
+        raise calendar_error(e)
+
+@app.post("/calendar/events/batch/update")
+async def batch_update_calendar_events(request: BatchUpdateRequest, access_token: str = Depends(bearer_token)):
+    """
+    Update several calendar events in one batched round trip
     """
-    Update an existing calendar event
+    try:
+        updates = [u.model_dump(exclude_none=True) for u in request.updates]
+        events = await run_in_threadpool(
+            lambda: get_calendar_manager().batch_update(updates, access_token=access_token)
+        )
+        return EventJSONResponse({"events": events, "success": all(e is not None for e in events.values())})
+    except Exception as e:
+        raise calendar_error(e)
+
+@app.post("/calendar/availability")
+async def find_calendar_availability(request: AvailabilityRequest, access_token: str = Depends(bearer_token)):
+    """
+    Free slots where every given calendar/attendee is free, plus the merged
+    busy intervals they were computed from
     """
     try:
-        # The calendar manager is no longer part of TailorTalkAgent,
-        # so this endpoint will need to be refactored or removed if not used.
-        # For now, returning a placeholder message.
-        return {"message": "Calendar functionality is currently disabled."}
+        working_hours = parse_working_hours(request.working_hours)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if request.time_min and request.time_max and request.time_max <= request.time_min:
+        raise HTTPException(status_code=422, detail="time_max must be after time_min")
+    try:
+        result = await run_in_threadpool(
+            lambda: AvailabilityService(get_calendar_manager()).find_slots(
+                timedelta(minutes=request.duration_minutes),
+                time_min=request.time_min,
+                time_max=request.time_max,
+                calendar_ids=request.calendar_ids,
+                limit=request.limit,
+                working_hours=working_hours,
+                access_token=access_token,
+            )
+        )
+        return {
+            "slots": [{"start": start, "end": end} for start, end in result["slots"]],
+            "busy": [{"start": start, "end": end} for start, end in result["busy"]],
+            "errors": result["errors"],
+            "success": not result["errors"],
+        }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise calendar_error(e)
+
+@app.post("/calendar/conflicts")
+async def check_calendar_conflicts(request: ConflictCheckRequest, access_token: str = Depends(bearer_token)):
+    """
+    Whether a time range is free on every given calendar/attendee, with the
+    overlapping busy intervals per calendar
+    """
+    if request.end <= request.start:
+        raise HTTPException(status_code=422, detail="end must be after start")
+    try:
+        result = await run_in_threadpool(
+            lambda: AvailabilityService(get_calendar_manager()).check_conflicts(
+                request.start, request.end, calendar_ids=request.calendar_ids,
+                access_token=access_token,
+            )
+        )
+        return {
+            "free": result["free"],
+            "conflicts": {
+                calendar_id: [{"start": start, "end": end} for start, end in intervals]
+                for calendar_id, intervals in result["conflicts"].items()
+            },
+            "errors": result["errors"],
+            "success": not result["errors"],
+        }
+    except Exception as e:
+        raise calendar_error(e)
+
+@app.post("/calendar/import")
+async def import_calendar_events(
+    request: Request,
+    format: str = Query("ics", pattern="^(ics|csv)$"),
+    time_zone: str = "UTC",
+    import_id: Optional[str] = None,
+    dedupe: bool = True,
+    access_token: str = Depends(bearer_token),
+):
+    """
+    Import the ICS or CSV file sent as the request body, streaming
+    ``progress`` Server-Sent Events and then ``final`` with the counts (or
+    ``error``). Events whose UID is already on the calendar are skipped
+    unless ``dedupe=false``. With an ``import_id``, progress is
+    checkpointed: sending the same file with the same id resumes an
+    interrupted import. The import finishes even if the client disconnects.
+    Files over IMPORT_MAX_BYTES are refused with 413.
+    """
+    import tempfile
+    from app.calendar_io import EventImporter, StateCheckpoint, parse_events
+    from app.streaming import sse_event
+    too_large = HTTPException(status_code=413, detail=f"Import file is larger than {import_max_bytes} bytes")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > import_max_bytes:
+        raise too_large
+    # Spooled to disk so the upload is never held in memory, then parsed line by line
+    upload = tempfile.TemporaryFile()
+    received = 0
+    async for chunk in request.stream():
+        # Content-Length may be absent (chunked uploads) or wrong
+        received += len(chunk)
+        if received > import_max_bytes:
+            upload.close()
+            raise too_large
+        await run_in_threadpool(upload.write, chunk)
+    upload.seek(0)
+    user_key = await run_in_threadpool(user_key_for, access_token)
+    checkpoint = StateCheckpoint(f"import:{user_key}:{import_id}") if import_id else None
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def run_import():
+        try:
+            with io.TextIOWrapper(upload, encoding="utf-8-sig", newline="") as lines:
+                return EventImporter(get_calendar_manager()).run(
+                    parse_events(lines, format, time_zone), access_token=access_token, checkpoint=checkpoint,
+                    progress=lambda done: loop.call_soon_threadsafe(queue.put_nowait, done.to_dict()),
+                    dedupe=dedupe,
+                )
+        finally:
+            response_cache.invalidate_user(user_key)
+
+    task = asyncio.ensure_future(run_in_threadpool(run_import))
+
+    async def stream():
+        get_task: Optional[asyncio.Future] = None
+        try:
+            while True:
+                get_task = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({get_task, task}, return_when=asyncio.FIRST_COMPLETED)
+                if get_task not in done:
+                    break
+                yield sse_event("progress", get_task.result())
+        finally:
+            if get_task is not None and not get_task.done():
+                get_task.cancel()
+        while not queue.empty():
+            yield sse_event("progress", queue.get_nowait())
+        try:
+            result = task.result()
+        except Exception as e:
+            yield sse_event("error", {"detail": str(calendar_error(e).detail) or type(e).__name__})
+            return
+        yield sse_event("final", result.to_dict())
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/calendar/export")
+async def export_calendar_events(
+    format: str = Query("ics", pattern="^(ics|csv)$"),
+    time_min: Optional[datetime] = None,
+    time_max: Optional[datetime] = None,
+    access_token: str = Depends(bearer_token),
+):
+    """
+    Download the calendar's events (default: all of them) as an ICS or
+    CSV file, written page by page as Google returns them. Recurring
+    events are exported once, with their rules.
+    """
+    from itertools import chain, islice
+    from app.calendar_io import EPOCH, export_chunks
+    events = get_calendar_manager().iter_events(
+        time_min or EPOCH, time_max, expand_recurring=False, access_token=access_token,
+    )
+    # Fetch the first page before answering, so a failure is an HTTP error rather than a cut-off file
+    try:
+        first = await run_in_threadpool(lambda: list(islice(events, 1)))
+    except Exception as e:
+        raise calendar_error(e)
+    return StreamingResponse(
+        export_chunks(chain(first, events), format),
+        media_type="text/calendar" if format == "ics" else "text/csv",
+        headers={"Content-Disposition": f'attachment; filename="calendar.{format}"'},
+    )
 
 @app.get("/calendar/events/search")
-async def search_calendar_events(query: str):
+async def search_calendar_events(
+    request: Request,
+    query: str,
+    days: int = Query(30, ge=1, le=365),
+    limit: int = Query(5, ge=1, le=50),
+    access_token: str = Depends(bearer_token),
+):
     """
-    Search for calendar events by title
+    Search for calendar events by title, best matches first
     """
     try:
-        # The calendar manager is no longer part of TailorTalkAgent,
-        # so this endpoint will need to be refactored or removed if not used.
-        # For now, returning a placeholder message.
-        return {"message": "Calendar functionality is currently disabled."}
+        events = await run_in_threadpool(
+            lambda: get_calendar_manager().search_events_by_title(
+                query, access_token=access_token, days=days, limit=limit
+            )
+        )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise calendar_error(e)
+    return etag_response(request, {"events": events, "total_count": len(events), "success": True, "error": None})
 
 @app.get("/calendar/events/{event_id}")
-async def get_calendar_event(event_id: str):
+async def get_calendar_event(
+    request: Request,
+    event_id: str,
+    fields: Optional[str] = None,
+    access_token: str = Depends(bearer_token),
+):
     """
     Get a specific calendar event by ID
     """
+    field_list = parse_fields(fields)
     try:
-        # The calendar manager is no longer part of TailorTalkAgent,
-        # so this endpoint will need to be refactored or removed if not used.
-        # For now, returning a placeholder message.
-        return {"message": "Calendar functionality is currently disabled."}
+        event = await run_in_threadpool(
+            lambda: get_calendar_manager().get_event_by_id(event_id, access_token=access_token)
+        )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise calendar_error(e)
+    if event is None:
+        raise HTTPException(status_code=404, detail=f"Event '{event_id}' not found")
+    # Google's own ETag, so clients can send it back as If-Match
+    if field_list:
+        return etag_response(request, event.to_dict(field_list))
+    return etag_response(request, event, etag=event.etag)
+
+startup_report.record("import.app_main", time.perf_counter() - _import_started)
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8004))
-    uvicorn.run(app, host="0.0.0.0", port=port) 
\ No newline at end of file
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    if workers > 1:
+        # Each worker imports the app and runs its own warm-up; set
+        # SHARED_STATE_URL so they share sessions and cache invalidations
+        uvicorn.run("app.main:app", host="0.0.0.0", port=port, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port) 
\ No newline at end of file
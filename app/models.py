@@ -10,6 +10,7 @@ class ChatMessage(BaseModel):
     timestamp: Optional[datetime] = Field(default_factory=datetime.utcnow, description="Message timestamp")
     user_id: Optional[str] = Field(None, description="User identifier")
     access_token: Optional[str] = Field(None, description="Google OAuth access token for calendar actions")
+    time_zone: Optional[str] = Field(None, description="IANA timezone of the user, e.g. 'Europe/Berlin' (default: their calendar's)")
 
 class ChatResponse(BaseModel):
     """
@@ -19,6 +20,7 @@ class ChatResponse(BaseModel):
     timestamp: datetime = Field(default_factory=datetime.utcnow, description="Response timestamp")
     success: bool = Field(True, description="Whether the operation was successful")
     error: Optional[str] = Field(None, description="Error message if any")
+    tokens: Optional[Dict[str, int]] = Field(None, description="LLM calls and tokens spent, when the agent answered")
 
 class CalendarEvent(BaseModel):
     """
@@ -41,23 +43,105 @@ class CreateEventRequest(BaseModel):
     description: Optional[str] = Field(None, description="Event description")
     location: Optional[str] = Field(None, description="Event location")
 
-class UpdateEventRequest(BaseModel):
+class EventChanges(BaseModel):
     """
-    Model for updating calendar events
+    Model for the fields of a calendar event to change
     """
-    event_id: str = Field(..., description="Event ID to update")
     summary: Optional[str] = Field(None, description="New event title")
     start_time: Optional[str] = Field(None, description="New start time in ISO format")
     end_time: Optional[str] = Field(None, description="New end time in ISO format")
     description: Optional[str] = Field(None, description="New event description")
     location: Optional[str] = Field(None, description="New event location")
+    time_zone: Optional[str] = Field(None, description="IANA time zone for start/end times given without a UTC offset")
+
+class UpdateEventRequest(EventChanges):
+    """
+    Model for updating calendar events
+    """
+    event_id: str = Field(..., description="Event ID to update")
+
+class BatchEventIdsRequest(BaseModel):
+    """
+    Model for batch get/delete requests
+    """
+    event_ids: List[str] = Field(..., description="Event IDs to act on")
+
+class BatchUpdateRequest(BaseModel):
+    """
+    Model for batch update requests
+    """
+    updates: List[UpdateEventRequest] = Field(..., description="Updates to apply")
+
+class AvailabilityRequest(BaseModel):
+    """
+    Model for free slot searches
+    """
+    duration_minutes: int = Field(30, gt=0, description="Length of the slot to find")
+    time_min: Optional[datetime] = Field(None, description="Start of the search window (default: now)")
+    time_max: Optional[datetime] = Field(None, description="End of the search window (default: 7 days after time_min)")
+    calendar_ids: List[str] = Field(default_factory=lambda: ["primary"], description="Calendar IDs or attendee emails that must all be free")
+    working_hours: Optional[str] = Field(None, description="Allowed hours such as '9-17' (default: AVAILABILITY_WORKING_HOURS)")
+    limit: int = Field(5, gt=0, le=100, description="Maximum number of slots to return")
+
+class ConflictCheckRequest(BaseModel):
+    """
+    Model for conflict checks
+    """
+    start: datetime = Field(..., description="Start of the range to check")
+    end: datetime = Field(..., description="End of the range to check")
+    calendar_ids: List[str] = Field(default_factory=lambda: ["primary"], description="Calendar IDs or attendee emails to check")
+
+class EventTitleArgs(BaseModel):
+    """
+    Tool arguments naming an existing event
+    """
+    summary: str = Field(..., description="Title of the event, as the user refers to it")
+
+class DeleteEventsArgs(EventTitleArgs):
+    """
+    Tool arguments for deleting every event matching a title
+    """
+    confirm: bool = Field(False, description="True only after the user has confirmed the listed matches")
+
+class CreateEventArgs(CreateEventRequest):
+    """
+    Tool arguments for creating an event; times may be ISO or natural language
+    """
+
+class EditEventArgs(EventTitleArgs):
+    """
+    Tool arguments for changing an event's end time
+    """
+    new_end_time: str = Field(..., description="New end time, ISO or natural language")
+
+class FindSlotsArgs(BaseModel):
+    """
+    Tool arguments for free slot searches
+    """
+    duration_minutes: int = Field(30, gt=0, description="Length of the slot to find, in minutes")
+    days: int = Field(7, gt=0, le=31, description="How many days ahead to search")
+
+class SearchEventsArgs(BaseModel):
+    """
+    Tool arguments for listing events over a period, optionally by text
+    """
+    query: Optional[str] = Field(None, description="Text the events must mention, e.g. '1:1' or 'standup'; empty for all events")
+    period: str = Field("next 7 days", description="'today', 'this week', 'next month', 'this quarter', 'this year', 'next 30 days', ...")
+
+class ConflictCheckArgs(BaseModel):
+    """
+    Tool arguments for conflict checks; times may be ISO or natural language
+    """
+    start_time: str = Field(..., description="Start of the range to check")
+    end_time: str = Field(..., description="End of the range to check")
 
 class CalendarEventsResponse(BaseModel):
     """
     Model for calendar events response
     """
     events: List[CalendarEvent] = Field(..., description="List of calendar events")
-    total_count: int = Field(..., description="Total number of events")
+    total_count: int = Field(..., description="Number of events in this page")
+    next_page_token: Optional[str] = Field(None, description="Token for the next page, if any")
     success: bool = Field(True, description="Whether the operation was successful")
     error: Optional[str] = Field(None, description="Error message if any")
 
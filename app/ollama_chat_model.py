@@ -0,0 +1,78 @@
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict, Field
+
+from app.ollama_client import OllamaClient
+
+_ROLES = {"human": "user", "ai": "assistant", "system": "system", "tool": "tool"}
+
+
+def to_ollama_messages(messages: List[BaseMessage]) -> List[Dict[str, str]]:
+    return [
+        {"role": _ROLES.get(message.type, "user"), "content": str(message.content)}
+        for message in messages
+    ]
+
+
+class OllamaChatModel(BaseChatModel):
+    """
+    LangChain chat model backed by the pooled OllamaClient, so the agent can
+    run on a local Ollama server with connection reuse, retries and streaming
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    client: OllamaClient = Field(default_factory=OllamaClient)
+    temperature: Optional[float] = None
+    streaming: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "ollama-pooled"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.client.model, "base_url": self.client.base_url}
+
+    def _options(self, stop: Optional[List[str]]) -> Dict[str, Any]:
+        return {"stop": stop, "temperature": self.temperature}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        if self.streaming:
+            text = "".join(chunk.text for chunk in self._stream(messages, stop, run_manager, **kwargs))
+        else:
+            text = self.client.complete(to_ollama_messages(messages), **self._options(stop))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        if self.streaming:
+            parts = []
+            async for chunk in self._astream(messages, stop, run_manager, **kwargs):
+                parts.append(chunk.text)
+            text = "".join(parts)
+        else:
+            text = await self.client.acomplete(to_ollama_messages(messages), **self._options(stop))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for delta in self.client.stream(to_ollama_messages(messages), **self._options(stop)):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=delta))
+            if run_manager:
+                run_manager.on_llm_new_token(delta, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        async for delta in self.client.astream(to_ollama_messages(messages), **self._options(stop)):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=delta))
+            if run_manager:
+                await run_manager.on_llm_new_token(delta, chunk=chunk)
+            yield chunk
@@ -1,34 +1,321 @@
-import requests
+import asyncio
+import json
 import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import httpx
+
+# Status codes worth retrying; anything else is returned to the caller
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when the circuit breaker is open and calls are short-circuited
+    """
+
+
+class OllamaError(Exception):
+    """
+    Raised when Ollama returns an error response or cannot be reached
+    """
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Stop calling a backend after repeated failures, then let a single
+        probe through once ``reset_timeout`` has passed
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release(self):
+        """
+        End a call without judging the backend, freeing the half-open probe
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
 
 class OllamaClient:
-    def __init__(self, model="tinyllama"):
+    def __init__(self, model: str = "tinyllama", base_url: Optional[str] = None,
+                 timeout: Optional[float] = None, connect_timeout: Optional[float] = None,
+                 max_retries: Optional[int] = None, max_concurrency: Optional[int] = None,
+                 max_connections: Optional[int] = None):
+        """
+        Client for Ollama's OpenAI-compatible chat API.
+
+        Sync and async calls share the same settings: keep-alive connection
+        pools, configurable timeouts, jittered exponential retries, a circuit
+        breaker and a cap on concurrent requests.
+        """
         # Use environment variable for Ollama URL, fallback to localhost
-        self.base_url = os.environ.get("OLLAMA_URL", "http://localhost:11434")
+        self.base_url = base_url or os.environ.get("OLLAMA_URL", "http://localhost:11434")
         self.model = model
+        self.timeout = httpx.Timeout(
+            timeout or float(os.environ.get("OLLAMA_TIMEOUT_SECONDS", 60)),
+            connect=connect_timeout or float(os.environ.get("OLLAMA_CONNECT_TIMEOUT_SECONDS", 5)),
+        )
+        self.max_retries = max_retries if max_retries is not None else int(os.environ.get("OLLAMA_MAX_RETRIES", 2))
+        self.max_concurrency = max_concurrency or int(os.environ.get("OLLAMA_MAX_CONCURRENCY", 8))
+        max_connections = max_connections or self.max_concurrency
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.environ.get("OLLAMA_BREAKER_FAILURES", 5)),
+            reset_timeout=float(os.environ.get("OLLAMA_BREAKER_RESET_SECONDS", 30)),
+        )
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._client_lock = threading.Lock()
+        self._sync_slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._async_slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = httpx.Client(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+            self._async_slots = asyncio.Semaphore(self.max_concurrency)
+        return self._async_client
+
+    def _payload(self, messages: List[Dict[str, str]], stream: bool = False, **options) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"model": self.model, "messages": messages, "stream": stream}
+        payload.update({k: v for k, v in options.items() if v is not None})
+        return payload
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps many retrying workers from hitting Ollama in lockstep
+        return random.uniform(0, min(8.0, 0.25 * (2 ** attempt)))
+
+    @contextmanager
+    def _breaker_call(self):
+        """
+        Admit one call through the breaker and settle it however it ends.
+        Failures other than HTTP errors (bad JSON, a missing key) count as
+        failures; a call the caller abandons (a stream it stops reading,
+        a cancelled task) only frees the half-open probe.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError("Ollama circuit breaker is open")
+        try:
+            yield
+        except OllamaError:
+            # Already recorded by _record_error
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+
+    def _record_error(self, error: Exception):
+        # A 4xx other than 408/429 is the request's fault, not Ollama's
+        if isinstance(error, httpx.HTTPStatusError) and error.response.status_code < 500 and not self._is_retryable(error):
+            self.breaker.release()
+        else:
+            self.breaker.record_failure()
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, httpx.TransportError):
+            return True
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRYABLE_STATUS
+        return False
+
+    @staticmethod
+    def _parse_stream_line(line: str) -> Optional[str]:
+        """
+        Content delta from one ``data:`` line of a streamed completion
+        """
+        if not line.startswith("data:"):
+            return None
+        data = line[5:].strip()
+        if not data or data == "[DONE]":
+            return None
+        choices = json.loads(data).get("choices") or [{}]
+        return (choices[0].get("delta") or {}).get("content") or None
+
+    def complete(self, messages: List[Dict[str, str]], **options) -> str:
+        """
+        Blocking chat completion with retries
+        """
+        with self._breaker_call():
+            attempt = 0
+            while True:
+                try:
+                    with self._sync_slots:
+                        response = self.client.post("/v1/chat/completions", json=self._payload(messages, **options))
+                        response.raise_for_status()
+                    content = response.json()["choices"][0]["message"]["content"]
+                    self.breaker.record_success()
+                    return content
+                except (httpx.TransportError, httpx.HTTPStatusError) as error:
+                    if attempt >= self.max_retries or not self._is_retryable(error):
+                        self._record_error(error)
+                        raise OllamaError(str(error)) from error
+                    time.sleep(self._backoff(attempt))
+                    attempt += 1
+
+    async def acomplete(self, messages: List[Dict[str, str]], **options) -> str:
+        """
+        Non-blocking chat completion with retries
+        """
+        with self._breaker_call():
+            client = self.async_client
+            attempt = 0
+            while True:
+                try:
+                    async with self._async_slots:
+                        response = await client.post("/v1/chat/completions", json=self._payload(messages, **options))
+                        response.raise_for_status()
+                    content = response.json()["choices"][0]["message"]["content"]
+                    self.breaker.record_success()
+                    return content
+                except (httpx.TransportError, httpx.HTTPStatusError) as error:
+                    if attempt >= self.max_retries or not self._is_retryable(error):
+                        self._record_error(error)
+                        raise OllamaError(str(error)) from error
+                    await asyncio.sleep(self._backoff(attempt))
+                    attempt += 1
+
+    def stream(self, messages: List[Dict[str, str]], **options) -> Iterator[str]:
+        """
+        Yield content deltas as Ollama generates them. Retries only happen
+        before the first delta, so callers never see duplicated text.
+        """
+        with self._breaker_call():
+            attempt = 0
+            while True:
+                started = False
+                try:
+                    with self._sync_slots:
+                        with self.client.stream("POST", "/v1/chat/completions",
+                                                json=self._payload(messages, stream=True, **options)) as response:
+                            response.raise_for_status()
+                            for line in response.iter_lines():
+                                delta = self._parse_stream_line(line)
+                                if delta:
+                                    started = True
+                                    yield delta
+                    self.breaker.record_success()
+                    return
+                except (httpx.TransportError, httpx.HTTPStatusError) as error:
+                    if started or attempt >= self.max_retries or not self._is_retryable(error):
+                        self._record_error(error)
+                        raise OllamaError(str(error)) from error
+                    time.sleep(self._backoff(attempt))
+                    attempt += 1
+
+    async def astream(self, messages: List[Dict[str, str]], **options) -> AsyncIterator[str]:
+        """
+        Async variant of ``stream``
+        """
+        with self._breaker_call():
+            client = self.async_client
+            attempt = 0
+            while True:
+                started = False
+                try:
+                    async with self._async_slots:
+                        async with client.stream("POST", "/v1/chat/completions",
+                                                 json=self._payload(messages, stream=True, **options)) as response:
+                            response.raise_for_status()
+                            async for line in response.aiter_lines():
+                                delta = self._parse_stream_line(line)
+                                if delta:
+                                    started = True
+                                    yield delta
+                    self.breaker.record_success()
+                    return
+                except (httpx.TransportError, httpx.HTTPStatusError) as error:
+                    if started or attempt >= self.max_retries or not self._is_retryable(error):
+                        self._record_error(error)
+                        raise OllamaError(str(error)) from error
+                    await asyncio.sleep(self._backoff(attempt))
+                    attempt += 1
+
+    def _messages(self, message: str, system_prompt: Optional[str] = None) -> List[Dict[str, str]]:
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": message})
+        return messages
 
     def chat(self, message, system_prompt=None):
         try:
-            payload = {
-                "model": self.model,
-                "messages": []
-            }
-            if system_prompt:
-                payload["messages"].append({"role": "system", "content": system_prompt})
-            payload["messages"].append({"role": "user", "content": message})
-
-            response = requests.post(f"{self.base_url}/v1/chat/completions", json=payload, timeout=10)
-            if response.status_code == 200:
-                return response.json()["choices"][0]["message"]["content"]
-            else:
-                return self._get_fallback_response(message)
-        except Exception as e:
+            return self.complete(self._messages(message, system_prompt))
+        except Exception:
+            return self._get_fallback_response(message)
+
+    async def achat(self, message, system_prompt=None):
+        try:
+            return await self.acomplete(self._messages(message, system_prompt))
+        except Exception:
             return self._get_fallback_response(message)
-    
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
     def _get_fallback_response(self, message):
         """Provide fallback responses when Ollama is not available"""
         message_lower = message.lower()
-        
+
         if "hello" in message_lower or "hi" in message_lower:
             return "Hello! I'm TailorTalk, your AI calendar assistant. I can help you manage your Google Calendar events."
         elif "help" in message_lower:
@@ -36,4 +323,4 @@ class OllamaClient:
         elif "calendar" in message_lower or "event" in message_lower:
             return "I'm here to help with your calendar! You can ask me to create events, show your schedule, or manage your meetings."
         else:
-            return "I'm TailorTalk, your AI calendar assistant. I can help you create, view, and manage your Google Calendar events. Try asking me to create a meeting or show your events!" 
\ No newline at end of file
+            return "I'm TailorTalk, your AI calendar assistant. I can help you create, view, and manage your Google Calendar events. Try asking me to create a meeting or show your events!"
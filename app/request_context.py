@@ -0,0 +1,15 @@
+from contextvars import ContextVar
+
+# Google OAuth access token of the user whose request is being handled.
+# Set by the API layer and read by the agent tools, so concurrent requests
+# never share credentials.
+current_access_token: ContextVar[str] = ContextVar("current_access_token", default="")
+# IANA timezone the user's request said their times are in, if it said
+current_time_zone: ContextVar[str] = ContextVar("current_time_zone", default="")
+
+
+def resolve_access_token(access_token: str = "") -> str:
+    """
+    Explicit token if given, otherwise the one bound to the current request
+    """
+    return access_token or current_access_token.get()
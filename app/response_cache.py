@@ -0,0 +1,172 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.shared_state import shared_state
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+# Tools that only read the calendar; an agent run that called anything
+# else (or a tool added later) is never cached
+READ_ONLY_TOOLS = frozenset({"ShowCalendarEvents", "SearchCalendarEvents", "FindFreeSlots", "CheckCalendarConflicts"})
+# Router intents whose answers only read the calendar
+READ_ONLY_INTENTS = frozenset({"list", "search"})
+# Anything that could change the calendar must never be answered from cache
+_WRITE_RE = re.compile(
+    r"\b(?:create|add|schedule|book|set up|delete|cancel|remove|clear|move|edit|update|extend|change|rename|reschedule|invite)\b",
+    re.IGNORECASE,
+)
+_READ_RE = re.compile(
+    r"\b(?:show|list|display|view|see|what|when|which|do i have|am i|any)\b",
+    re.IGNORECASE,
+)
+
+
+def normalize_prompt(text: str) -> str:
+    """
+    Lowercase, drop punctuation and collapse whitespace so trivially
+    different phrasings share a cache entry
+    """
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+def is_read_only(text: str) -> bool:
+    """
+    Whether a prompt only asks about the calendar, so it is worth looking
+    up in the cache. Only a screen: what gets stored is decided by what
+    the run did (``ResponseCache.storable``).
+    """
+    return bool(_READ_RE.search(text)) and not _WRITE_RE.search(text)
+
+
+class ResponseCache:
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        """
+        LRU + TTL cache of agent answers to read-only prompts.
+
+        Entries are keyed on (user, normalized prompt, calendar state
+        version), and each user also has a generation number that writes
+        bump, so a write makes all of that user's cached answers unreachable
+        without scanning the cache. A generation is forgotten once every
+        entry it could hide has expired.
+
+        Only answers that changed nothing are stored: a routed listing, or
+        an agent run that called read-only tools alone.
+        """
+        self.enabled = os.environ.get("RESPONSE_CACHE_ENABLED", "1") != "0"
+        self.max_entries = max_entries or int(os.environ.get("RESPONSE_CACHE_SIZE", 1024))
+        self.ttl = ttl or float(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", 60))
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Tuple[str, float]]" = OrderedDict()
+        # user key -> (generation, monotonic time of the last bump), oldest first
+        self._generations: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "invalidations": 0, "evictions": 0,
+                          "uncacheable": 0, "not_stored": 0}
+
+    def _generation(self, user_key: str) -> Tuple[int, int]:
+        # With several workers, a write handled by another process must
+        # invalidate this one's entries too
+        shared = shared_state.generation(f"responses:{user_key}") if shared_state.distributed else 0
+        with self._lock:
+            local = self._generations.get(user_key)
+        return (local[0] if local else 0), shared
+
+    def _prune_generations(self, now: float):
+        # Entries stored before a bump are older than it, so once the bump
+        # is a TTL old they have all expired and its generation can go
+        while self._generations:
+            user_key, (_, bumped_at) = next(iter(self._generations.items()))
+            if now - bumped_at < self.ttl:
+                break
+            del self._generations[user_key]
+
+    def _key(self, user_key: str, prompt: str, state_version: Any, generation: Tuple[int, int]) -> Tuple:
+        return (user_key, generation, state_version, normalize_prompt(prompt))
+
+    def cacheable(self, prompt: str) -> bool:
+        if not self.enabled:
+            return False
+        if is_read_only(prompt):
+            return True
+        with self._lock:
+            self._counters["uncacheable"] += 1
+        return False
+
+    def storable(self, intent: Optional[str], tools: Optional[Iterable[str]]) -> bool:
+        """
+        Whether an answer may be stored: the router's listing or search (``intent``),
+        or an agent run (``intent`` None) whose ``tools`` were all read-only.
+        ``tools`` is None when the run's tool calls are unknown.
+        """
+        if intent is not None:
+            storable = intent in READ_ONLY_INTENTS
+        else:
+            storable = tools is not None and all(tool in READ_ONLY_TOOLS for tool in tools)
+        if not storable:
+            with self._lock:
+                self._counters["not_stored"] += 1
+        return storable
+
+    def get(self, user_key: str, prompt: str, state_version: Any) -> Optional[str]:
+        now = time.monotonic()
+        generation = self._generation(user_key)
+        with self._lock:
+            key = self._key(user_key, prompt, state_version, generation)
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+                self._counters["evictions"] += 1
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, user_key: str, prompt: str, state_version: Any, response: str):
+        # Stamped before the generation is read, so the entry never
+        # outlives the record of a bump that raced with it
+        now = time.monotonic()
+        key = self._key(user_key, prompt, state_version, self._generation(user_key))
+        with self._lock:
+            self._entries[key] = (response, now)
+            self._entries.move_to_end(key)
+            self._counters["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def invalidate_user(self, user_key: str):
+        """
+        Make every cached answer for ``user_key`` unreachable
+        """
+        now = time.monotonic()
+        with self._lock:
+            generation = self._generations.pop(user_key, (0, now))[0] + 1
+            self._generations[user_key] = (generation, now)
+            self._prune_generations(now)
+            self._counters["invalidations"] += 1
+        if shared_state.distributed:
+            shared_state.bump(f"responses:{user_key}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "tracked_users": len(self._generations),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                **self._counters,
+            }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,263 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Union
+
+# googleapiclient, httplib2 and google-auth are imported on first use so
+# importing this module (e.g. for user_key_for) stays cheap at startup
+
+CALENDAR_SCOPES = ['https://www.googleapis.com/auth/calendar']
+
+_discovery_lock = threading.Lock()
+_discovery_document: Optional[Dict[str, Any]] = None
+_traced_request_class = None
+
+
+def token_key(access_token: str) -> str:
+    """
+    Stable, non-reversible key for an access token
+    """
+    return hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+
+
+class UserKeyResolver:
+    def __init__(self, max_size: int = 4096, ttl: float = 3600, failure_ttl: float = 60):
+        """
+        Stable key per Google account for the access tokens that act for it.
+
+        Tokens expire hourly, so per-user state keyed on the token hash
+        (event store, quota bucket, conversation, import checkpoints) would
+        start over with every refresh. The first call with a new token asks
+        ``lookup`` for the account id (the primary calendar's id, which is
+        the account's email) and maps the token to a hash of it, shared
+        with other workers for the token's lifetime. If the lookup fails
+        the token hash is used for ``failure_ttl`` seconds.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        # Default account lookup, registered by whoever owns the calendar manager
+        self.lookup: Optional[Callable[[str], str]] = None
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._counters = {"hits": 0, "lookups": 0, "lookup_failures": 0}
+
+    def cached(self, access_token: str) -> Optional[str]:
+        """
+        The key already resolved for ``access_token``, without looking it up
+        """
+        if not access_token:
+            return "service-account"
+        key = token_key(access_token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user_key, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user_key
+
+    def resolve(self, access_token: str = "", lookup: Optional[Callable[[str], str]] = None) -> str:
+        """
+        The caller's key: a hash of the Google account behind
+        ``access_token``, or ``service-account`` without one
+        """
+        user_key = self.cached(access_token)
+        if user_key is not None:
+            with self._lock:
+                self._counters["hits"] += 1
+            return user_key
+        from app.shared_state import shared_state
+        key = token_key(access_token)
+        user_key = shared_state.get(f"userkey:{key}")
+        ttl = self.ttl
+        if user_key is None:
+            lookup = lookup or self.lookup
+            try:
+                if lookup is None:
+                    raise RuntimeError("no account lookup registered")
+                user_key = "acct-" + token_key(lookup(access_token))
+                shared_state.set(f"userkey:{key}", user_key, ttl=self.ttl)
+                with self._lock:
+                    self._counters["lookups"] += 1
+            except Exception as error:
+                print(f"Error resolving calendar account, keying by token: {error}")
+                user_key, ttl = key, self.failure_ttl
+                with self._lock:
+                    self._counters["lookup_failures"] += 1
+        with self._lock:
+            self._entries[key] = (user_key, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return user_key
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._entries), "max_size": self.max_size, **self._counters}
+
+
+user_keys = UserKeyResolver()
+
+
+def user_key_for(access_token: str = "") -> str:
+    """
+    Key for the caller's per-user state: stable across token refreshes
+    (see UserKeyResolver), or the service account
+    """
+    return user_keys.resolve(access_token)
+
+
+def calendar_discovery_document() -> Dict[str, Any]:
+    """
+    Calendar v3 discovery document, parsed once from the static copy
+    shipped with googleapiclient
+    """
+    global _discovery_document
+    if _discovery_document is None:
+        with _discovery_lock:
+            if _discovery_document is None:
+                from googleapiclient.discovery_cache import get_static_doc
+                raw = get_static_doc('calendar', 'v3')
+                if raw is None:
+                    raise Exception("Static discovery document for calendar v3 is not available")
+                _discovery_document = json.loads(raw)
+    return _discovery_document
+
+
+def traced_request_class():
+    """
+    HttpRequest whose ``execute()`` goes through the API scheduler (quota,
+    retries) and is recorded as a ``google_api`` span named after the API
+    method (e.g. ``calendar.events.list``)
+    """
+    global _traced_request_class
+    if _traced_request_class is None:
+        from googleapiclient.http import HttpRequest
+        from app.api_scheduler import api_scheduler
+        from app.telemetry import telemetry
+
+        class TracedHttpRequest(HttpRequest):
+            # Whose quota the call counts against; set by build_calendar_service
+            user_key = "service-account"
+
+            def execute(self, *args, **kwargs):
+                method = self.methodId or "unknown"
+                with telemetry.span("google_api", method):
+                    return api_scheduler.execute(self.user_key, method, lambda: super(TracedHttpRequest, self).execute(*args, **kwargs))
+
+        _traced_request_class = TracedHttpRequest
+    return _traced_request_class
+
+
+def build_calendar_service(credentials, http_factory: Optional[Callable[[], Any]] = None,
+                           user_key: Union[str, Callable[[], str]] = "service-account"):
+    """
+    Build a Calendar service from the cached discovery document.
+
+    httplib2 connections are not thread-safe, so each worker thread gets its
+    own authorized connection for the service instead of sharing one.
+    Its calls are rate limited as ``user_key`` (or what it returns, when
+    it is a callable).
+    """
+    import httplib2
+    from google_auth_httplib2 import AuthorizedHttp
+    from googleapiclient.discovery import build_from_document
+
+    request_class = traced_request_class()
+    http_factory = http_factory or httplib2.Http
+    local = threading.local()
+
+    def request_builder(http, *args, **kwargs):
+        authed = getattr(local, 'http', None)
+        if authed is None:
+            authed = local.http = AuthorizedHttp(credentials, http=http_factory())
+        request = request_class(authed, *args, **kwargs)
+        request.user_key = user_key() if callable(user_key) else user_key
+        return request
+
+    return build_from_document(
+        calendar_discovery_document(),
+        credentials=credentials,
+        requestBuilder=request_builder,
+    )
+
+
+class CalendarServicePool:
+    def __init__(self, max_size: Optional[int] = None, ttl: Optional[float] = None,
+                 http_factory: Optional[Callable[[], Any]] = None):
+        """
+        Thread-safe LRU + TTL pool of Calendar services keyed by access token hash
+        """
+        self.max_size = max_size or int(os.environ.get("CALENDAR_POOL_SIZE", 256))
+        # Google access tokens live for an hour, so don't keep clients longer
+        self.ttl = ttl or float(os.environ.get("CALENDAR_POOL_TTL_SECONDS", 3000))
+        self.http_factory = http_factory
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, access_token: str):
+        """
+        Return the service for ``access_token``, building it on first use
+        """
+        key = token_key(access_token)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                service, created_at = entry
+                if now - created_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return service
+                del self._entries[key]
+                self._evictions += 1
+            self._misses += 1
+
+        from google.oauth2.credentials import Credentials
+        credentials = Credentials(token=access_token, scopes=CALENDAR_SCOPES)
+        # Quota is per account once the token's account is known
+        service = build_calendar_service(credentials, http_factory=self.http_factory,
+                                         user_key=lambda: user_keys.cached(access_token) or key)
+
+        with self._lock:
+            # Another thread may have built the same service meanwhile
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry[0]
+            self._entries[key] = (service, now)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return service
+
+    def invalidate(self, access_token: str):
+        """
+        Drop the cached service for ``access_token`` (e.g. after a 401)
+        """
+        with self._lock:
+            self._entries.pop(token_key(access_token), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
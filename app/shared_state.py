@@ -0,0 +1,295 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+
+class MemoryStateBackend:
+    def __init__(self):
+        """
+        Process-local key/value store; the default for a single worker
+        """
+        self._lock = threading.Lock()
+        self._values: Dict[str, Any] = {}
+        self._expiry: Dict[str, float] = {}
+
+    def _live(self, key: str, now: float) -> bool:
+        expires = self._expiry.get(key)
+        if expires is not None and expires <= now:
+            self._values.pop(key, None)
+            self._expiry.pop(key, None)
+        return key in self._values
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._values[key] if self._live(key, time.monotonic()) else None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        with self._lock:
+            self._values[key] = value
+            if ttl:
+                self._expiry[key] = time.monotonic() + ttl
+            else:
+                self._expiry.pop(key, None)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._values.pop(key, None)
+            self._expiry.pop(key, None)
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        with self._lock:
+            now = time.monotonic()
+            value = int(self._values[key]) + amount if self._live(key, now) else amount
+            self._values[key] = str(value)
+            if ttl and key not in self._expiry:
+                self._expiry[key] = now + ttl
+            return value
+
+    def setdefault(self, key: str, value: str, ttl: Optional[float] = None) -> str:
+        with self._lock:
+            if not self._live(key, time.monotonic()):
+                self._values[key] = value
+                if ttl:
+                    self._expiry[key] = time.monotonic() + ttl
+            return self._values[key]
+
+    def close(self):
+        pass
+
+
+class SQLiteStateBackend:
+    def __init__(self, path: str, purge_interval: Optional[float] = None):
+        """
+        Key/value store in a SQLite file, shared by the worker processes of
+        one host. Connections are opened per process (and per thread), so
+        the backend survives a pre-fork server importing it in the master.
+        Expired rows are deleted by a write at most every
+        ``purge_interval`` seconds.
+        """
+        self.path = path
+        self.purge_interval = purge_interval or float(os.environ.get("SHARED_STATE_PURGE_SECONDS", 300))
+        self._local = threading.local()
+        self._purge_lock = threading.Lock()
+        self._next_purge = time.time() + self.purge_interval
+        with self._connection() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS shared_state ("
+                       "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)")
+
+    def _connection(self):
+        import sqlite3
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = self._local.db = sqlite3.connect(self.path, timeout=5.0)
+            self._local.pid = os.getpid()
+        return db
+
+    def _maybe_purge(self, db, now: float):
+        # Reads skip expired rows but never delete them; without this a
+        # row written once with a TTL would stay in the file forever
+        with self._purge_lock:
+            if now < self._next_purge:
+                return
+            self._next_purge = now + self.purge_interval
+        db.execute("DELETE FROM shared_state WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT value FROM shared_state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        now = time.time()
+        with self._connection() as db:
+            db.execute(
+                "INSERT INTO shared_state (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+                (key, value, now + ttl if ttl else None),
+            )
+            self._maybe_purge(db, now)
+
+    def delete(self, key: str):
+        with self._connection() as db:
+            db.execute("DELETE FROM shared_state WHERE key = ?", (key,))
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        now = time.time()
+        with self._connection() as db:
+            # Expired counters restart from zero
+            db.execute("DELETE FROM shared_state WHERE key = ? AND expires_at IS NOT NULL AND expires_at <= ?", (key, now))
+            db.execute(
+                "INSERT INTO shared_state (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + ?",
+                (key, str(amount), now + ttl if ttl else None, amount),
+            )
+            self._maybe_purge(db, now)
+            return int(db.execute("SELECT value FROM shared_state WHERE key = ?", (key,)).fetchone()[0])
+
+    def setdefault(self, key: str, value: str, ttl: Optional[float] = None) -> str:
+        now = time.time()
+        with self._connection() as db:
+            db.execute("DELETE FROM shared_state WHERE key = ? AND expires_at IS NOT NULL AND expires_at <= ?", (key, now))
+            db.execute("INSERT INTO shared_state (key, value, expires_at) VALUES (?, ?, ?) ON CONFLICT(key) DO NOTHING",
+                       (key, value, now + ttl if ttl else None))
+            return db.execute("SELECT value FROM shared_state WHERE key = ?", (key,)).fetchone()[0]
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+
+class RedisStateBackend:
+    def __init__(self, url: str):
+        """
+        Key/value store on a Redis-protocol server (Redis, Valkey, KeyDB),
+        shared across hosts. Needs the ``redis`` package.
+        """
+        import redis
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+
+    def get(self, key: str) -> Optional[str]:
+        return self._client.get(key)
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        self._client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    def delete(self, key: str):
+        self._client.delete(key)
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        pipe = self._client.pipeline()
+        pipe.incrby(key, amount)
+        if ttl:
+            # NX: only start the expiry window on the first increment
+            pipe.pexpire(key, int(ttl * 1000), nx=True)
+        return int(pipe.execute()[0])
+
+    def setdefault(self, key: str, value: str, ttl: Optional[float] = None) -> str:
+        pipe = self._client.pipeline()
+        pipe.set(key, value, px=int(ttl * 1000) if ttl else None, nx=True)
+        pipe.get(key)
+        return pipe.execute()[1]
+
+    def close(self):
+        self._client.close()
+
+
+def backend_from_url(url: str):
+    """
+    ``memory://`` (or empty), ``sqlite:///state.db`` or
+    ``redis://host:6379/0`` / ``rediss://...``
+    """
+    scheme = urlparse(url).scheme if url else "memory"
+    if scheme == "memory":
+        return MemoryStateBackend()
+    if scheme == "sqlite":
+        # sqlite:///state.db is relative, sqlite:////var/lib/state.db absolute
+        return SQLiteStateBackend(url[len("sqlite:///"):] if url.startswith("sqlite:///") else url[len("sqlite://"):])
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisStateBackend(url)
+    raise ValueError(f"Unsupported SHARED_STATE_URL scheme: {scheme}")
+
+
+class SharedState:
+    def __init__(self, url: Optional[str] = None, prefix: str = "tailortalk:",
+                 generation_ttl: Optional[float] = None):
+        """
+        State that must agree across worker processes: conversation
+        sessions, cache invalidation generations, push channel registry
+        and rate-limit counters.
+
+        SHARED_STATE_URL picks the backend. The default is in-process
+        memory, which is all a single worker needs; run several workers
+        with a SQLite file (one host) or Redis (several hosts).
+
+        Generation counters expire ``generation_ttl`` seconds after they
+        are first bumped, so one is not kept for every user ever seen.
+        """
+        self.url = url if url is not None else os.environ.get("SHARED_STATE_URL", "")
+        self.prefix = prefix
+        self.generation_ttl = generation_ttl or float(os.environ.get("SHARED_STATE_GENERATION_TTL_SECONDS", 86400))
+        self._backend = None
+        self._lock = threading.Lock()
+        self._counters = {"reads": 0, "writes": 0}
+
+    @property
+    def backend(self):
+        # Built on first use so importing the app opens no connections
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = backend_from_url(self.url)
+        return self._backend
+
+    @property
+    def distributed(self) -> bool:
+        """
+        Whether other processes see this state
+        """
+        return bool(self.url) and not self.url.startswith("memory:")
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        self._count("reads")
+        return self.backend.get(self.prefix + key)
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        self._count("writes")
+        self.backend.set(self.prefix + key, value, ttl)
+
+    def delete(self, key: str):
+        self._count("writes")
+        self.backend.delete(self.prefix + key)
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        self._count("writes")
+        return self.backend.incr(self.prefix + key, amount, ttl)
+
+    def setdefault(self, key: str, value: str, ttl: Optional[float] = None) -> str:
+        """
+        Store ``value`` unless ``key`` is already set; returns whichever
+        value won, so racing workers all agree on one
+        """
+        self._count("writes")
+        return self.backend.setdefault(self.prefix + key, value, ttl)
+
+    def generation(self, key: str) -> int:
+        """
+        Current value of a counter bumped by ``bump``; 0 if never bumped
+        """
+        value = self.get(f"gen:{key}")
+        return int(value) if value else 0
+
+    def bump(self, key: str) -> int:
+        """
+        Advance a generation counter so every worker sees ``key`` changed
+        """
+        # A counter that expired restarts from the clock rather than from
+        # 1, above any value it had before, so a worker still holding an
+        # old generation cannot mistake the new one for it
+        self.setdefault(f"gen:{key}", str(int(time.time() * 1000)), ttl=self.generation_ttl)
+        return self.incr(f"gen:{key}")
+
+    def close(self):
+        if self._backend is not None:
+            self._backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": type(self._backend).__name__ if self._backend is not None else None,
+                "distributed": self.distributed,
+                **self._counters,
+            }
+
+
+shared_state = SharedState()
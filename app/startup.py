@@ -0,0 +1,119 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Generic, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LazyComponent(Generic[T]):
+    def __init__(self, name: str, factory: Callable[[], T]):
+        """
+        Value built by ``factory`` on first ``get()``, at most once even
+        when several threads ask for it concurrently.
+
+        A failed build is not cached: the error is kept for readiness
+        reporting and the next ``get()`` tries again.
+        """
+        self.name = name
+        self.factory = factory
+        self._lock = threading.Lock()
+        self._value: Optional[T] = None
+        self._ready = False
+        self.build_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def get(self) -> T:
+        if self._ready:
+            return self._value
+        with self._lock:
+            if self._ready:
+                return self._value
+            started = time.perf_counter()
+            try:
+                value = self.factory()
+            except Exception as e:
+                self.error = str(e) or type(e).__name__
+                raise
+            self.build_seconds = time.perf_counter() - started
+            self.error = None
+            self._value = value
+            self._ready = True
+            return value
+
+    def peek(self) -> Optional[T]:
+        """
+        The value if it has been built, without building it
+        """
+        return self._value if self._ready else None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self._ready,
+            "build_ms": round(self.build_seconds * 1000, 3) if self.build_seconds is not None else None,
+            "error": self.error,
+        }
+
+
+class StartupReport:
+    def __init__(self):
+        """
+        Import/startup timings and the lazily built components they cover
+        """
+        self.created_at = time.perf_counter()
+        self._lock = threading.Lock()
+        self._phases: Dict[str, float] = {}
+        self._components: Dict[str, LazyComponent] = {}
+        self.warmup_started = False
+        self.warmup_done = False
+        self.warmup_error: Optional[str] = None
+
+    def lazy(self, name: str, factory: Callable[[], T]) -> LazyComponent[T]:
+        """
+        Register a component that is built on first use
+        """
+        component = LazyComponent(name, factory)
+        with self._lock:
+            self._components[name] = component
+        return component
+
+    def component(self, name: str) -> Optional[LazyComponent]:
+        with self._lock:
+            return self._components.get(name)
+
+    def record(self, phase: str, seconds: float):
+        with self._lock:
+            self._phases[phase] = seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Time the body of the ``with`` block as a startup phase
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            phases = {name: round(seconds * 1000, 3) for name, seconds in self._phases.items()}
+            components = {name: component.status() for name, component in self._components.items()}
+        return {
+            "uptime_seconds": round(time.perf_counter() - self.created_at, 3),
+            "phases_ms": phases,
+            "components": components,
+            "warmup": {
+                "started": self.warmup_started,
+                "done": self.warmup_done,
+                "error": self.warmup_error,
+            },
+        }
+
+
+startup_report = StartupReport()
@@ -0,0 +1,110 @@
+import asyncio
+import json
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """
+    Format one Server-Sent Events frame
+    """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class StreamingCallbackHandler(BaseCallbackHandler):
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue: "asyncio.Queue",
+                 final_marker: Optional[str] = FINAL_ANSWER_MARKER):
+        """
+        Forward agent progress from the worker thread to an asyncio queue.
+
+        Emits ``token`` events for the final answer only (the ReAct
+        Thought/Action text is scratchpad, not something to show the user),
+        plus ``tool_start``/``tool_end`` events around each tool call.
+        With ``final_marker=None`` (tool-calling agent) all LLM text is
+        answer text.
+        """
+        self.loop = loop
+        self.queue = queue
+        self.final_marker = final_marker
+        self._llm_text: Dict[UUID, str] = {}
+        self._answering: Dict[UUID, bool] = {}
+        self._tool_names: Dict[UUID, str] = {}
+
+    def _emit(self, event: str, data: Dict[str, Any]):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, (event, data))
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        self._llm_text[run_id] = ""
+        self._answering[run_id] = self.final_marker is None
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        self.on_llm_start(serialized, [], run_id=run_id)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs):
+        if self._answering.get(run_id):
+            if token:
+                self._emit("token", {"token": token})
+            return
+        text = self._llm_text.get(run_id, "") + token
+        self._llm_text[run_id] = text
+        marker = text.find(self.final_marker)
+        if marker != -1:
+            self._answering[run_id] = True
+            rest = text[marker + len(self.final_marker):].lstrip()
+            if rest:
+                self._emit("token", {"token": rest})
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        self._llm_text.pop(run_id, None)
+        self._answering.pop(run_id, None)
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self._tool_names[run_id] = name
+        self._emit("tool_start", {"tool": name, "input": input_str})
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs):
+        name = self._tool_names.pop(run_id, kwargs.get("name", "tool"))
+        self._emit("tool_end", {"tool": name, "output": str(output)})
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        name = self._tool_names.pop(run_id, kwargs.get("name", "tool"))
+        self._emit("tool_end", {"tool": name, "error": str(error)})
+
+
+async def stream_run(run, queue: "asyncio.Queue", to_message):
+    """
+    Yield SSE frames for queued progress events until ``run`` finishes,
+    then a ``final`` frame (or ``error``). Cancels the run if the client
+    disconnects mid-stream. ``to_message`` may do blocking I/O (caches,
+    conversation store), so it runs on a worker thread.
+    """
+    result_task = asyncio.ensure_future(run.result())
+    get_task: Optional[asyncio.Future] = None
+    try:
+        while True:
+            get_task = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({get_task, result_task}, return_when=asyncio.FIRST_COMPLETED)
+            if get_task in done:
+                yield sse_event(*get_task.result())
+                continue
+            get_task.cancel()
+            break
+        while not queue.empty():
+            yield sse_event(*queue.get_nowait())
+        try:
+            response = result_task.result()
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e) or type(e).__name__})
+            return
+        from fastapi.concurrency import run_in_threadpool
+        yield sse_event("final", {"message": await run_in_threadpool(to_message, response)})
+    finally:
+        if get_task is not None and not get_task.done():
+            get_task.cancel()
+        if not result_task.done():
+            result_task.cancel()
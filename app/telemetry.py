@@ -0,0 +1,276 @@
+import bisect
+import itertools
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Latency buckets in seconds, from a cached lookup up to a slow agent run
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        # Per series: one count per bucket, then +Inf count and sum
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def count(self, **labels) -> float:
+        """
+        Observations across all series carrying ``labels``
+        """
+        wanted = set(_label_key(labels))
+        with self._lock:
+            return sum(values[-2] for key, values in self._series.items() if wanted <= set(key))
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', repr(bound)))} {cumulative:g}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {values[-2]:g}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {values[-2]:g}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {values[-1]:.6f}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._lock = threading.Lock()
+        self._series: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def total(self, **labels) -> float:
+        """
+        Sum across all series carrying ``labels``
+        """
+        wanted = set(_label_key(labels))
+        with self._lock:
+            return sum(value for key, value in self._series.items() if wanted <= set(key))
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            series = dict(self._series)
+        for key, value in sorted(series.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value:g}")
+        return lines
+
+
+class Span:
+    __slots__ = ("span_id", "parent_id", "kind", "name", "started", "duration", "attrs")
+
+    def __init__(self, span_id: int, parent_id: Optional[int], kind: str, name: str, attrs: Dict[str, Any]):
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.kind = kind
+        self.name = name
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class Trace:
+    def __init__(self, trace_id: str, name: str):
+        """
+        Spans recorded while handling one request
+        """
+        self.trace_id = trace_id
+        self.name = name
+        self.started = time.perf_counter()
+        self.wall_start = time.time()
+        self.spans: List[Span] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def new_span(self, parent_id: Optional[int], kind: str, name: str, attrs: Dict[str, Any]) -> Span:
+        with self._lock:
+            span = Span(next(self._ids), parent_id, kind, name, attrs)
+            self.spans.append(span)
+            return span
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "start": self.wall_start,
+            "spans": [
+                {
+                    "id": span.span_id,
+                    "parent": span.parent_id,
+                    "kind": span.kind,
+                    "name": span.name,
+                    "offset_ms": round((span.started - self.started) * 1000, 3),
+                    "duration_ms": round(span.duration * 1000, 3) if span.duration is not None else None,
+                    **({"attrs": span.attrs} if span.attrs else {}),
+                }
+                for span in spans
+            ],
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[int]] = ContextVar("current_span", default=None)
+
+
+class Telemetry:
+    def __init__(self, max_traces: Optional[int] = None):
+        """
+        Latency histograms in Prometheus text format plus per-request
+        traces of spans (agent steps, LLM calls, tools, date parsing and
+        Google API calls) kept in a small ring buffer for debugging
+        """
+        self.enabled = os.environ.get("TRACING_ENABLED", "1") != "0"
+        self.max_traces = max_traces or int(os.environ.get("TRACE_BUFFER_SIZE", 100))
+        self.http_seconds = Histogram("tailortalk_http_request_seconds", "HTTP request latency by route")
+        self.span_seconds = Histogram("tailortalk_span_seconds", "Span latency by kind and name")
+        self.llm_tokens = Counter("tailortalk_llm_tokens_total", "LLM tokens by direction")
+        self.errors = Counter("tailortalk_span_errors_total", "Spans that raised, by kind and name")
+        self._traces: deque = deque(maxlen=self.max_traces)
+        self._lock = threading.Lock()
+        # Metrics owned by other components, rendered after the built-in ones
+        self._registered: List[Any] = []
+
+    @contextmanager
+    def trace(self, name: str, trace_id: Optional[str] = None) -> Iterator[Optional[Trace]]:
+        """
+        Collect the spans of one request; nested calls reuse the outer trace
+        """
+        if not self.enabled or _current_trace.get() is not None:
+            yield _current_trace.get()
+            return
+        trace = Trace(trace_id or uuid.uuid4().hex, name)
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _current_trace.reset(token)
+            with self._lock:
+                self._traces.append(trace)
+
+    @contextmanager
+    def span(self, kind: str, name: str, **attrs) -> Iterator[Optional[Span]]:
+        """
+        Time the ``with`` block into the span histogram and, inside a
+        trace, record it as a child of the current span
+        """
+        started = time.perf_counter()
+        trace = _current_trace.get() if self.enabled else None
+        span = trace.new_span(_current_span.get(), kind, name, attrs) if trace is not None else None
+        token = self.push_span(span)
+        try:
+            yield span
+        except BaseException:
+            self.errors.inc(kind=kind, name=name)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.pop_span(token)
+            if span is not None:
+                span.duration = elapsed
+            self.span_seconds.observe(elapsed, kind=kind, name=name)
+
+    def start_span(self, kind: str, name: str, parent: Optional[Span] = None, **attrs) -> Tuple[float, Optional[Span]]:
+        """
+        Open a span that is closed by ``end_span``, for callback APIs where
+        start and end arrive as separate calls
+        """
+        trace = _current_trace.get() if self.enabled else None
+        parent_id = parent.span_id if parent is not None else _current_span.get()
+        span = trace.new_span(parent_id, kind, name, attrs) if trace is not None else None
+        return time.perf_counter(), span
+
+    def push_span(self, span: Optional[Span]):
+        """
+        Make ``span`` the parent of spans opened after this call; returns a
+        token for ``pop_span``
+        """
+        return _current_span.set(span.span_id) if span is not None else None
+
+    def pop_span(self, token):
+        if token is not None:
+            _current_span.reset(token)
+
+    def end_span(self, handle: Tuple[float, Optional[Span]], kind: str, name: str, error: bool = False, **attrs):
+        started, span = handle
+        elapsed = time.perf_counter() - started
+        if span is not None:
+            span.duration = elapsed
+            span.attrs.update(attrs)
+        if error:
+            self.errors.inc(kind=kind, name=name)
+        self.span_seconds.observe(elapsed, kind=kind, name=name)
+
+    def register(self, metric):
+        """
+        Add a Histogram or Counter owned elsewhere to ``/metrics``
+        """
+        with self._lock:
+            self._registered.append(metric)
+
+    def recent_traces(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            traces = list(self._traces)[-limit:]
+        return [trace.to_dict() for trace in reversed(traces)]
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            registered = list(self._registered)
+        for metric in (self.http_seconds, self.span_seconds, self.llm_tokens, self.errors, *registered):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+telemetry = Telemetry()
@@ -0,0 +1,117 @@
+import re
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Character trigrams of the normalized text, padded so short words and
+    word boundaries still produce grams
+    """
+    grams: Set[str] = set()
+    for token in tokenize(text):
+        padded = f"  {token} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+class TitleIndex:
+    def __init__(self):
+        """
+        Inverted index over event titles: exact tokens plus trigrams for
+        fuzzy matching. Updates and lookups only touch the postings of the
+        query's own tokens/grams, not every event.
+        """
+        # Normalized (tokenized, space-joined) titles
+        self._titles: Dict[str, str] = {}
+        self._doc_tokens: Dict[str, Set[str]] = {}
+        self._doc_grams: Dict[str, Set[str]] = {}
+        self._token_postings: Dict[str, Set[str]] = defaultdict(set)
+        self._gram_postings: Dict[str, Set[str]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    def add(self, event_id: str, title: str):
+        normalized = " ".join(tokenize(title))
+        if self._titles.get(event_id) == normalized:
+            return
+        self.remove(event_id)
+        tokens = set(normalized.split())
+        grams = trigrams(normalized)
+        self._titles[event_id] = normalized
+        self._doc_tokens[event_id] = tokens
+        self._doc_grams[event_id] = grams
+        for token in tokens:
+            self._token_postings[token].add(event_id)
+        for gram in grams:
+            self._gram_postings[gram].add(event_id)
+
+    def remove(self, event_id: str):
+        if self._titles.pop(event_id, None) is None:
+            return
+        for token in self._doc_tokens.pop(event_id, ()):
+            postings = self._token_postings.get(token)
+            if postings is not None:
+                postings.discard(event_id)
+                if not postings:
+                    del self._token_postings[token]
+        for gram in self._doc_grams.pop(event_id, ()):
+            postings = self._gram_postings.get(gram)
+            if postings is not None:
+                postings.discard(event_id)
+                if not postings:
+                    del self._gram_postings[gram]
+
+    def clear(self):
+        self._titles.clear()
+        self._doc_tokens.clear()
+        self._doc_grams.clear()
+        self._token_postings.clear()
+        self._gram_postings.clear()
+
+    def search(self, query: str, limit: Optional[int] = 5, min_score: float = 0.3,
+               allowed: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Ranked ``(event_id, score)`` candidates for ``query``, best first.
+
+        The score (0..1) blends trigram similarity (Dice coefficient), the
+        share of query words found as whole words in the title and a bonus
+        when one title contains the other, so "standup" ranks "Daily standup"
+        above "Stand-up comedy night".
+        """
+        query_tokens = set(tokenize(query))
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        allowed_ids = set(allowed) if allowed is not None else None
+
+        shared = Counter(chain.from_iterable(self._gram_postings.get(gram, ()) for gram in query_grams))
+        token_hits = Counter(chain.from_iterable(self._token_postings.get(token, ()) for token in query_tokens))
+
+        query_norm = " ".join(tokenize(query))
+        results: List[Tuple[str, float]] = []
+        for event_id, count in shared.items():
+            if allowed_ids is not None and event_id not in allowed_ids:
+                continue
+            dice = 2.0 * count / (len(query_grams) + len(self._doc_grams[event_id]))
+            coverage = token_hits.get(event_id, 0) / len(query_tokens) if query_tokens else 0.0
+            title_norm = self._titles[event_id]
+            if title_norm == query_norm:
+                score = 1.0
+            else:
+                contains = 1.0 if query_norm and title_norm and (query_norm in title_norm or title_norm in query_norm) else 0.0
+                score = 0.5 * dice + 0.3 * coverage + 0.2 * contains
+            if score >= min_score:
+                results.append((event_id, round(score, 4)))
+
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:limit] if limit else results
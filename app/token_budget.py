@@ -0,0 +1,234 @@
+import os
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from app.events import Event, render_events
+from app.telemetry import Histogram, telemetry
+
+# Word pieces as Llama/Mistral-style tokenizers split them: digits and
+# punctuation are a token each, words about one token per four letters
+_PIECE_RE = re.compile(r"\d|[^\W\d_]+|[^\w\s]|_")
+# Tokens kept free for the "... N more" line that closes a trimmed observation
+_TAIL_TOKENS = 16
+# Tokens per chat request, from a one-tool answer up to a long agent run
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimated LLM tokens in ``text``, without loading the model's
+    tokenizer. Tool output is mostly times and dates, which
+    conversation_memory's four-characters-per-token estimate undercounts.
+    """
+    return sum(1 + (len(piece) - 1) // 4 for piece in _PIECE_RE.findall(text))
+
+
+@dataclass
+class TokenUsage:
+    """
+    Tokens spent on one agent run. ``prompt``/``completion`` are the
+    model's own counts when it reports them, otherwise estimates;
+    ``observations`` is what the tools' output cost after budgeting and
+    ``observations_raw`` what it would have cost without.
+    """
+    llm_calls: int = 0
+    prompt: int = 0
+    completion: int = 0
+    observations: int = 0
+    observations_raw: int = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+_usage: ContextVar[Optional[TokenUsage]] = ContextVar("token_usage", default=None)
+
+
+class TokenBudget:
+    def __init__(self, observation_tokens: Optional[int] = None, scratchpad_tokens: Optional[int] = None):
+        """
+        Keeps what tools feed back to the agent small. Each observation is
+        fitted to ``observation_tokens`` (event lists by grouping them per
+        day, other text by dropping trailing lines), and the observations
+        re-sent on each agent step are capped at ``scratchpad_tokens`` by
+        eliding the oldest, so prompt size stops growing with calendar size
+        and step count. Budgets apply inside ``track()``, i.e. to agent
+        runs; the fast-path router still answers users with full lists.
+        """
+        self.enabled = os.environ.get("TOKEN_BUDGET_ENABLED", "1") != "0"
+        self.observation_tokens = observation_tokens or int(os.environ.get("OBSERVATION_MAX_TOKENS", 300))
+        self.scratchpad_tokens = scratchpad_tokens or int(os.environ.get("SCRATCHPAD_MAX_TOKENS", 1200))
+        self._lock = threading.Lock()
+        self._counters = {"runs": 0, "observations": 0, "observations_trimmed": 0,
+                          "observation_tokens_saved": 0, "scratchpad_elisions": 0}
+        self.request_tokens = Histogram("tailortalk_request_tokens", "Tokens per agent run, by kind", buckets=TOKEN_BUCKETS)
+        telemetry.register(self.request_tokens)
+
+    @contextmanager
+    def track(self) -> Iterator[TokenUsage]:
+        """
+        Account the agent run in the ``with`` block and apply the budgets
+        to its tools' output
+        """
+        usage = TokenUsage()
+        token = _usage.set(usage)
+        try:
+            yield usage
+        finally:
+            _usage.reset(token)
+            with self._lock:
+                self._counters["runs"] += 1
+            for kind in ("prompt", "completion", "observations"):
+                self.request_tokens.observe(getattr(usage, kind), kind=kind)
+
+    def current(self) -> Optional[TokenUsage]:
+        return _usage.get()
+
+    def _active(self) -> bool:
+        return self.enabled and _usage.get() is not None
+
+    def record_llm(self, usage: Optional[TokenUsage], prompt: int, completion: int):
+        if usage is None:
+            return
+        with self._lock:
+            usage.llm_calls += 1
+            usage.prompt += prompt
+            usage.completion += completion
+
+    def fit(self, text: str) -> str:
+        """
+        A tool observation cut to the observation budget: whole lines up
+        to the budget and a count of the rest
+        """
+        raw = count_tokens(text)
+        if not self._active() or raw <= self.observation_tokens:
+            self._record_observation(raw, raw)
+            return text
+        kept, used = [], 0
+        lines = text.split("\n")
+        for line in lines:
+            cost = count_tokens(line) + 1
+            if used + cost > self.observation_tokens - _TAIL_TOKENS:
+                break
+            kept.append(line)
+            used += cost
+        if not kept:
+            # One huge line: keep its start
+            kept.append(lines[0][:self.observation_tokens * 3] + " ...")
+        else:
+            kept.append(f"... {len(lines) - len(kept)} more line(s) not shown")
+        fitted = "\n".join(kept)
+        self._record_observation(raw, count_tokens(fitted))
+        return fitted
+
+    def _record_observation(self, raw: int, sent: int):
+        usage = _usage.get()
+        with self._lock:
+            self._counters["observations"] += 1
+            if usage is not None:
+                usage.observations += sent
+                usage.observations_raw += sent
+        self._record_savings(raw, sent)
+
+    def _record_savings(self, raw: int, sent: int):
+        usage = _usage.get()
+        with self._lock:
+            if sent < raw:
+                self._counters["observations_trimmed"] += 1
+                self._counters["observation_tokens_saved"] += raw - sent
+            if usage is not None:
+                usage.observations_raw += raw - sent
+
+    def render_events(self, events: Sequence[Event], header: str = "", more: int = 0,
+                      today: Optional[date] = None) -> str:
+        """
+        ``header`` and one line per event, plus a count of ``more`` events
+        not listed. Over the observation budget (in agent runs), events are
+        grouped per day as start times and titles, without end times,
+        locations or descriptions, and days that do not fit are counted.
+        """
+        today = today or datetime.now(timezone.utc).date()
+        text = "\n".join(part for part in (header, render_events(events, today)) if part)
+        if more:
+            text += f"\n... and {more} more"
+        raw = count_tokens(text)
+        if not self._active() or raw <= self.observation_tokens:
+            return text
+
+        days: Dict[date, List[str]] = {}
+        for event in events:
+            entry = f"all day {event.summary}" if event.all_day else f"{event.start:%H:%M} {event.summary}"
+            days.setdefault(event.start.date(), []).append(entry)
+        lines = [header] if header else []
+        used = count_tokens(header)
+        left = self.observation_tokens - _TAIL_TOKENS
+        shown_events = 0
+        for day, entries in days.items():
+            label = day.strftime("%a %d %b" if day.year == today.year else "%a %d %b %Y") + ": "
+            line, fitted = label, 0
+            for entry in entries:
+                candidate = line + ("; " if fitted else "") + entry
+                if used + count_tokens(candidate) > left:
+                    break
+                line, fitted = candidate, fitted + 1
+            if not fitted:
+                break
+            if fitted < len(entries):
+                line += f" (+{len(entries) - fitted} more)"
+            lines.append(line)
+            used += count_tokens(line) + 1
+            shown_events += len(entries)
+            if fitted < len(entries):
+                break
+        rest = len(events) - shown_events + more
+        if rest:
+            lines.append(f"... and {rest} more event(s)")
+        compact = "\n".join(lines)
+        # fit() counts the compact text as sent; book what grouping saved
+        self._record_savings(raw, count_tokens(compact))
+        return compact
+
+    def cap(self, observations: List[str]) -> List[str]:
+        """
+        Observations as re-sent on the next agent step: newest first into
+        the scratchpad budget, older ones that no longer fit replaced by a
+        one-line note. The latest observation is always kept.
+        """
+        if not self.enabled:
+            return observations
+        capped = list(observations)
+        used = 0
+        for i in range(len(capped) - 1, -1, -1):
+            cost = count_tokens(capped[i])
+            if used + cost > self.scratchpad_tokens and i < len(capped) - 1:
+                capped[i] = f"[earlier output elided, {cost} tokens]"
+                cost = count_tokens(capped[i])
+                with self._lock:
+                    self._counters["scratchpad_elisions"] += 1
+            used += cost
+        return capped
+
+    def trim_steps(self, steps: List[Any]) -> List[Any]:
+        """
+        ``AgentExecutor.trim_intermediate_steps`` hook: the ReAct
+        scratchpad with its observations capped
+        """
+        observations = self.cap([str(observation) for _, observation in steps])
+        return [(action, observation) for (action, _), observation in zip(steps, observations)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "observation_max_tokens": self.observation_tokens,
+                "scratchpad_max_tokens": self.scratchpad_tokens,
+                **self._counters,
+            }
+
+
+token_budget = TokenBudget()
@@ -0,0 +1,99 @@
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from app.agent_executor import AgentRunCancelledError, raise_if_cancelled
+from app.api_scheduler import CalendarApiError
+from app.token_budget import token_budget
+
+SYSTEM_PROMPT = (
+    "You are TailorTalk, an assistant that manages the user's Google Calendar through tools. "
+    "The current time is {now} UTC. Call every tool the request needs; independent calls "
+    "(for example checking two time ranges) go in the same turn. When the tools have "
+    "answered, reply to the user briefly in plain text."
+)
+
+
+class ToolCallingAgent:
+    def __init__(self, llm, tools: List, max_rounds: Optional[int] = None, max_parallel: Optional[int] = None):
+        """
+        Agent that uses the model's native tool calling instead of ReAct
+        text parsing: typed arguments, several tool calls per turn run in
+        parallel, and usually just two model calls per message (one to
+        pick the tools, one to answer). Exposes ``invoke(inputs, config)``
+        returning ``{"output": ...}`` like AgentExecutor, so the two are
+        interchangeable.
+        """
+        self.llm = llm
+        self.tools = {tool.name: tool for tool in tools}
+        self.model = llm.bind_tools(tools)
+        self.max_rounds = max_rounds or int(os.environ.get("TOOL_CALLING_MAX_ROUNDS", 3))
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_parallel or int(os.environ.get("TOOL_CALLING_PARALLELISM", 4)),
+            thread_name_prefix="tool-call",
+        )
+
+    def _run_tool(self, call: Dict[str, Any], config) -> str:
+        tool = self.tools.get(call["name"])
+        if tool is None:
+            return f"Unknown tool '{call['name']}'."
+        try:
+            return token_budget.fit(str(tool.invoke(call.get("args") or {}, config)))
+        except (CalendarApiError, AgentRunCancelledError):
+            # Rate limited or unavailable: fail the request with its typed
+            # error (429/503) instead of letting the model answer around it
+            raise
+        except Exception as e:
+            # Report the failure to the model so it can answer or retry
+            return f"Error: {e}"
+
+    def _run_tools(self, calls: List[Dict[str, Any]], config) -> List[str]:
+        if len(calls) == 1:
+            return [self._run_tool(calls[0], config)]
+        # Each call runs in its own copy of the request context so the
+        # access token and tracing state follow it onto the pool thread
+        futures = [
+            self._executor.submit(contextvars.copy_context().run, self._run_tool, call, config)
+            for call in calls
+        ]
+        return [future.result() for future in futures]
+
+    def _capped(self, messages: List[Any]) -> List[Any]:
+        """
+        The conversation as sent to the model, with older tool results
+        elided once they exceed the scratchpad budget
+        """
+        from langchain_core.messages import ToolMessage
+
+        positions = [i for i, message in enumerate(messages) if isinstance(message, ToolMessage)]
+        contents = token_budget.cap([str(messages[i].content) for i in positions])
+        capped = list(messages)
+        for i, content in zip(positions, contents):
+            if content != messages[i].content:
+                capped[i] = ToolMessage(content=content, tool_call_id=messages[i].tool_call_id, name=messages[i].name)
+        return capped
+
+    def invoke(self, inputs: Dict[str, Any], config=None) -> Dict[str, Any]:
+        from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+
+        now = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+        messages: List[Any] = [SystemMessage(content=SYSTEM_PROMPT.format(now=now)),
+                               HumanMessage(content=inputs["input"])]
+        for rounds in range(self.max_rounds):
+            raise_if_cancelled()
+            reply = self.model.invoke(self._capped(messages), config)
+            messages.append(reply)
+            if not reply.tool_calls:
+                return {"output": reply.content, "tool_rounds": rounds}
+            outputs = self._run_tools(reply.tool_calls, config)
+            for call, output in zip(reply.tool_calls, outputs):
+                messages.append(ToolMessage(content=output, tool_call_id=call["id"], name=call["name"]))
+        # Out of tool rounds: answer from what the tools returned so far
+        raise_if_cancelled()
+        reply = self.llm.invoke(self._capped(messages), config)
+        return {"output": reply.content, "tool_rounds": self.max_rounds}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
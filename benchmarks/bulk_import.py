@@ -0,0 +1,112 @@
+"""
+Bulk ICS import and export throughput with app.calendar_io.
+
+Writes an N-event .ics file, then imports it against the FakeCalendar
+stand-in one event per request, and in batches with several batches in
+flight. Then re-imports it (every UID already there, so all skipped),
+resumes an import interrupted halfway from its checkpoint, and exports
+the calendar back to ICS. Prints events/s and round trips for each:
+
+    python -m benchmarks.bulk_import [--events N] [--api-latency-ms MS] [--batch-size N] [--concurrency N]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+EPOCH = datetime(2026, 1, 5, 9, tzinfo=timezone.utc)
+
+
+def write_ics(path: str, count: int):
+    with open(path, "w", encoding="utf-8", newline="") as handle:
+        handle.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//bench//EN\r\n")
+        for i in range(count):
+            start = EPOCH + timedelta(hours=3 * i)
+            handle.write(
+                f"BEGIN:VEVENT\r\nUID:bench-{i}@example.com\r\n"
+                f"DTSTART:{start:%Y%m%dT%H%M%SZ}\r\nDTEND:{start + timedelta(minutes=45):%Y%m%dT%H%M%SZ}\r\n"
+                f"SUMMARY:Imported event {i}\r\nLOCATION:Room {i % 12}\r\nEND:VEVENT\r\n"
+            )
+        handle.write("END:VCALENDAR\r\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--api-latency-ms", type=float, default=50)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    # Measure the import pipeline, not the quotas the scheduler would apply
+    os.environ.setdefault("GOOGLE_API_USER_QPS", "1000")
+    os.environ.setdefault("GOOGLE_API_QPS", "1000")
+    from benchmarks.fakes import FakeCalendar
+    from app.calendar_io import EPOCH as EXPORT_FROM, EventImporter, FileCheckpoint, export_chunks, iter_ics
+    from app.calendar_utils import GoogleCalendarManager
+    from app.service_pool import CalendarServicePool
+
+    calendar = FakeCalendar(seed_count=0, latency=args.api_latency_ms / 1000)
+    manager = GoogleCalendarManager(service_pool=CalendarServicePool(http_factory=calendar.http))
+    workdir = tempfile.mkdtemp()
+    source = os.path.join(workdir, "events.ics")
+    write_ics(source, args.events)
+
+    def run(name: str, token: str, batch_size: int, concurrency: int, limit=None, checkpoint=None):
+        calendar.round_trips = 0
+        started = time.perf_counter()
+        with open(source, encoding="utf-8", newline="") as handle:
+            records = islice(iter_ics(handle), limit)
+            result = EventImporter(manager, batch_size=batch_size, concurrency=concurrency).run(
+                records, access_token=token, checkpoint=checkpoint)
+        elapsed = time.perf_counter() - started
+        handled = result.records - result.resumed_from
+        print(f"{name:<28} {handled:>7} {result.created:>8} {result.skipped:>8} {elapsed:>8.2f} "
+              f"{handled / elapsed:>9.0f} {calendar.round_trips:>12}")
+        return result
+
+    print(f"{args.events} events, {args.api_latency_ms:g} ms per round trip, "
+          f"batches of {args.batch_size}, {args.concurrency} in flight")
+    print(f"{'import':<28} {'records':>7} {'created':>8} {'skipped':>8} {'seconds':>8} {'events/s':>9} {'round trips':>12}")
+    run("one event per request", "sequential", 1, 1)
+    run("batched, concurrent", "batched", args.batch_size, args.concurrency)
+    run("same file again (dedupe)", "batched", args.batch_size, args.concurrency)
+
+    checkpoint = FileCheckpoint(os.path.join(workdir, "events.ics.checkpoint"))
+
+    class Interrupted(Exception):
+        pass
+
+    def interrupted(records, stop_at):
+        for number, record in enumerate(records, 1):
+            if number > stop_at:
+                raise Interrupted()
+            yield record
+
+    calendar.round_trips = 0
+    try:
+        with open(source, encoding="utf-8", newline="") as handle:
+            EventImporter(manager, batch_size=args.batch_size, concurrency=args.concurrency).run(
+                interrupted(iter_ics(handle), args.events // 2), access_token="resumed", checkpoint=checkpoint)
+    except Interrupted:
+        pass
+    print(f"{'interrupted at half':<28} {'checkpoint at record ' + str(checkpoint.load()['records']):>34}")
+    run("resumed from checkpoint", "resumed", args.batch_size, args.concurrency, checkpoint=checkpoint)
+
+    calendar.round_trips = 0
+    started = time.perf_counter()
+    exported = 0
+    with open(os.path.join(workdir, "export.ics"), "w", encoding="utf-8", newline="") as handle:
+        events = manager.iter_events(EXPORT_FROM, expand_recurring=False, access_token="batched")
+        for chunk in export_chunks(events, "ics"):
+            handle.write(chunk)
+            exported += chunk.startswith("BEGIN:VEVENT")
+    elapsed = time.perf_counter() - started
+    print(f"{'export to ICS':<28} {exported:>7} {'':>8} {'':>8} {elapsed:>8.2f} "
+          f"{exported / elapsed:>9.0f} {calendar.round_trips:>12}")
+
+
+if __name__ == "__main__":
+    main()
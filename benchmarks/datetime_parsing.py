@@ -0,0 +1,68 @@
+"""
+Microbenchmarks for app.datetime_parser against raw dateparser.parse.
+
+Run from the repository root:
+
+    python -m benchmarks.datetime_parsing [--iterations N]
+"""
+import argparse
+import time
+
+import dateparser
+
+from app.datetime_parser import DateTimeParser
+
+EXPRESSIONS = [
+    "2025-07-25T18:00:00",
+    "2025-07-25T18:00:00Z",
+    "3 PM today",
+    "tomorrow 10am",
+    "today at 15:30",
+    "noon tomorrow",
+    "next friday at 3pm",
+    "July 25 at 6pm",
+    "in 2 hours",
+]
+
+
+def timed(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations
+
+
+def report(name: str, seconds: float, baseline: float):
+    print(f"{name:<44} {seconds * 1e6:>12.1f} us  {baseline / seconds:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    # Load dateparser's language data outside the timed loops
+    dateparser.parse("tomorrow")
+    engine = DateTimeParser()
+    engine.warm_up()
+
+    print(f"{'benchmark':<44} {'per call':>15}  {'speedup':>9}")
+    for text in EXPRESSIONS:
+        baseline = timed(lambda: dateparser.parse(text), args.iterations)
+        report(f"dateparser.parse({text!r})", baseline, baseline)
+        engine.clear()
+        cold = timed(lambda: (engine.clear(), engine.parse(text)), args.iterations)
+        report("  DateTimeParser.parse, cold cache", cold, baseline)
+        warm = timed(lambda: engine.parse(text), args.iterations)
+        report("  DateTimeParser.parse, warm cache", warm, baseline)
+
+    baseline = timed(lambda: [dateparser.parse(text) for text in EXPRESSIONS], args.iterations)
+    report(f"dateparser.parse x {len(EXPRESSIONS)}", baseline, baseline)
+    engine.clear()
+    batch = timed(lambda: engine.parse_many(EXPRESSIONS), args.iterations)
+    report(f"DateTimeParser.parse_many x {len(EXPRESSIONS)}", batch, baseline)
+    print(engine.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Memory and serialization cost of the event representations.
+
+Holds N calendar events as the Google API payloads the event cache used
+to keep, as the six-field dicts the REST layer used to build, and as
+app.events.Event records, and prints traced memory for each; then times
+writing a page of events as a response body the old way (dicts through
+jsonable_encoder and json.dumps) and the new way (app.events.dumps, with
+orjson when installed), and rendering them as tool-observation text:
+
+    python -m benchmarks.event_records [--events N] [--page N] [--iterations N]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from app.events import Event, dumps, orjson, render_events
+from benchmarks.fakes import seed_events
+
+
+def google_items(count: int):
+    # Roughly what events.list returns per event, beyond the seeded fields
+    items = []
+    for i, event in enumerate(seed_events(count, days=365)):
+        items.append(dict(
+            event,
+            kind="calendar#event",
+            id=f"evt{i:08d}",
+            etag=f'"{3300000000000000 + i}"',
+            status="confirmed",
+            htmlLink=f"https://www.google.com/calendar/event?eid=evt{i:08d}",
+            created="2026-01-05T09:12:44.000Z",
+            updated="2026-01-05T09:12:44.512Z",
+            creator={"email": "user@example.com", "self": True},
+            organizer={"email": "user@example.com", "self": True},
+            iCalUID=f"evt{i:08d}@google.com",
+            sequence=0,
+            reminders={"useDefault": True},
+            eventType="default",
+        ))
+    return items
+
+
+def as_dict(item):
+    # The REST shape calendar_utils built for every event before Event existed
+    return {
+        "id": item["id"],
+        "summary": item.get("summary", "No title"),
+        "start": item["start"].get("dateTime", item["start"].get("date")),
+        "end": item["end"].get("dateTime", item["end"].get("date")),
+        "description": item.get("description", ""),
+        "location": item.get("location", ""),
+    }
+
+
+def traced(build):
+    tracemalloc.start()
+    held = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return held, size
+
+
+def timed(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--page", type=int, default=250, help="events per response body")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    items = google_items(args.events)
+    encoded = json.dumps(items)
+    # Each representation is built from a fresh decode so nothing is shared with `items`
+    _, raw_size = traced(lambda: json.loads(encoded))
+    _, dict_size = traced(lambda: [as_dict(item) for item in json.loads(encoded)])
+    _, event_size = traced(lambda: [Event.from_api(item) for item in json.loads(encoded)])
+
+    print(f"{args.events} events held in memory")
+    print(f"{'representation':<24} {'KiB':>9} {'bytes/event':>12}")
+    for name, size in (
+        ("Google API payloads", raw_size),
+        ("six-field dicts", dict_size),
+        ("Event records", event_size),
+    ):
+        print(f"{name:<24} {size / 1024:>9.0f} {size / args.events:>12.0f}")
+
+    page_events = [Event.from_api(item) for item in items[:args.page]]
+    page_dicts = [as_dict(item) for item in items[:args.page]]
+    body = {"events": page_events, "total_count": len(page_events), "success": True, "error": None}
+    try:
+        from fastapi.encoders import jsonable_encoder
+    except ImportError:  # fastapi not installed: time the json.dumps part alone
+        jsonable_encoder = None
+
+    def old_dumps():
+        content = {"events": page_dicts, "total_count": len(page_dicts), "success": True, "error": None}
+        if jsonable_encoder is not None:
+            content = jsonable_encoder(content)
+        return json.dumps(content, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+    old_dumps()  # warm up
+    baseline = timed(old_dumps, args.iterations)
+    print()
+    print(f"one {args.page}-event response body (orjson {'installed' if orjson else 'not installed'})")
+    print(f"{'serializer':<44} {'us':>9} {'speedup':>8}")
+    for name, fn in (
+        ("dicts, " + ("jsonable_encoder + " if jsonable_encoder else "") + "json.dumps", old_dumps),
+        ("Event records, app.events.dumps", lambda: dumps(body)),
+        ("Event records, render_events (tool text)", lambda: render_events(page_events)),
+    ):
+        seconds = timed(fn, args.iterations)
+        print(f"{name:<44} {seconds * 1e6:>9.0f} {baseline / seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
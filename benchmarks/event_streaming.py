@@ -0,0 +1,79 @@
+"""
+Reading a year of events: collecting every page into a list versus
+streaming them with GoogleCalendarManager.iter_events, which holds at
+most two pages and fetches the next one while the current one is used.
+
+Runs against the FakeCalendar stand-in and prints wall time, round trips
+and peak traced memory for each:
+
+    python -m benchmarks.event_streaming [--events N] [--api-latency-ms MS] [--work-us US]
+"""
+import argparse
+import os
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+
+def consume(event, work: float):
+    # Stands in for whatever the caller does per event (format, filter, write)
+    deadline = time.perf_counter() + work
+    while time.perf_counter() < deadline:
+        pass
+    return len(event.summary)
+
+
+def collect_all(manager, time_min, time_max, access_token: str):
+    events, page_token = [], None
+    while True:
+        page = manager.list_events(time_min=time_min, time_max=time_max, page_token=page_token,
+                                   max_results=250, access_token=access_token)
+        events.extend(page["events"])
+        page_token = page["next_page_token"]
+        if not page_token:
+            return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--api-latency-ms", type=float, default=50)
+    parser.add_argument("--work-us", type=float, default=200, help="processing time per event")
+    args = parser.parse_args()
+
+    # Measure paging, not the per-user quota the scheduler would apply
+    os.environ.setdefault("GOOGLE_API_USER_QPS", "1000")
+    os.environ.setdefault("GOOGLE_API_QPS", "1000")
+    from benchmarks.fakes import FakeCalendar
+    from app.calendar_utils import GoogleCalendarManager
+    from app.service_pool import CalendarServicePool
+
+    calendar = FakeCalendar(seed_count=args.events, seed_days=365, latency=args.api_latency_ms / 1000)
+    manager = GoogleCalendarManager(service_pool=CalendarServicePool(http_factory=calendar.http))
+    time_min = datetime.now(timezone.utc) - timedelta(days=1)
+    time_max = time_min + timedelta(days=367)
+    # Seed the fake's store and build the client before measuring
+    manager.list_events(time_min=time_min, max_results=1, access_token="bench")
+    work = args.work_us / 1e6
+
+    modes = {
+        "list every page": lambda: collect_all(manager, time_min, time_max, "bench"),
+        "iter_events": lambda: manager.iter_events(time_min, time_max, access_token="bench"),
+    }
+
+    print(f"{args.events} events over a year, {args.api_latency_ms:g} ms per round trip, "
+          f"{args.work_us:g} us per event")
+    print(f"{'mode':<18} {'events':>7} {'seconds':>8} {'round trips':>12} {'peak KiB':>9}")
+    for name, run in modes.items():
+        calendar.round_trips = 0
+        tracemalloc.start()
+        started = time.perf_counter()
+        count = sum(1 for event in run() if consume(event, work) >= 0)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:<18} {count:>7} {elapsed:>8.2f} {calendar.round_trips:>12} {peak / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Round trips and bytes for an event update: the old events.get + full-body
+events.update versus a single events.patch with only the changed fields.
+
+Runs offline against recorded-style responses, so no credentials are needed:
+
+    python -m benchmarks.event_updates
+"""
+import json
+
+from googleapiclient.discovery import build_from_document
+from googleapiclient.http import HttpMockSequence
+
+from app.calendar_utils import patch_body
+from app.service_pool import calendar_discovery_document
+
+EVENT = {
+    "kind": "calendar#event",
+    "etag": "\"3401234567890000\"",
+    "id": "abc123",
+    "status": "confirmed",
+    "htmlLink": "https://www.google.com/calendar/event?eid=abc123",
+    "created": "2025-07-01T10:00:00.000Z",
+    "updated": "2025-07-01T10:00:00.000Z",
+    "summary": "Dinner with friends",
+    "description": "Table for six. " * 20,
+    "location": "Somewhere nice, 1 Main Street",
+    "creator": {"email": "someone@example.com", "self": True},
+    "organizer": {"email": "someone@example.com", "self": True},
+    "start": {"dateTime": "2025-07-25T18:00:00Z", "timeZone": "UTC"},
+    "end": {"dateTime": "2025-07-25T20:00:00Z", "timeZone": "UTC"},
+    "iCalUID": "abc123@google.com",
+    "sequence": 0,
+    "attendees": [{"email": f"guest{i}@example.com", "responseStatus": "needsAction"} for i in range(6)],
+    "reminders": {"useDefault": True},
+    "eventType": "default",
+}
+
+
+class RecordingHttp(HttpMockSequence):
+    """
+    HttpMockSequence that counts round trips and bytes each way
+    """
+
+    def __init__(self, responses):
+        super().__init__(responses)
+        self.round_trips = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        response, content = super().request(uri, method=method, body=body, headers=headers, **kwargs)
+        self.round_trips += 1
+        self.bytes_sent += len(body or b"")
+        self.bytes_received += len(content or b"")
+        return response, content
+
+
+def updated_event(end_time: str) -> dict:
+    event = json.loads(json.dumps(EVENT))
+    event["end"]["dateTime"] = end_time
+    return event
+
+
+def get_then_update(end_time: str) -> RecordingHttp:
+    http = RecordingHttp([
+        ({"status": "200"}, json.dumps(EVENT)),
+        ({"status": "200"}, json.dumps(updated_event(end_time))),
+    ])
+    service = build_from_document(calendar_discovery_document(), http=http)
+    event = service.events().get(calendarId="primary", eventId=EVENT["id"]).execute()
+    event["end"]["dateTime"] = end_time
+    service.events().update(calendarId="primary", eventId=EVENT["id"], body=event).execute()
+    return http
+
+
+def patch_only(end_time: str) -> RecordingHttp:
+    http = RecordingHttp([({"status": "200"}, json.dumps(updated_event(end_time)))])
+    service = build_from_document(calendar_discovery_document(), http=http)
+    request = service.events().patch(calendarId="primary", eventId=EVENT["id"], body=patch_body({"end_time": end_time}))
+    request.headers["If-Match"] = EVENT["etag"]
+    request.execute()
+    return http
+
+
+def main():
+    end_time = "2025-07-25T21:00:00Z"
+    print(f"{'strategy':<24} {'round trips':>12} {'bytes sent':>11} {'bytes received':>15}")
+    for name, run in (("get + update", get_then_update), ("patch (If-Match)", patch_only)):
+        http = run(end_time)
+        print(f"{name:<24} {http.round_trips:>12} {http.bytes_sent:>11} {http.bytes_received:>15}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""
+The real app wired to the offline fakes, for serving from separate
+processes (uvicorn/gunicorn workers):
+
+    BENCH_LLM_CPU_MS=20 uvicorn benchmarks.fake_app:app --workers 4
+
+BENCH_LLM_LATENCY_MS, BENCH_LLM_CPU_MS, BENCH_API_LATENCY_MS and
+BENCH_SEED_EVENTS configure the fakes.
+"""
+import os
+
+from benchmarks.fakes import FakeCalendar, ScriptedChatModel, install
+
+app = install(
+    FakeCalendar(seed_count=int(os.environ.get("BENCH_SEED_EVENTS", 100)),
+                 latency=float(os.environ.get("BENCH_API_LATENCY_MS", 0)) / 1000),
+    ScriptedChatModel(latency=float(os.environ.get("BENCH_LLM_LATENCY_MS", 0)) / 1000,
+                      cpu=float(os.environ.get("BENCH_LLM_CPU_MS", 0)) / 1000),
+)
@@ -0,0 +1,496 @@
+"""
+Offline stand-ins for the two network dependencies of the backend:
+
+- ``FakeCalendar``: an in-process Google Calendar v3 server behind an
+  ``httplib2.Http``-compatible ``request()``, covering the calls the app
+  makes (events list/get/insert/import/patch/update/delete with sync
+  tokens and If-Match, events.watch/channels.stop push channels,
+  calendars.get, freeBusy.query and the HTTP batch endpoint). Push notifications are queued for the caller
+  to POST to the app's webhook.
+- ``ScriptedChatModel``: a LangChain chat model that answers ReAct prompts
+  with a fixed Action / Final Answer script instead of calling Mistral.
+
+``install()`` wires both into ``app.main`` so the real FastAPI app, agent,
+tools and GoogleCalendarManager run end to end with no network.
+"""
+import copy
+import http.client
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.parser import BytesParser
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+import httplib2
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+TITLES = ["Standup", "1:1 with Alex", "Design review", "Lunch", "Sprint planning",
+          "Dinner with friends", "Gym", "Customer call", "Retro", "Focus time"]
+
+_CALENDAR_PATH_RE = re.compile(r"^/calendar/v3/calendars/(?P<calendar>[^/]+)$")
+_EVENT_PATH_RE = re.compile(r"^/calendar/v3/calendars/(?P<calendar>[^/]+)/events(?:/(?P<event>[^/]+))?$")
+
+
+def _iso(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _parse_time(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _event_bounds(event: Dict[str, Any]) -> Tuple[datetime, datetime]:
+    start, end = event.get("start", {}), event.get("end", {})
+    return (_parse_time(start.get("dateTime") or start["date"]),
+            _parse_time(end.get("dateTime") or end["date"]))
+
+
+def seed_events(count: int, days: int = 14, seed: int = 7) -> List[Dict[str, Any]]:
+    """
+    ``count`` deterministic events spread over the next ``days`` days
+    """
+    rng = random.Random(seed)
+    base = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    events = []
+    for _ in range(count):
+        start = base + timedelta(hours=rng.randrange(days * 24))
+        end = start + timedelta(minutes=rng.choice((15, 30, 60, 90)))
+        events.append({
+            "summary": rng.choice(TITLES),
+            "description": "Seeded benchmark event",
+            "start": {"dateTime": _iso(start), "timeZone": "UTC"},
+            "end": {"dateTime": _iso(end), "timeZone": "UTC"},
+        })
+    return events
+
+
+class FakeCalendarStore:
+    def __init__(self, on_write=None):
+        """
+        One user's calendars; every write bumps a sequence number that
+        doubles as the etag and the sync token
+        """
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.calendars: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # Event id by (calendar, iCalUID), for events.import
+        self.uids: Dict[Tuple[str, str], str] = {}
+        self.on_write = on_write
+
+    def write(self, calendar_id: str, event: Dict[str, Any]) -> Dict[str, Any]:
+        self.seq += 1
+        event["etag"] = f'"{self.seq}"'
+        event["updated"] = _iso(datetime.now(timezone.utc))
+        event["_seq"] = self.seq
+        self.calendars.setdefault(calendar_id, {})[event["id"]] = event
+        if event.get("iCalUID"):
+            self.uids[(calendar_id, event["iCalUID"])] = event["id"]
+        if self.on_write is not None:
+            self.on_write(calendar_id)
+        return event
+
+
+class FakeCalendar:
+    def __init__(self, seed_count: int = 100, seed_days: int = 14, latency: float = 0.0,
+                 user_qps: float = 0.0, project_qps: float = 0.0):
+        """
+        In-memory Calendar v3 API. Each access token gets its own copy of
+        ``seed_count`` seeded events on first use; ``latency`` seconds are
+        slept per HTTP round trip to model the network. ``user_qps`` and
+        ``project_qps`` (0 = unlimited) enforce per-second quotas the way
+        Google does, with 403 rateLimitExceeded.
+        """
+        self.template = seed_events(seed_count, seed_days)
+        self.latency = latency
+        self.user_qps = user_qps
+        self.project_qps = project_qps
+        self._lock = threading.Lock()
+        self._stores: Dict[str, FakeCalendarStore] = {}
+        self.round_trips = 0
+        self.rate_limited = 0
+        # Calls per (token or "", one-second window) for the quotas
+        self._calls: Dict[Tuple[str, int], int] = {}
+        # Push channels by id, and the webhook deliveries they produced
+        self.channels: Dict[str, Dict[str, Any]] = {}
+        self.notifications: List[Dict[str, str]] = []
+
+    def http(self) -> "FakeCalendarHttp":
+        """
+        ``http_factory`` for CalendarServicePool / build_calendar_service
+        """
+        return FakeCalendarHttp(self)
+
+    def store(self, token: str) -> FakeCalendarStore:
+        with self._lock:
+            store = self._stores.get(token)
+            if store is None:
+                store = self._stores[token] = FakeCalendarStore()
+                for body in self.template:
+                    event = copy.deepcopy(body)
+                    event.update(id=uuid.uuid4().hex, status="confirmed", iCalUID=f"{uuid.uuid4().hex}@fake")
+                    store.write("primary", event)
+                store.on_write = lambda calendar_id: self._notify(token, calendar_id, "exists")
+            return store
+
+    def external_change(self, token: str, summary: str, calendar_id: str = "primary") -> Dict[str, Any]:
+        """
+        Create an event as some other client would, outside the app
+        """
+        start = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(hours=1)
+        event = {"id": uuid.uuid4().hex, "status": "confirmed", "summary": summary,
+                 "start": {"dateTime": _iso(start)}, "end": {"dateTime": _iso(start + timedelta(hours=1))}}
+        store = self.store(token)
+        with store.lock:
+            return store.write(calendar_id, event)
+
+    def _over_quota(self, token: str) -> bool:
+        if not (self.user_qps or self.project_qps):
+            return False
+        window = int(time.time())
+        with self._lock:
+            if (token, window - 2) in self._calls or ("", window - 2) in self._calls:
+                self._calls = {key: count for key, count in self._calls.items() if key[1] >= window - 1}
+            user = self._calls[(token, window)] = self._calls.get((token, window), 0) + 1
+            total = self._calls[("", window)] = self._calls.get(("", window), 0) + 1
+            over = (self.user_qps and user > self.user_qps) or (self.project_qps and total > self.project_qps)
+            if over:
+                self.rate_limited += 1
+            return bool(over)
+
+    def _notify(self, token: str, calendar_id: str, state: str, only: Optional[str] = None):
+        with self._lock:
+            for channel in self.channels.values():
+                if (channel["user"], channel["calendar"]) != (token, calendar_id) or only not in (None, channel["id"]):
+                    continue
+                channel["messages"] += 1
+                self.notifications.append({
+                    "X-Goog-Channel-ID": channel["id"],
+                    "X-Goog-Channel-Token": channel["token"],
+                    "X-Goog-Channel-Expiration": channel["expiration_text"],
+                    "X-Goog-Resource-ID": channel["resourceId"],
+                    "X-Goog-Resource-URI": f"https://www.googleapis.com/calendar/v3/calendars/{calendar_id}/events",
+                    "X-Goog-Resource-State": state,
+                    "X-Goog-Message-Number": str(channel["messages"]),
+                })
+
+    def drain_notifications(self) -> List[Dict[str, str]]:
+        """
+        Webhook deliveries queued since the last call, to be POSTed to the app
+        """
+        with self._lock:
+            pending, self.notifications = self.notifications, []
+        return pending
+
+    def _watch(self, token: str, calendar_id: str, payload: Dict[str, Any]):
+        ttl = float((payload.get("params") or {}).get("ttl", 604800))
+        expiration = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        channel = {
+            "id": payload["id"], "resourceId": uuid.uuid4().hex, "token": payload.get("token", ""),
+            "address": payload["address"], "user": token, "calendar": calendar_id, "messages": 0,
+            "expiration": str(int(expiration.timestamp() * 1000)),
+            "expiration_text": expiration.strftime("%a, %d %b %Y %H:%M:%S GMT"),
+        }
+        with self._lock:
+            self.channels[channel["id"]] = channel
+        self._notify(token, calendar_id, "sync", only=channel["id"])
+        return self._json({"kind": "api#channel", "id": channel["id"], "resourceId": channel["resourceId"],
+                           "resourceUri": f"https://www.googleapis.com/calendar/v3/calendars/{calendar_id}/events",
+                           "token": channel["token"], "expiration": channel["expiration"]})
+
+    def handle(self, method: str, uri: str, body: Optional[bytes], headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Serve one (non-batch) API request: ``(status, headers, body)``
+        """
+        parsed = urlparse(uri)
+        path = parsed.path
+        if path.startswith("/batch/"):
+            return self._batch(body or b"", headers)
+        params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        headers = {key.lower(): value for key, value in headers.items()}
+        token = headers.get("authorization", "").replace("Bearer ", "", 1)
+        if self._over_quota(token):
+            return self._error(403, "rateLimitExceeded")
+        store = self.store(token)
+        payload = json.loads(body) if body else {}
+        if path == "/calendar/v3/freeBusy" and method == "POST":
+            return self._free_busy(store, payload)
+        if path == "/calendar/v3/channels/stop" and method == "POST":
+            with self._lock:
+                channel = self.channels.get(payload.get("id"))
+                if channel is None or channel["resourceId"] != payload.get("resourceId"):
+                    return self._error(404, "notFound")
+                del self.channels[payload["id"]]
+            return 204, {}, b""
+        if path.endswith("/events/watch") and method == "POST":
+            return self._watch(token, unquote(path.split("/")[4]), payload)
+        calendar_match = _CALENDAR_PATH_RE.match(path)
+        if calendar_match is not None and method == "GET":
+            # Each access token stands for its own account
+            calendar_id = unquote(calendar_match.group("calendar"))
+            if calendar_id == "primary":
+                calendar_id = f"{token or 'service-account'}@fake"
+            return self._json({"kind": "calendar#calendar", "id": calendar_id, "summary": calendar_id, "timeZone": "UTC"})
+        if path.endswith("/events/import") and method == "POST":
+            return self._import(store, unquote(path.split("/")[4]), payload)
+        match = _EVENT_PATH_RE.match(path)
+        if match is None:
+            return self._error(404, "notFound")
+        calendar_id, event_id = unquote(match.group("calendar")), match.group("event")
+        with store.lock:
+            if event_id is None:
+                if method == "GET":
+                    return self._list(store, calendar_id, params)
+                if method == "POST":
+                    event = dict(payload, id=uuid.uuid4().hex, status="confirmed", iCalUID=f"{uuid.uuid4().hex}@fake")
+                    return self._json(store.write(calendar_id, event))
+                return self._error(405, "methodNotAllowed")
+            event_id = unquote(event_id)
+            current = store.calendars.get(calendar_id, {}).get(event_id)
+            if current is None or current.get("status") == "cancelled":
+                return self._error(410 if current else 404, "deleted" if current else "notFound")
+            if_match = headers.get("if-match")
+            if if_match and if_match != current["etag"]:
+                return self._error(412, "conditionNotMet")
+            if method == "GET":
+                return self._json(current)
+            if method == "DELETE":
+                store.write(calendar_id, dict(current, status="cancelled"))
+                return 204, {}, b""
+            if method == "PATCH":
+                return self._json(store.write(calendar_id, dict(current, **payload)))
+            if method == "PUT":
+                return self._json(store.write(calendar_id, dict(payload, id=event_id, status="confirmed")))
+            return self._error(405, "methodNotAllowed")
+
+    def _import(self, store: FakeCalendarStore, calendar_id: str, payload: Dict[str, Any]):
+        # One event per iCalUID: importing a UID again updates that event
+        uid = payload.get("iCalUID")
+        if not uid:
+            return self._error(400, "required")
+        with store.lock:
+            current = store.calendars.get(calendar_id, {}).get(store.uids.get((calendar_id, uid)))
+            live = current is not None and current.get("status") != "cancelled"
+            event_id = current["id"] if live else uuid.uuid4().hex
+            return self._json(store.write(calendar_id, dict(payload, id=event_id, status="confirmed")))
+
+    def _list(self, store: FakeCalendarStore, calendar_id: str, params: Dict[str, str]):
+        events = list(store.calendars.get(calendar_id, {}).values())
+        sync_token = params.get("syncToken")
+        if sync_token is not None:
+            if not sync_token.isdigit():
+                return self._error(410, "fullSyncRequired")
+            # Incremental: everything changed since the token, deletions included
+            events = [event for event in events if event["_seq"] > int(sync_token)]
+        else:
+            events = [event for event in events if event.get("status") != "cancelled"]
+            time_min = _parse_time(params["timeMin"]) if "timeMin" in params else None
+            time_max = _parse_time(params["timeMax"]) if "timeMax" in params else None
+            if time_min or time_max:
+                bounded = []
+                for event in events:
+                    start, end = _event_bounds(event)
+                    if (time_min is None or end > time_min) and (time_max is None or start < time_max):
+                        bounded.append(event)
+                events = bounded
+            query = params.get("q", "").lower()
+            if query:
+                events = [event for event in events
+                          if any(query in (event.get(field) or "").lower()
+                                 for field in ("summary", "description", "location"))]
+        events.sort(key=lambda event: _event_bounds(event)[0] if event.get("status") != "cancelled" else datetime.min.replace(tzinfo=timezone.utc))
+        offset = int(params.get("pageToken", 0))
+        limit = int(params.get("maxResults", 250))
+        page = events[offset:offset + limit]
+        result: Dict[str, Any] = {"kind": "calendar#events", "items": page}
+        if offset + limit < len(events):
+            result["nextPageToken"] = str(offset + limit)
+        else:
+            result["nextSyncToken"] = str(store.seq)
+        return self._json(result)
+
+    def _free_busy(self, store: FakeCalendarStore, payload: Dict[str, Any]):
+        time_min, time_max = _parse_time(payload["timeMin"]), _parse_time(payload["timeMax"])
+        calendars = {}
+        with store.lock:
+            for item in payload.get("items", []):
+                calendar_id = item["id"]
+                if calendar_id not in store.calendars:
+                    calendars[calendar_id] = {"busy": [], "errors": [{"domain": "global", "reason": "notFound"}]}
+                    continue
+                busy = []
+                for event in store.calendars[calendar_id].values():
+                    if event.get("status") == "cancelled":
+                        continue
+                    start, end = _event_bounds(event)
+                    if end > time_min and start < time_max:
+                        busy.append({"start": _iso(max(start, time_min)), "end": _iso(min(end, time_max))})
+                calendars[calendar_id] = {"busy": sorted(busy, key=lambda period: period["start"])}
+        return self._json({"kind": "calendar#freeBusy", "timeMin": payload["timeMin"],
+                           "timeMax": payload["timeMax"], "calendars": calendars})
+
+    def _batch(self, body: bytes, headers: Dict[str, str]):
+        content_type = next(value for key, value in headers.items() if key.lower() == "content-type")
+        message = BytesParser().parsebytes(b"content-type: " + content_type.encode() + b"\r\n\r\n" + body)
+        boundary = uuid.uuid4().hex
+        parts = []
+        for part in message.get_payload():
+            request_text = part.get_payload(decode=False)
+            head, _, part_body = request_text.replace("\r\n", "\n").partition("\n\n")
+            request_line, *header_lines = head.split("\n")
+            method, uri, _ = request_line.split(" ", 2)
+            part_headers = dict(line.split(": ", 1) for line in header_lines if ": " in line)
+            # Sub-requests carry no Authorization; they inherit the outer one
+            for key, value in headers.items():
+                if key.lower() == "authorization":
+                    part_headers.setdefault("authorization", value)
+            status, response_headers, payload = self.handle(method, uri, part_body.encode() or None, part_headers)
+            content_id = part["Content-ID"].strip("<>")
+            lines = [f"HTTP/1.1 {status} {http.client.responses.get(status, 'OK')}"]
+            lines += [f"{key}: {value}" for key, value in response_headers.items()]
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                + "\r\n".join(lines) + "\r\n\r\n" + payload.decode()
+            )
+        content = "\r\n".join(parts) + f"\r\n--{boundary}--\r\n"
+        return 200, {"content-type": f"multipart/mixed; boundary={boundary}"}, content.encode()
+
+    @staticmethod
+    def _json(body: Dict[str, Any]):
+        body = {key: value for key, value in body.items() if key != "_seq"}
+        if "items" in body:
+            body["items"] = [{k: v for k, v in event.items() if k != "_seq"} for event in body["items"]]
+        return 200, {"content-type": "application/json; charset=UTF-8"}, json.dumps(body).encode()
+
+    @staticmethod
+    def _error(status: int, reason: str):
+        body = {"error": {"code": status, "message": reason, "errors": [{"domain": "global", "reason": reason}]}}
+        return status, {"content-type": "application/json; charset=UTF-8"}, json.dumps(body).encode()
+
+
+class FakeCalendarHttp:
+    """
+    ``httplib2.Http`` look-alike that routes requests to a FakeCalendar
+    """
+
+    def __init__(self, calendar: FakeCalendar):
+        self.calendar = calendar
+        self.timeout = None
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=None, connection_type=None):
+        with self.calendar._lock:
+            self.calendar.round_trips += 1
+        if self.calendar.latency:
+            time.sleep(self.calendar.latency)
+        if isinstance(body, str):
+            body = body.encode()
+        status, response_headers, content = self.calendar.handle(method, uri, body, dict(headers or {}))
+        return httplib2.Response({"status": str(status), **response_headers}), content
+
+    def close(self):
+        pass
+
+
+# Keyword -> (tool, ReAct action input, tool-calling args) for the first step
+SCRIPT = [
+    (("free", "slot", "available"), "FindFreeSlots", "30 minutes", {"duration_minutes": 30}),
+    (("delete", "cancel", "remove"), "DeleteCalendarEvent", "Standup", {"summary": "Standup"}),
+    (("quarter", "1:1"), "SearchCalendarEvents", "1:1 this quarter", {"query": "1:1", "period": "this quarter"}),
+]
+DEFAULT_ACTION = ("ShowCalendarEvents", "", {})
+_OBSERVATION_RE = re.compile(r"Observation:\s*(.*?)(?:\nThought:|$)", re.DOTALL)
+
+
+def _first_line(text: str) -> str:
+    lines = str(text).strip().splitlines()
+    return lines[0] if lines else "Done."
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Chat model that plays a fixed two-step script: one tool call chosen by
+    keyword, then an answer quoting the tool's output. Speaks ReAct text
+    by default and native tool calls once ``bind_tools`` is used, so both
+    AGENT_MODEs can be compared. ``latency`` seconds are slept per call to
+    model the LLM round trip.
+    """
+
+    latency: float = 0.0
+    # CPU seconds burned per call, to model work that does not overlap
+    # across threads (for multi-worker scaling runs)
+    cpu: float = 0.0
+    streaming: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        from langchain_core.utils.function_calling import convert_to_openai_tool
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    @staticmethod
+    def _pick(text: str):
+        text = text.lower()
+        return next(((tool, tool_input, args) for keywords, tool, tool_input, args in SCRIPT
+                     if any(keyword in text for keyword in keywords)), DEFAULT_ACTION)
+
+    def respond(self, prompt: str) -> str:
+        # The format instructions also mention Question/Observation; the
+        # real question and scratchpad follow the last "Question:"
+        question, _, scratchpad = prompt.rsplit("Question:", 1)[-1].partition("\nThought:")
+        observations = _OBSERVATION_RE.findall(scratchpad)
+        if observations:
+            return f"Thought: I now know the final answer\nFinal Answer: {_first_line(observations[-1])}"
+        tool, tool_input, _ = self._pick(question)
+        return f"Thought: I should use {tool}\nAction: {tool}\nAction Input: {tool_input}"
+
+    def respond_with_tools(self, messages) -> AIMessage:
+        if messages[-1].type == "tool":
+            return AIMessage(content=_first_line(messages[-1].content))
+        question = next(str(m.content) for m in reversed(messages) if m.type == "human")
+        tool, _, args = self._pick(question)
+        return AIMessage(content="", tool_calls=[{"name": tool, "args": dict(args), "id": uuid.uuid4().hex}])
+
+    def _generate(self, messages, stop=None, run_manager=None, tools=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        if self.cpu:
+            deadline = time.thread_time() + self.cpu
+            while time.thread_time() < deadline:
+                pass
+        if tools is not None:
+            message = self.respond_with_tools(messages)
+        else:
+            message = AIMessage(content=self.respond("\n".join(str(m.content) for m in messages)))
+        if run_manager and self.streaming and message.content:
+            for token in message.content.split(" "):
+                run_manager.on_llm_new_token(token + " ")
+        # Word count stands in for tokens so the usage counters move
+        usage = {"prompt_tokens": sum(len(str(m.content).split()) for m in messages),
+                 "completion_tokens": len(str(message.content).split()) + 10 * len(message.tool_calls)}
+        return ChatResult(generations=[ChatGeneration(message=message)], llm_output={"token_usage": usage})
+
+
+def install(calendar: FakeCalendar, model: Optional[BaseChatModel] = None):
+    """
+    Point ``app.main`` at the fakes. Must run before the first request
+    builds the LLM, agent or calendar manager.
+    """
+    from app import main
+    from app.calendar_utils import GoogleCalendarManager
+    from app.langchain_tools import calendar_manager
+    from app.service_pool import CalendarServicePool
+
+    if main.llm.ready or main.agent.ready or calendar_manager.ready:
+        raise RuntimeError("install() must run before the app builds its components")
+    main.llm.factory = lambda: model or ScriptedChatModel()
+    calendar_manager.factory = lambda: GoogleCalendarManager(service_pool=CalendarServicePool(http_factory=calendar.http))
+    return main.app
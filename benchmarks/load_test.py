@@ -0,0 +1,151 @@
+"""
+Offline load test: drives the real FastAPI app in-process with a scripted
+chat model and the FakeCalendar stand-in, and reports throughput,
+p50/p95/p99 latency and memory allocated per request.
+
+Run from the repository root:
+
+    python -m benchmarks.load_test [--scenario chat|events|search|availability|all]
+        [--requests N] [--concurrency C] [--users U]
+        [--llm-latency-ms MS] [--api-latency-ms MS] [--seed-events N]
+        [--agent-mode react|tools] [--no-alloc]
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import httpx
+
+from benchmarks.fakes import FakeCalendar, ScriptedChatModel, install
+
+CHAT_MESSAGES = [
+    "What's on my calendar this week?",
+    "Find me a free 30 minute slot",
+    "Show my upcoming events",
+    "Am I free tomorrow at 3pm?",
+    "Do I have any meetings?",
+]
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def scenarios(users: int) -> Dict[str, Callable[[httpx.AsyncClient, int], "asyncio.Future"]]:
+    """
+    One request per scenario, parameterised by the request number so load
+    spreads over ``users`` access tokens and the chat messages
+    """
+    def token(i: int) -> str:
+        return f"bench-user-{i % users}"
+
+    def chat(client: httpx.AsyncClient, i: int):
+        return client.post("/chat", json={"content": CHAT_MESSAGES[i % len(CHAT_MESSAGES)],
+                                          "access_token": token(i), "user_id": str(i % users)})
+
+    def events(client: httpx.AsyncClient, i: int):
+        return client.get("/calendar/events", params={"max_results": 50},
+                          headers={"Authorization": f"Bearer {token(i)}"})
+
+    def search(client: httpx.AsyncClient, i: int):
+        return client.get("/calendar/events/search", params={"query": "standup"},
+                          headers={"Authorization": f"Bearer {token(i)}"})
+
+    def availability(client: httpx.AsyncClient, i: int):
+        return client.post("/calendar/availability", json={"duration_minutes": 30},
+                           headers={"Authorization": f"Bearer {token(i)}"})
+
+    return {"chat": chat, "events": events, "search": search, "availability": availability}
+
+
+async def run_scenario(client: httpx.AsyncClient, send, requests: int, concurrency: int,
+                       track_alloc: bool) -> Dict[str, float]:
+    latencies: List[float] = []
+    failures = 0
+    counter = itertools.count()
+
+    async def worker():
+        nonlocal failures
+        while True:
+            i = next(counter)
+            if i >= requests:
+                return
+            started = time.perf_counter()
+            response = await send(client, i)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                failures += 1
+
+    if track_alloc:
+        tracemalloc.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    peak = 0
+    if track_alloc:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "requests": requests,
+        "failures": failures,
+        "throughput": requests / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        # Peak traced memory over the run, divided across its requests
+        "alloc_kib": peak / 1024 / requests if track_alloc and requests else float("nan"),
+    }
+
+
+async def main_async(args):
+    # Read by app.main at import, which install() triggers
+    os.environ["AGENT_MODE"] = args.agent_mode
+    calendar = FakeCalendar(seed_count=args.seed_events, latency=args.api_latency_ms / 1000)
+    app = install(calendar, ScriptedChatModel(latency=args.llm_latency_ms / 1000))
+    names = list(scenarios(args.users)) if args.scenario == "all" else [args.scenario]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Build the agent, tools and per-user calendar clients before timing
+        for name in names:
+            await run_scenario(client, scenarios(args.users)[name], min(args.users, args.requests), args.concurrency, False)
+        print(f"{'scenario':<14} {'req':>6} {'fail':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} "
+              f"{'p99 ms':>9} {'KiB/req':>9}")
+        for name in names:
+            result = await run_scenario(client, scenarios(args.users)[name], args.requests,
+                                        args.concurrency, not args.no_alloc)
+            print(f"{name:<14} {result['requests']:>6} {result['failures']:>5} {result['throughput']:>9.1f} "
+                  f"{result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+                  f"{result['alloc_kib']:>9.1f}")
+    from app.telemetry import telemetry
+    llm_calls = telemetry.span_seconds.count(kind="llm")
+    tokens = telemetry.llm_tokens.total()
+    print(f"Google API round trips: {calendar.round_trips}; LLM calls: {llm_calls:g}; LLM tokens: {tokens:g}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenario", default="all", choices=["all", "chat", "events", "search", "availability"])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--api-latency-ms", type=float, default=0.0)
+    parser.add_argument("--seed-events", type=int, default=100)
+    parser.add_argument("--agent-mode", default="react", choices=["react", "tools"])
+    parser.add_argument("--no-alloc", action="store_true", help="skip tracemalloc (it slows every allocation)")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
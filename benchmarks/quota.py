@@ -0,0 +1,120 @@
+"""
+Google API calls under a quota: completed and failed calls, rate-limit
+responses from Google, throughput and per-user latency, with the API
+scheduler off and on.
+
+A few light users and one heavy user (who queues many calls at once)
+list events concurrently through GoogleCalendarManager against the
+FakeCalendar stand-in, which enforces per-user and per-project
+calls-per-second quotas. Each mode runs in its own process because the
+scheduler reads its configuration at import:
+
+    python -m benchmarks.quota [--users N] [--calls N] [--heavy K]
+                               [--user-qps Q] [--project-qps Q]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MODES = {
+    "no scheduler": {"GOOGLE_API_SCHEDULER_ENABLED": "0"},
+    "scheduler": {"GOOGLE_API_SCHEDULER_ENABLED": "1"},
+}
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(args):
+    from benchmarks.fakes import FakeCalendar
+    from app.calendar_utils import GoogleCalendarManager
+    from app.service_pool import CalendarServicePool
+
+    calendar = FakeCalendar(seed_count=50, latency=args.api_latency_ms / 1000,
+                            user_qps=args.user_qps, project_qps=args.project_qps)
+    manager = GoogleCalendarManager(service_pool=CalendarServicePool(http_factory=calendar.http))
+    # The heavy user's calls are all queued first, ahead of everyone else's
+    jobs = [("heavy", "user-0")] * (args.calls * args.heavy)
+    jobs += [("light", f"user-{i}") for _ in range(args.calls) for i in range(1, args.users)]
+    latencies = {"heavy": [], "light": []}
+    failed = 0
+
+    def call(job):
+        kind, token = job
+        started = time.perf_counter()
+        try:
+            manager.list_events(max_results=10, access_token=token)
+        except Exception:
+            return kind, None
+        return kind, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for kind, latency in pool.map(call, jobs):
+            if latency is None:
+                failed += 1
+            else:
+                latencies[kind].append(latency)
+    elapsed = time.perf_counter() - started
+    completed = len(latencies["heavy"]) + len(latencies["light"])
+    print(json.dumps({
+        "completed": completed,
+        "failed": failed,
+        "rate_limited": calendar.rate_limited,
+        "throughput": completed / elapsed,
+        "light_p95": percentile(latencies["light"], 0.95),
+        "heavy_p95": percentile(latencies["heavy"], 0.95),
+        "light_median": statistics.median(latencies["light"]) if latencies["light"] else 0.0,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=6, help="users, one of them heavy")
+    parser.add_argument("--calls", type=int, default=30, help="calls per light user")
+    parser.add_argument("--heavy", type=int, default=5, help="the heavy user makes this many times more calls")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--user-qps", type=float, default=5)
+    parser.add_argument("--project-qps", type=float, default=20)
+    parser.add_argument("--api-latency-ms", type=float, default=20)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run(args)
+        return
+
+    quota = {
+        "GOOGLE_API_QPS": str(args.project_qps),
+        "GOOGLE_API_USER_QPS": str(args.user_qps),
+        # Small bursts keep each one-second window under the quota
+        "GOOGLE_API_BURST": str(max(1.0, args.project_qps / 4)),
+        "GOOGLE_API_USER_BURST": str(max(1.0, args.user_qps / 4)),
+        "GOOGLE_API_MAX_WAIT_SECONDS": "120",
+        "EVENT_CACHE_ENABLED": "0",
+        "TRACING_ENABLED": "0",
+    }
+    print(f"quota: {args.user_qps:g} calls/s per user, {args.project_qps:g} calls/s per project")
+    print(f"{'mode':<14} {'ok':>6} {'failed':>7} {'403s':>6} {'calls/s':>8} "
+          f"{'light p50':>10} {'light p95':>10} {'heavy p95':>10}")
+    for name, env in MODES.items():
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.quota", "--child", *sys.argv[1:]],
+            env={**os.environ, **quota, **env}, capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        result = json.loads(output)
+        print(f"{name:<14} {result['completed']:>6} {result['failed']:>7} {result['rate_limited']:>6} "
+              f"{result['throughput']:>8.1f} {result['light_median'] * 1000:>8.0f}ms "
+              f"{result['light_p95'] * 1000:>8.0f}ms {result['heavy_p95'] * 1000:>8.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
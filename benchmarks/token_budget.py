@@ -0,0 +1,83 @@
+"""
+Prompt size of a multi-step agent run with and without the token budget.
+
+Replays a ReAct run whose steps list and search events, find free slots
+and list events again, against calendars of increasing size. Each step
+re-sends the scratchpad of earlier observations. Prints, per calendar
+size, the largest prompt of the run, the total prompt tokens, and an
+estimated per-step LLM latency at --ms-per-1k-tokens of prompt:
+
+    python -m benchmarks.token_budget [--steps N] [--prefix-tokens N] [--ms-per-1k-tokens MS]
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from app.events import Event
+from app.token_budget import count_tokens, token_budget
+from benchmarks.fakes import seed_events
+
+SIZES = (20, 200, 2000, 20000)
+# The tools' own limits (langchain_tools.SEARCH_LIST_LIMIT, get_upcoming_events)
+SEARCH_LIST_LIMIT = 25
+UPCOMING_LIMIT = 10
+
+
+def calendar(size: int):
+    items = seed_events(size, days=30)
+    events = [Event.from_api(dict(item, id=f"evt{i}")) for i, item in enumerate(items)]
+    return sorted(events, key=lambda event: event.start)
+
+
+def observations(events, steps: int):
+    # The tool outputs of one run, in order
+    now = datetime.now(timezone.utc)
+    slots = "\n".join(
+        f"Free from {(now + timedelta(hours=h)).isoformat()} to {(now + timedelta(hours=h, minutes=30)).isoformat()}"
+        for h in range(0, 24 * 7, 6)
+    )
+    tools = [
+        lambda: token_budget.render_events(events[:SEARCH_LIST_LIMIT], header=f"{len(events)} event(s) this month:",
+                                           more=max(0, len(events) - SEARCH_LIST_LIMIT)),
+        lambda: token_budget.render_events(events[:UPCOMING_LIMIT]),
+        lambda: slots,
+    ]
+    return [token_budget.fit(tools[step % len(tools)]()) for step in range(steps)]
+
+
+def run(events, steps: int, prefix_tokens: int):
+    """
+    Prompt tokens of each step: prompt prefix, then every earlier step's
+    thought/action and (capped) observation
+    """
+    done = []
+    prompts = []
+    with token_budget.track():
+        outputs = observations(events, steps)
+    for output in outputs:
+        scratchpad = token_budget.cap(done)
+        prompts.append(prefix_tokens + sum(30 + count_tokens(text) for text in scratchpad))
+        done.append(output)
+    return prompts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--steps", type=int, default=6)
+    parser.add_argument("--prefix-tokens", type=int, default=700, help="instructions, tool descriptions and question")
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=150, help="prompt processing time of the model")
+    args = parser.parse_args()
+
+    print(f"{args.steps}-step run, {args.prefix_tokens} prefix tokens, "
+          f"{token_budget.observation_tokens}/{token_budget.scratchpad_tokens} observation/scratchpad budget")
+    print(f"{'events':>7} {'budget':>7} {'max prompt':>11} {'total prompt':>13} {'max step ms':>12}")
+    for size in SIZES:
+        events = calendar(size)
+        for enabled in (False, True):
+            token_budget.enabled = enabled
+            prompts = run(events, args.steps, args.prefix_tokens)
+            print(f"{size:>7} {'on' if enabled else 'off':>7} {max(prompts):>11} {sum(prompts):>13} "
+                  f"{max(prompts) * args.ms_per_1k_tokens / 1000:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Google round trips and stale reads for title lookups while another client
+keeps changing the calendar: interval polling versus push channels.
+
+Each mode runs in its own process against the FakeCalendar stand-in,
+which queues webhook deliveries that are POSTed to the app's
+/calendar/notifications endpoint:
+
+    python -m benchmarks.watch_sync [--reads N] [--change-every K]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+
+import httpx
+
+TOKEN = "bench-user"
+MODES = {
+    "poll (sync every read)": {"EVENT_CACHE_SYNC_SECONDS": "0"},
+    "poll (30 s interval)": {"EVENT_CACHE_SYNC_SECONDS": "30"},
+    "push channels": {"EVENT_CACHE_SYNC_SECONDS": "30",
+                      "CALENDAR_WEBHOOK_URL": "https://bench.invalid/calendar/notifications"},
+}
+
+
+async def run(reads: int, change_every: int):
+    from benchmarks.fakes import FakeCalendar, install
+
+    calendar = FakeCalendar()
+    app = install(calendar)
+    headers = {"Authorization": f"Bearer {TOKEN}"}
+    stale = 0
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await client.get("/calendar/events/search", params={"query": "standup"}, headers=headers)
+        calendar.drain_notifications()
+        calendar.round_trips = 0
+        latest = "standup"
+        for i in range(reads):
+            if i % change_every == 0:
+                latest = f"Offsite {i}"
+                calendar.external_change(TOKEN, latest)
+                for notification in calendar.drain_notifications():
+                    await client.post("/calendar/notifications", headers=notification)
+            response = await client.get("/calendar/events/search", params={"query": latest}, headers=headers)
+            if not any(event["summary"] == latest for event in response.json().get("events", [])):
+                stale += 1
+    print(f"{calendar.round_trips} {stale}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--change-every", type=int, default=20)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        asyncio.run(run(args.reads, args.change_every))
+        return
+
+    print(f"{'mode':<26} {'round trips':>12} {'stale reads':>12}")
+    for name, env in MODES.items():
+        # app.main reads its configuration at import, so each mode gets a fresh process
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.watch_sync", "--child",
+             "--reads", str(args.reads), "--change-every", str(args.change_every)],
+            env={**os.environ, **env}, capture_output=True, text=True, check=True,
+        ).stdout.split()
+        round_trips, stale = output[-2:]
+        print(f"{name:<26} {round_trips:>12} {stale:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+/chat throughput as the number of worker processes grows.
+
+Starts the offline app (benchmarks.fake_app) under uvicorn with 1, 2, 4...
+workers sharing a SQLite SHARED_STATE_URL, drives /chat over HTTP and
+prints req/s, latency and scaling efficiency against one worker. The
+scripted LLM burns --llm-cpu-ms of CPU per call so per-request work is
+CPU-bound, as the agent's own prompt building and parsing is:
+
+    python -m benchmarks.worker_scaling [--workers 1,2,4] [--requests N]
+        [--per-worker-concurrency C] [--llm-cpu-ms MS]
+
+The load generator is a single asyncio process; keep it off the cores
+being measured (or below saturation) for meaningful numbers.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.load_test import CHAT_MESSAGES, percentile
+
+
+async def wait_ready(base_url: str, workers: int, timeout: float = 60.0):
+    """
+    Poll /ready until every worker answered ready (by pid) or timeout
+    """
+    ready_pids = set()
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while len(ready_pids) < workers and time.monotonic() < deadline:
+            try:
+                response = await client.get("/ready")
+                if response.status_code == 200:
+                    ready_pids.add(response.json()["worker_pid"])
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.05)
+    if len(ready_pids) < workers:
+        raise RuntimeError(f"only {len(ready_pids)} of {workers} workers became ready")
+
+
+async def drive(base_url: str, requests: int, concurrency: int, users: int):
+    latencies = []
+    failures = 0
+    next_request = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def worker():
+            nonlocal failures
+            for i in next_request:
+                started = time.perf_counter()
+                response = await client.post("/chat", json={
+                    "content": CHAT_MESSAGES[i % len(CHAT_MESSAGES)],
+                    "access_token": f"bench-user-{i % users}", "user_id": str(i % users),
+                })
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    failures += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return requests / elapsed, latencies, failures
+
+
+def run(workers: int, args, port: int, state_path: str):
+    env = {
+        **os.environ,
+        "SHARED_STATE_URL": f"sqlite:///{state_path}",
+        # Measure the agent path, not cached answers
+        "RESPONSE_CACHE_ENABLED": "0",
+        "BENCH_LLM_CPU_MS": str(args.llm_cpu_ms),
+        "AGENT_WORKERS": str(args.per_worker_concurrency),
+        "AGENT_QUEUE_SIZE": str(args.per_worker_concurrency * 4),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.fake_app:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(wait_ready(base_url, workers))
+        concurrency = workers * args.per_worker_concurrency
+        # Warm every worker's per-user clients before timing
+        asyncio.run(drive(base_url, concurrency * 2, concurrency, args.users))
+        return asyncio.run(drive(base_url, args.requests, concurrency, args.users))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--per-worker-concurrency", type=int, default=4)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--llm-cpu-ms", type=float, default=20.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'fail':>5} {'speedup':>8} {'efficiency':>10}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in (int(n) for n in args.workers.split(",")):
+            throughput, latencies, failures = run(workers, args, args.port, os.path.join(tmp, f"state-{workers}.db"))
+            baseline = baseline or throughput / workers
+            speedup = throughput / baseline
+            print(f"{workers:>7} {throughput:>9.1f} {percentile(latencies, 0.5) * 1000:>9.1f} "
+                  f"{percentile(latencies, 0.95) * 1000:>9.1f} {failures:>5} {speedup:>8.2f} "
+                  f"{speedup / workers:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,37 @@
 import { useState, useRef, useEffect } from 'react'
 
+// Parse one Server-Sent Events frame ("event: x\ndata: {...}") from /chat/stream
+function parseSseFrame(frame) {
+  let event = 'message'
+  const dataLines = []
+  for (const line of frame.split('\n')) {
+    if (line.startsWith('event:')) event = line.slice(6).trim()
+    else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim())
+  }
+  let data = {}
+  try {
+    data = JSON.parse(dataLines.join('\n') || '{}')
+  } catch (e) {
+    data = {}
+  }
+  return { event, data }
+}
+
 function ChatBot({ accessToken, onClose }) {
   const [messages, setMessages] = useState([
     { sender: 'bot', text: 'Hi! I am your calendar assistant. How can I help you?' }
   ])
   const [input, setInput] = useState('')
   const [isLoading, setIsLoading] = useState(false)
+  const [streamingText, setStreamingText] = useState('')
+  const [toolStatus, setToolStatus] = useState('')
   const chatEndRef = useRef(null)
 
   useEffect(() => {
     if (chatEndRef.current) {
       chatEndRef.current.scrollIntoView({ behavior: 'smooth' })
     }
-  }, [messages, isLoading])
+  }, [messages, isLoading, streamingText, toolStatus])
 
   const handleSend = async () => {
     if (!input.trim() || isLoading) return
@@ -20,8 +39,10 @@ function ChatBot({ accessToken, onClose }) {
     setMessages(prev => [...prev, { sender: 'user', text: userMessage }])
     setInput('')
     setIsLoading(true)
+    setStreamingText('')
+    setToolStatus('')
     try {
-      const response = await fetch('http://localhost:8010/chat', {
+      const response = await fetch('http://localhost:8010/chat/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -32,9 +53,37 @@ function ChatBot({ accessToken, onClose }) {
           access_token: accessToken
         })
       })
-      if (response.ok) {
-        const data = await response.json()
-        setMessages(prev => [...prev, { sender: 'bot', text: data.message }])
+      if (response.ok && response.body) {
+        const reader = response.body.getReader()
+        const decoder = new TextDecoder()
+        let buffer = ''
+        let streamed = ''
+        let finalText = null
+        while (true) {
+          const { value, done } = await reader.read()
+          if (done) break
+          buffer += decoder.decode(value, { stream: true })
+          let boundary
+          while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const { event, data } = parseSseFrame(buffer.slice(0, boundary))
+            buffer = buffer.slice(boundary + 2)
+            if (event === 'token') {
+              streamed += data.token
+              setStreamingText(streamed)
+            } else if (event === 'tool_start') {
+              setToolStatus(`Calling ${data.tool}…`)
+            } else if (event === 'tool_end') {
+              setToolStatus('')
+            } else if (event === 'final') {
+              finalText = data.message
+            } else if (event === 'error') {
+              finalText = 'Sorry, I encountered an error. Please try again.'
+            }
+          }
+        }
+        setMessages(prev => [...prev, { sender: 'bot', text: finalText ?? (streamed || 'Sorry, I encountered an error. Please try again.') }])
+      } else if (response.status === 429 || response.status === 503) {
+        setMessages(prev => [...prev, { sender: 'bot', text: 'I am busy right now. Please try again in a moment.' }])
       } else {
         setMessages(prev => [...prev, { sender: 'bot', text: 'Sorry, I encountered an error. Please try again.' }])
       }
@@ -42,6 +91,8 @@ function ChatBot({ accessToken, onClose }) {
       setMessages(prev => [...prev, { sender: 'bot', text: 'Sorry, I cannot connect to the server. Please check if the backend is running.' }])
     } finally {
       setIsLoading(false)
+      setStreamingText('')
+      setToolStatus('')
     }
   }
 
@@ -60,7 +111,7 @@ function ChatBot({ accessToken, onClose }) {
           ))}
           {isLoading && (
             <div style={{ textAlign: 'left', margin: '12px 0' }}>
-              <span style={{ display: 'inline-block', background: '#e8eaf6', color: '#333', borderRadius: 14, padding: '10px 20px', fontSize: 16 }}>Thinking...</span>
+              <span style={{ display: 'inline-block', background: '#e8eaf6', color: '#333', borderRadius: 14, padding: '10px 20px', maxWidth: '80%', wordBreak: 'break-word', fontSize: 16 }}>{streamingText || toolStatus || 'Thinking...'}</span>
             </div>
           )}
           <div ref={chatEndRef} />
@@ -0,0 +1,33 @@
+"""
+Multi-worker deployment of the FastAPI app:
+
+    gunicorn app.main:app -c gunicorn.conf.py
+
+preload_app imports app.main once in the master, which is cheap because
+the LLM client, agent and Google credentials are built lazily; each
+worker then builds them in its own warm-up (lifespan) after the fork, so
+no clients or connections are shared across processes. Set
+SHARED_STATE_URL (sqlite:///... on one host, redis://... across hosts)
+so the workers share conversations, cache invalidations, push channels
+and rate limits.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8004)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+# Agent runs can take a while; match AGENT_TIMEOUT_SECONDS with headroom
+timeout = int(float(os.environ.get("AGENT_TIMEOUT_SECONDS", 60))) + 30
+graceful_timeout = 30
+keepalive = 5
+
+
+def when_ready(server):
+    url = os.environ.get("SHARED_STATE_URL", "")
+    if workers > 1 and (not url or url.startswith("memory:")):
+        server.log.warning(
+            "Running %d workers without SHARED_STATE_URL: conversations and cache "
+            "invalidations are per worker", workers,
+        )
@@ -0,0 +1,73 @@
+import pytest
+
+from app.intent_router import IntentRouter, _split_range
+
+
+@pytest.fixture
+def router():
+    return IntentRouter(min_confidence=0.8)
+
+
+@pytest.mark.parametrize("text", [
+    "show my events",
+    "What's on my calendar?",
+    "list my upcoming events",
+    "what do I have",
+])
+def test_plain_listing_is_routed(router, text):
+    match = router.route(text)
+    assert match is not None and match.intent == "list"
+
+
+@pytest.mark.parametrize("text, period", [
+    ("What's on my calendar next month?", "next month"),
+    ("what meetings did I have last week?", "last week"),
+    ("what do I have tomorrow", "tomorrow"),
+])
+def test_listing_with_a_period_searches_that_period(router, text, period):
+    match = router.route(text)
+    assert match is not None and match.intent == "search"
+    assert match.slots == {"period": period}
+
+
+@pytest.mark.parametrize("text", [
+    "show my 1:1 meetings this quarter",
+    "what meetings did I have",
+    "show me how to create an event",
+])
+def test_listing_with_extra_content_goes_to_the_agent(router, text):
+    assert router.route(text) is None
+
+
+def test_trailing_day_applies_to_both_ends():
+    assert _split_range("from 6pm to 7pm tomorrow") == ("tomorrow 6pm", "7pm tomorrow")
+    assert _split_range("tomorrow at 3pm to 4pm") == ("tomorrow at 3pm", "tomorrow 4pm")
+
+
+def test_range_with_trailing_day_is_routed(router):
+    match = router.route("schedule gym from 6pm to 7pm tomorrow")
+    assert match is not None and match.intent == "create"
+    assert match.slots["start_time"] == "tomorrow 6pm"
+
+
+@pytest.mark.parametrize("text", [
+    # end before start
+    "schedule review tomorrow at 5pm to 3pm",
+    # longer than a day
+    "schedule trip today at 9am to tomorrow at 11am",
+    # recurring
+    "add standup every day at 9am",
+    "schedule weekly sync tomorrow at 10am",
+])
+def test_suspicious_creates_go_to_the_agent(router, text):
+    match = router.classify(text)
+    assert match is not None and match.intent == "create"
+    assert router.route(text) is None
+
+
+@pytest.mark.parametrize("text", [
+    "delete team standup",
+    "delete all standups this week",
+])
+def test_deletes_are_never_routed(router, text):
+    assert router.route(text) is None